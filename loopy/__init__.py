@@ -93,7 +93,8 @@ from loopy.transform.data import (
         tag_array_axes, tag_data_axes,
         set_array_axis_names, set_array_dim_names,
         remove_unused_arguments,
-        alias_temporaries, set_argument_order,
+        alias_temporaries, find_temporary_storage_sharing,
+        share_temporary_storage, set_argument_order,
         rename_argument,
         set_temporary_scope)
 
@@ -103,7 +104,14 @@ from loopy.transform.subst import (extract_subst,
 
 from loopy.transform.precompute import precompute
 from loopy.transform.buffer import buffer_array
-from loopy.transform.fusion import fuse_kernels
+from loopy.transform.fusion import fuse_kernels, fuse_producer_consumer
+from loopy.transform.tiling import (
+        tile_for_cache, get_cpu_cache_sizes, register_block)
+from loopy.transform.hoist import hoist_invariant_subexpressions
+from loopy.transform.cse import eliminate_common_subexpressions
+from loopy.transform.balance import (
+        make_work_partition_inspector, WorkPartitionInspector,
+        partition_iname_by_work)
 
 from loopy.transform.arithmetic import (
         fold_constants,
@@ -128,7 +136,8 @@ from loopy.statistics import (ToCountMap, CountGranularity, stringify_stats_mapp
         Op, MemAccess, get_op_poly, get_op_map, get_lmem_access_poly,
         get_DRAM_access_poly, get_gmem_access_poly, get_mem_access_map,
         get_synchronization_poly, get_synchronization_map,
-        gather_access_footprints, gather_access_footprint_bytes)
+        gather_access_footprints, gather_access_footprint_bytes,
+        get_mem_access_trace_stats)
 from loopy.codegen import (
         PreambleInfo,
         generate_code, generate_code_v2, generate_body)
@@ -148,6 +157,7 @@ from loopy.target.opencl import OpenCLTarget
 from loopy.target.pyopencl import PyOpenCLTarget
 from loopy.target.ispc import ISPCTarget
 from loopy.target.numba import NumbaTarget, NumbaCudaTarget
+from loopy.target.python import PythonTarget
 
 from loopy.tools import Optional
 
@@ -201,7 +211,8 @@ __all__ = [
         "tag_array_axes", "tag_data_axes",
         "set_array_axis_names", "set_array_dim_names",
         "remove_unused_arguments",
-        "alias_temporaries", "set_argument_order",
+        "alias_temporaries", "find_temporary_storage_sharing",
+        "share_temporary_storage", "set_argument_order",
         "rename_argument", "set_temporary_scope",
 
         "find_instructions", "map_instructions",
@@ -215,7 +226,14 @@ __all__ = [
         "find_rules_matching", "find_one_rule_matching",
 
         "precompute", "buffer_array",
-        "fuse_kernels",
+        "fuse_kernels", "fuse_producer_consumer",
+
+        "tile_for_cache", "get_cpu_cache_sizes", "register_block",
+
+        "hoist_invariant_subexpressions", "eliminate_common_subexpressions",
+
+        "make_work_partition_inspector", "WorkPartitionInspector",
+        "partition_iname_by_work",
 
         "fold_constants", "collect_common_factors_on_increment",
 
@@ -258,6 +276,7 @@ __all__ = [
         "get_DRAM_access_poly", "get_gmem_access_poly", "get_mem_access_map",
         "get_synchronization_poly", "get_synchronization_map",
         "gather_access_footprints", "gather_access_footprint_bytes",
+        "get_mem_access_trace_stats",
 
         "CompiledKernel",
 
@@ -275,6 +294,7 @@ __all__ = [
         "CudaTarget", "OpenCLTarget",
         "PyOpenCLTarget", "ISPCTarget",
         "NumbaTarget", "NumbaCudaTarget",
+        "PythonTarget",
         "ASTBuilderBase",
 
         "Optional",
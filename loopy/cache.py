@@ -0,0 +1,514 @@
+from __future__ import division, absolute_import, print_function
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import os
+import six
+
+from pytools import Record
+from pytools.persistent_dict import CleanupManager, LockManager
+
+
+__doc__ = """
+Maintenance of the on-disk kernel caches
+----------------------------------------
+
+:mod:`loopy` keeps the results of kernel creation (including translation
+by the Fortran frontend), preprocessing, scheduling, code generation and
+compilation in persistent, on-disk caches.
+The following functionality reports on and maintains these caches. It is
+safe to use while other processes are reading from and writing to the
+caches: entries are only removed or added while holding the same lock that
+is taken by writers, and entries that are still being written are skipped.
+
+The same functionality is available from the command line as
+``python -m loopy.cache`` (or ``loopy-cache``), see ``--help``.
+
+.. autofunction:: get_kernel_caches
+
+.. autoclass:: CacheStatistics
+
+.. autofunction:: get_cache_statistics
+
+.. autofunction:: prune_caches
+
+.. autofunction:: export_caches
+
+.. autofunction:: import_caches
+"""
+
+
+# {{{ cache registry
+
+_CACHE_LOCATIONS = [
+        ("creation", "loopy.kernel.creation", "creation_cache"),
+        ("fortran-frontend", "loopy.frontend.fortran", "fortran_frontend_cache"),
+        ("preprocess", "loopy.preprocess", "preprocess_cache"),
+        ("schedule", "loopy.schedule", "schedule_cache"),
+        ("code-gen", "loopy.codegen", "code_gen_cache"),
+        ("typed-and-scheduled", "loopy.target.execution",
+            "typed_and_scheduled_cache"),
+        ("invoker", "loopy.target.execution", "invoker_cache"),
+        ("buffer-array", "loopy.transform.buffer", "buffer_array_cache"),
+        ]
+
+
+def get_kernel_caches(names=None):
+    """Return a list of tuples ``(name, cache)``, where *cache* is a
+    :class:`loopy.tools.LoopyPersistentDict`.
+
+    :arg names: an iterable of cache names to restrict the result to, or
+        *None* for all caches.
+    """
+    from importlib import import_module
+    from loopy.tools import RenamingInvariantPersistentDict
+
+    if names is not None:
+        names = set(names)
+        unknown_names = names - set(name for name, _, _ in _CACHE_LOCATIONS)
+        if unknown_names:
+            raise ValueError("unknown cache names: %s"
+                    % ", ".join(sorted(unknown_names)))
+
+    result = []
+    for name, module_name, attr_name in _CACHE_LOCATIONS:
+        if names is not None and name not in names:
+            continue
+
+        cache = getattr(import_module(module_name), attr_name)
+        if isinstance(cache, RenamingInvariantPersistentDict):
+            cache = cache.persistent_dict
+
+        result.append((name, cache))
+
+    return result
+
+
+def _iter_entries(cache):
+    """Yield tuples ``(hexdigest_key, item_dir)`` for the entries of
+    *cache* that are completely written.
+    """
+    from os.path import join, isdir, exists
+
+    container_dir = cache.container_dir
+    if not isdir(container_dir):
+        return
+
+    for dir1 in sorted(os.listdir(container_dir)):
+        path1 = join(container_dir, dir1)
+        if len(dir1) != 3 or not isdir(path1):
+            continue
+
+        for dir2 in sorted(os.listdir(path1)):
+            path2 = join(path1, dir2)
+            if not isdir(path2):
+                continue
+
+            for dir3 in sorted(os.listdir(path2)):
+                hexdigest_key = dir1 + dir2 + dir3
+                item_dir = join(path2, dir3)
+
+                if (exists(cache._lock_file(hexdigest_key))
+                        or not exists(join(item_dir, "key"))
+                        or not exists(join(item_dir, "contents"))):
+                    # being written (or broken)
+                    continue
+
+                yield hexdigest_key, item_dir
+
+
+def _get_entry_size_and_last_use(item_dir):
+    from os.path import join
+
+    size = 0
+    last_use = 0
+    for file_name in os.listdir(item_dir):
+        st = os.stat(join(item_dir, file_name))
+        size += st.st_size
+        last_use = max(last_use, st.st_mtime, st.st_atime)
+
+    return size, last_use
+
+# }}}
+
+
+# {{{ statistics
+
+class CacheStatistics(Record):
+    """
+    .. attribute:: name
+    .. attribute:: container_dir
+    .. attribute:: entries
+
+        The number of entries on disk.
+
+    .. attribute:: bytes
+
+        The total size of the entries on disk.
+
+    .. attribute:: hits
+    .. attribute:: misses
+
+        Counts of lookups, accumulated across all processes using this
+        cache directory since it was created.
+
+    .. attribute:: hit_rate
+
+        The fraction of lookups that were hits, or *None* if there were no
+        lookups.
+    """
+
+    def __init__(self, name, container_dir, entries, bytes, hits, misses):
+        Record.__init__(self, name=name, container_dir=container_dir,
+                entries=entries, bytes=bytes, hits=hits, misses=misses)
+
+    @property
+    def hit_rate(self):
+        lookups = self.hits + self.misses
+        if not lookups:
+            return None
+        return self.hits / lookups
+
+
+def get_cache_statistics(names=None):
+    """Return a list of :class:`CacheStatistics` for the kernel caches
+    given by *names* (see :func:`get_kernel_caches`).
+    """
+    result = []
+
+    for name, cache in get_kernel_caches(names):
+        cache.flush_statistics()
+        hits, misses = cache.read_statistics()
+
+        entries = 0
+        nbytes = 0
+        for _, item_dir in _iter_entries(cache):
+            size, _ = _get_entry_size_and_last_use(item_dir)
+            entries += 1
+            nbytes += size
+
+        result.append(CacheStatistics(
+            name=name, container_dir=cache.container_dir,
+            entries=entries, bytes=nbytes, hits=hits, misses=misses))
+
+    return result
+
+# }}}
+
+
+# {{{ pruning
+
+def _remove_entry(cache, hexdigest_key, item_dir):
+    import shutil
+
+    cleanup_m = CleanupManager()
+    try:
+        try:
+            LockManager(cleanup_m, cache._lock_file(hexdigest_key))
+
+            # Move the entry out of the way first so that concurrent readers
+            # never see it in a partially deleted state.
+            doomed_dir = "%s.removing-%d" % (item_dir, os.getpid())
+            os.rename(item_dir, doomed_dir)
+        except Exception:
+            cleanup_m.error_clean_up()
+            raise
+    finally:
+        cleanup_m.clean_up()
+
+    shutil.rmtree(doomed_dir, ignore_errors=True)
+
+
+def prune_caches(names=None, max_age=None, max_bytes=None, now=None):
+    """Remove entries from the kernel caches given by *names* (see
+    :func:`get_kernel_caches`).
+
+    :arg max_age: if not *None*, remove entries not used (or, depending on the
+        file system, not written) in the last *max_age* seconds.
+    :arg max_bytes: if not *None*, then remove least recently used entries
+        until the total size of the caches is at most *max_bytes*.
+    :returns: a tuple ``(removed_entries, removed_bytes)``.
+    """
+    if now is None:
+        from time import time
+        now = time()
+
+    entries = []
+    for _, cache in get_kernel_caches(names):
+        for hexdigest_key, item_dir in _iter_entries(cache):
+            size, last_use = _get_entry_size_and_last_use(item_dir)
+            entries.append((last_use, size, cache, hexdigest_key, item_dir))
+
+    entries.sort(key=lambda entry: entry[0])
+
+    total_bytes = sum(size for _, size, _, _, _ in entries)
+
+    removed_entries = 0
+    removed_bytes = 0
+
+    for last_use, size, cache, hexdigest_key, item_dir in entries:
+        too_old = max_age is not None and now - last_use > max_age
+        too_big = max_bytes is not None and total_bytes > max_bytes
+
+        if not (too_old or too_big):
+            continue
+
+        try:
+            _remove_entry(cache, hexdigest_key, item_dir)
+        except OSError:
+            # removed concurrently
+            continue
+
+        total_bytes -= size
+        removed_entries += 1
+        removed_bytes += size
+
+    return removed_entries, removed_bytes
+
+# }}}
+
+
+# {{{ export/import
+
+def export_caches(filename, names=None):
+    """Write the entries of the kernel caches given by *names* (see
+    :func:`get_kernel_caches`) to the (possibly compressed) :mod:`tarfile`
+    *filename*, for use with :func:`import_caches`.
+
+    :returns: the number of exported entries.
+    """
+    import tarfile
+    from os.path import basename, join, relpath
+
+    mode = "w"
+    if filename.endswith((".tar.gz", ".tgz")):
+        mode = "w:gz"
+    elif filename.endswith(".tar.bz2"):
+        mode = "w:bz2"
+
+    nentries = 0
+    with tarfile.open(filename, mode) as tarf:
+        for _, cache in get_kernel_caches(names):
+            container_name = basename(cache.container_dir)
+
+            for _, item_dir in _iter_entries(cache):
+                arc_dir = join(
+                        container_name,
+                        relpath(item_dir, cache.container_dir))
+
+                try:
+                    for file_name in ["key", "contents"]:
+                        tarf.add(
+                                join(item_dir, file_name),
+                                arcname=join(arc_dir, file_name))
+                except (IOError, OSError):
+                    # removed concurrently
+                    continue
+
+                nentries += 1
+
+    return nentries
+
+
+def import_caches(filename, names=None):
+    """Add the entries written by :func:`export_caches` to *filename* to the
+    kernel caches given by *names* (see :func:`get_kernel_caches`). Entries
+    that are already present, and entries for caches that do not match the
+    version of :mod:`loopy` (and its dependencies) in use, are skipped.
+
+    :returns: the number of imported entries.
+    """
+    import tarfile
+    import shutil
+    from os.path import basename, join, isdir
+
+    caches = dict(
+            (basename(cache.container_dir), cache)
+            for _, cache in get_kernel_caches(names))
+
+    # {{{ group archive members by entry
+
+    entry_members = {}
+    with tarfile.open(filename, "r") as tarf:
+        for member in tarf.getmembers():
+            if not member.isfile():
+                continue
+
+            components = member.name.split("/")
+            if (len(components) != 5
+                    or components[0] not in caches
+                    or components[4] not in ["key", "contents"]):
+                continue
+
+            container_name, dir1, dir2, dir3, file_name = components
+            hexdigest_key = dir1 + dir2 + dir3
+            if (len(dir1) != 3 or len(dir2) != 3
+                    or not all(c in "0123456789abcdef" for c in hexdigest_key)):
+                continue
+
+            entry_members.setdefault((container_name, hexdigest_key), {})[
+                    file_name] = member
+
+        # }}}
+
+        nentries = 0
+        for (container_name, hexdigest_key), members in sorted(
+                six.iteritems(entry_members)):
+            if set(members) != set(["key", "contents"]):
+                continue
+
+            cache = caches[container_name]
+            cache._make_container_dir()
+            item_dir = cache._item_dir(hexdigest_key)
+
+            cleanup_m = CleanupManager()
+            try:
+                try:
+                    LockManager(cleanup_m, cache._lock_file(hexdigest_key))
+                    if isdir(item_dir):
+                        continue
+
+                    # Write to a temporary directory and move it into place
+                    # so that readers never see a partial entry.
+                    tmp_dir = "%s.importing-%d" % (item_dir, os.getpid())
+                    os.makedirs(tmp_dir)
+                    for file_name, member in six.iteritems(members):
+                        inf = tarf.extractfile(member)
+                        with open(join(tmp_dir, file_name), "wb") as outf:
+                            shutil.copyfileobj(inf, outf)
+                    os.rename(tmp_dir, item_dir)
+                except Exception:
+                    cleanup_m.error_clean_up()
+                    raise
+            finally:
+                cleanup_m.clean_up()
+
+            nentries += 1
+
+    return nentries
+
+# }}}
+
+
+# {{{ command line interface
+
+def _parse_size(size_str):
+    units = {"": 1, "k": 2**10, "m": 2**20, "g": 2**30, "t": 2**40}
+    size_str = size_str.strip().lower()
+    if size_str.endswith("b"):
+        size_str = size_str[:-1]
+
+    unit = ""
+    if size_str and size_str[-1] in units:
+        unit = size_str[-1]
+        size_str = size_str[:-1]
+
+    return int(float(size_str) * units[unit])
+
+
+def _parse_age(age_str):
+    units = {"s": 1, "m": 60, "h": 60*60, "d": 24*60*60, "w": 7*24*60*60}
+    age_str = age_str.strip().lower()
+
+    unit = "s"
+    if age_str and age_str[-1] in units:
+        unit = age_str[-1]
+        age_str = age_str[:-1]
+
+    return float(age_str) * units[unit]
+
+
+def _format_size(nbytes):
+    for unit in ["B", "KiB", "MiB", "GiB"]:
+        if nbytes < 1024:
+            break
+        nbytes /= 1024
+    else:
+        unit = "TiB"
+
+    if unit == "B":
+        return "%d %s" % (nbytes, unit)
+    return "%.1f %s" % (nbytes, unit)
+
+
+def main(argv=None):
+    from argparse import ArgumentParser
+
+    parser = ArgumentParser(description="Maintain loopy's on-disk kernel caches")
+    parser.add_argument("--cache", action="append", dest="names",
+            metavar="NAME", choices=[name for name, _, _ in _CACHE_LOCATIONS],
+            help="Restrict to this cache (may be given multiple times). "
+            "Defaults to all caches.")
+
+    subparsers = parser.add_subparsers(dest="command")
+    subparsers.add_parser("stats", help="Show cache statistics")
+
+    prune_parser = subparsers.add_parser("prune", help="Remove cache entries")
+    prune_parser.add_argument("--max-age", type=_parse_age,
+            help="Remove entries not used for this long, e.g. '7d' or '12h'")
+    prune_parser.add_argument("--max-size", type=_parse_size,
+            help="Remove least recently used entries until the caches "
+            "are no larger than this, e.g. '500M'")
+
+    export_parser = subparsers.add_parser("export",
+            help="Write cache entries to a tar file")
+    export_parser.add_argument("filename")
+
+    import_parser = subparsers.add_parser("import",
+            help="Add cache entries from a tar file written by 'export'")
+    import_parser.add_argument("filename")
+
+    args = parser.parse_args(argv)
+
+    if args.command is None or args.command == "stats":
+        print("%-20s %8s %11s %10s %10s %8s" % (
+            "cache", "entries", "size", "hits", "misses", "hit rate"))
+        for stats in get_cache_statistics(args.names):
+            hit_rate = stats.hit_rate
+            print("%-20s %8d %11s %10d %10d %8s" % (
+                stats.name, stats.entries, _format_size(stats.bytes),
+                stats.hits, stats.misses,
+                "-" if hit_rate is None else "%.1f%%" % (100*hit_rate)))
+
+    elif args.command == "prune":
+        if args.max_age is None and args.max_size is None:
+            parser.error("prune: need at least one of --max-age, --max-size")
+
+        removed_entries, removed_bytes = prune_caches(args.names,
+                max_age=args.max_age, max_bytes=args.max_size)
+        print("removed %d entries (%s)" % (
+            removed_entries, _format_size(removed_bytes)))
+
+    elif args.command == "export":
+        print("exported %d entries" % export_caches(args.filename, args.names))
+
+    elif args.command == "import":
+        print("imported %d entries" % import_caches(args.filename, args.names))
+
+
+if __name__ == "__main__":
+    main()
+
+# }}}
+
+# vim: foldmethod=marker
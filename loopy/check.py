@@ -25,6 +25,7 @@ THE SOFTWARE.
 import six
 from six.moves import range
 
+from pytools import memoize_on_first_arg
 from islpy import dim_type
 import islpy as isl
 from loopy.symbolic import WalkMapper
@@ -296,10 +297,19 @@ def check_for_data_dependent_parallel_bounds(kernel):
 # {{{ check access bounds
 
 class _AccessCheckMapper(WalkMapper):
-    def __init__(self, kernel, domain, insn_id):
+    """Collects the subscripts to be bounds-checked into *accesses*, a
+    mapping from ``(domain_key, var_name)`` to a list of tuples
+    ``(insn_id, subscript_expr)``.
+    """
+
+    def __init__(self, kernel, domain, domain_key, insn_id, accesses):
         self.kernel = kernel
         self.domain = domain
+        self.domain_key = domain_key
         self.insn_id = insn_id
+        self.accesses = accesses
+
+        self.available_vars = set(domain.get_var_dict())
 
     def map_subscript(self, expr):
         WalkMapper.map_subscript(self, expr)
@@ -307,32 +317,20 @@ class _AccessCheckMapper(WalkMapper):
         from pymbolic.primitives import Variable
         assert isinstance(expr.aggregate, Variable)
 
-        shape = None
-        var_name = expr.aggregate.name
-        if var_name in self.kernel.arg_dict:
-            arg = self.kernel.arg_dict[var_name]
-            shape = arg.shape
-        elif var_name in self.kernel.temporary_variables:
-            tv = self.kernel.temporary_variables[var_name]
-            shape = tv.shape
+        shape = _get_shape_for_bounds_check(self.kernel, expr.aggregate.name)
 
         if shape is not None:
-            subscript = expr.index
-
-            if not isinstance(subscript, tuple):
-                subscript = (subscript,)
+            subscript = expr.index_tuple
 
-            from loopy.symbolic import (get_dependencies, get_access_range,
-                    UnableToDetermineAccessRange)
+            from loopy.symbolic import get_dependencies
 
-            available_vars = set(self.domain.get_var_dict())
             shape_deps = set()
             for shape_axis in shape:
                 if shape_axis is not None:
                     shape_deps.update(get_dependencies(shape_axis))
 
-            if not (get_dependencies(subscript) <= available_vars
-                    and shape_deps <= available_vars):
+            if not (get_dependencies(subscript) <= self.available_vars
+                    and shape_deps <= self.available_vars):
                 return
 
             if len(subscript) != len(shape):
@@ -341,42 +339,84 @@ class _AccessCheckMapper(WalkMapper):
                             expr.aggregate.name, expr,
                             len(subscript), len(shape)))
 
-            try:
-                access_range = get_access_range(self.domain, subscript,
-                        self.kernel.assumptions).range()
-            except UnableToDetermineAccessRange:
-                # Likely: index was non-affine, nothing we can do.
+            if _is_trivially_in_bounds(subscript, shape):
                 return
 
-            shape_domain = isl.BasicSet.universe(access_range.get_space())
-            for idim in range(len(subscript)):
-                shape_axis = shape[idim]
+            self.accesses.setdefault(
+                    (self.domain_key, expr.aggregate.name), []).append(
+                            (self.insn_id, expr))
 
-                if shape_axis is not None:
-                    from loopy.isl_helpers import make_slab
-                    slab = make_slab(
-                            shape_domain.get_space(), (dim_type.in_, idim),
-                            0, shape_axis)
 
-                    shape_domain = shape_domain.intersect(slab)
+def _get_shape_for_bounds_check(kernel, var_name):
+    if var_name in kernel.arg_dict:
+        return kernel.arg_dict[var_name].shape
+    elif var_name in kernel.temporary_variables:
+        return kernel.temporary_variables[var_name].shape
+    else:
+        return None
 
-            if not access_range.is_subset(shape_domain):
-                raise LoopyError("'%s' in instruction '%s' "
-                        "accesses out-of-bounds array element (could not"
-                        " establish '%s' is a subset of '%s')."
-                        % (expr, self.insn_id, access_range, shape_domain))
 
+def _is_trivially_in_bounds(subscript, shape):
+    """Return *True* if all indices in *subscript* are integer constants
+    within the bounds given by *shape*, without involving :mod:`islpy`.
+    """
+    from loopy.tools import is_integer
+
+    for index, shape_axis in zip(subscript, shape):
+        if shape_axis is None:
+            continue
+
+        if not (is_integer(index) and is_integer(shape_axis)
+                and 0 <= index < shape_axis):
+            return False
+
+    return True
+
+
+def _get_shape_domain(space, shape):
+    shape_domain = isl.BasicSet.universe(space)
+    for idim, shape_axis in enumerate(shape):
+        if shape_axis is not None:
+            from loopy.isl_helpers import make_slab
+            slab = make_slab(
+                    shape_domain.get_space(), (dim_type.in_, idim),
+                    0, shape_axis)
+
+            shape_domain = shape_domain.intersect(slab)
 
+    return shape_domain
+
+
+@memoize_on_first_arg
 def check_bounds(kernel):
+    """Check that all array accesses in *kernel* with affine subscripts are
+    within the bounds given by the shape of the accessed variable.
+
+    Accesses are grouped by domain and variable, so that for each such group
+    only a single (union) access range is compared against the shape. The
+    result is memoized on *kernel*.
+    """
+    from loopy.symbolic import get_access_range, UnableToDetermineAccessRange
+
     temp_var_names = set(kernel.temporary_variables)
+
+    # {{{ collect accesses
+
+    accesses = {}
+    domains = {}
+
     for insn in kernel.instructions:
-        domain = kernel.get_inames_domain(kernel.insn_inames(insn))
+        insn_inames = kernel.insn_inames(insn)
+        domain = kernel.get_inames_domain(insn_inames)
 
         # data-dependent bounds? can't do much
         if set(domain.get_var_names(dim_type.param)) & temp_var_names:
             continue
 
-        acm = _AccessCheckMapper(kernel, domain, insn.id)
+        domain_key = frozenset(kernel.get_leaf_domain_indices(insn_inames))
+        domains[domain_key] = domain
+
+        acm = _AccessCheckMapper(kernel, domain, domain_key, insn.id, accesses)
 
         def run_acm(expr):
             acm(expr)
@@ -384,6 +424,57 @@ def check_bounds(kernel):
 
         insn.with_transformed_expressions(run_acm)
 
+    # }}}
+
+    # {{{ check access ranges per domain and variable
+
+    for (domain_key, var_name), group_accesses in sorted(
+            six.iteritems(accesses), key=lambda item: item[0][1]):
+        domain = domains[domain_key]
+        shape = _get_shape_for_bounds_check(kernel, var_name)
+
+        access_range = None
+        checked_accesses = []
+        seen_subscripts = set()
+
+        for insn_id, expr in group_accesses:
+            if expr.index in seen_subscripts:
+                continue
+            seen_subscripts.add(expr.index)
+
+            try:
+                expr_access_range = get_access_range(
+                        domain, expr.index_tuple, kernel.assumptions).range()
+            except UnableToDetermineAccessRange:
+                # Likely: index was non-affine, nothing we can do.
+                continue
+
+            checked_accesses.append((insn_id, expr, expr_access_range))
+
+            if access_range is None:
+                access_range = expr_access_range
+            else:
+                access_range = access_range | expr_access_range
+
+        if access_range is None:
+            continue
+
+        shape_domain = _get_shape_domain(access_range.get_space(), shape)
+
+        if access_range.is_subset(shape_domain):
+            continue
+
+        # Since the union is not within bounds, one of the accesses is not.
+        # Find it for the error message.
+        for insn_id, expr, expr_access_range in checked_accesses:
+            if not expr_access_range.is_subset(shape_domain):
+                raise LoopyError("'%s' in instruction '%s' "
+                        "accesses out-of-bounds array element (could not"
+                        " establish '%s' is a subset of '%s')."
+                        % (expr, insn_id, expr_access_range, shape_domain))
+
+    # }}}
+
 # }}}
 
 
@@ -53,14 +53,31 @@ def defines_to_python_code(defines_str):
     return "\n".join(result)
 
 
+TARGET_TO_EXTENSION = {
+        "opencl": ".cl",
+        "ispc": ".ispc",
+        "ispc-occa": ".ispc",
+        "c": ".c",
+        "c-fortran": ".c",
+        "cuda": ".cu",
+        }
+
+
 def main():
     from argparse import ArgumentParser
 
     parser = ArgumentParser(description="Stand-alone loopy frontend")
 
-    parser.add_argument("infile", metavar="INPUT_FILE")
+    parser.add_argument("infile", metavar="INPUT_FILE", nargs='?')
     parser.add_argument("outfile", default="-", metavar="OUTPUT_FILE",
             help="Defaults to stdout ('-').", nargs='?')
+    parser.add_argument("--batch", metavar="INPUT_FILE", nargs="+",
+            help="Process each of these files in turn, writing the code "
+            "for each to a file named after it (see --output-dir), "
+            "instead of processing INPUT_FILE.")
+    parser.add_argument("--output-dir", metavar="DIR",
+            help="With --batch, write the generated code to this directory. "
+            "Defaults to the directory of each input file.")
     parser.add_argument("--lang", metavar="LANGUAGE", help="loopy|fortran")
     parser.add_argument("--target", choices=(
         "opencl", "ispc", "ispc-occa", "c", "c-fortran", "cuda"),
@@ -73,6 +90,11 @@ def main():
     parser.add_argument("--print-ir", action="store_true")
     args = parser.parse_args()
 
+    if (args.batch is None) == (args.infile is None):
+        parser.error("exactly one of INPUT_FILE and --batch must be given")
+    if args.batch is not None and args.outfile != "-":
+        parser.error("OUTPUT_FILE may not be given with --batch")
+
     if args.target == "opencl":
         from loopy.target.opencl import OpenCLTarget
         target = OpenCLTarget()
@@ -96,12 +118,49 @@ def main():
 
     lp.set_default_target(target)
 
+    if args.batch is None:
+        process_file(args, args.infile, args.outfile)
+        return
+
+    # {{{ batch mode
+
+    from os.path import basename, dirname, join, splitext
+
+    failed_infiles = []
+    for infile in args.batch:
+        output_dir = args.output_dir
+        if output_dir is None:
+            output_dir = dirname(infile)
+
+        outfile = join(output_dir,
+                splitext(basename(infile))[0] + TARGET_TO_EXTENSION[args.target])
+
+        try:
+            process_file(args, infile, outfile)
+        except Exception as e:
+            print("%s: %s: %s" % (infile, type(e).__name__, e), file=sys.stderr)
+            failed_infiles.append(infile)
+
+    if failed_infiles:
+        print("%d of %d files failed: %s" % (
+            len(failed_infiles), len(args.batch), " ".join(failed_infiles)),
+            file=sys.stderr)
+        sys.exit(1)
+
+    # }}}
+
+
+def process_file(args, infile, outfile):
+    """Generate code for the kernels in *infile* and write it to *outfile*
+    (or to stdout, if *outfile* is ``"-"``), according to the command line
+    arguments *args*.
+    """
     lang = None
-    if args.infile == "-":
+    if infile == "-":
         infile_content = sys.stdin.read()
     else:
         from os.path import splitext
-        _, ext = splitext(args.infile)
+        _, ext = splitext(infile)
 
         lang = {
                 ".py": "loopy",
@@ -112,7 +171,7 @@ def main():
                 ".f": "fortran",
                 ".f77": "fortran",
                 }.get(ext)
-        with open(args.infile, "r") as infile_fd:
+        with open(infile, "r") as infile_fd:
             infile_content = infile_fd.read()
 
     if args.lang is not None:
@@ -128,7 +187,7 @@ def main():
         from os.path import dirname, abspath
         from os import getcwd
 
-        infile_dirname = dirname(args.infile)
+        infile_dirname = dirname(infile)
         if infile_dirname:
             infile_dirname = abspath(infile_dirname)
         else:
@@ -147,8 +206,8 @@ def main():
                 occa_define_code = defines_to_python_code(defines_fd.read())
             exec(compile(occa_define_code, args.occa_defines, "exec"), data_dic)
 
-        with open(args.infile, "r") as infile_fd:
-            exec(compile(infile_content, args.infile, "exec"), data_dic)
+        with open(infile, "r") as infile_fd:
+            exec(compile(infile_content, infile, "exec"), data_dic)
 
         if args.transform:
             with open(args.transform, "r") as xform_fd:
@@ -183,7 +242,7 @@ def main():
 
         kernels = lp.parse_transformed_fortran(
                 infile_content, pre_transform_code=pre_transform_code,
-                filename=args.infile)
+                filename=infile)
 
         if args.name is not None:
             kernels = [kernel for kernel in kernels
@@ -219,9 +278,7 @@ def main():
         code, impl_arg_info = generate_code(kernel)
         codes.append(code)
 
-    if args.outfile is not None:
-        outfile = args.outfile
-    else:
+    if outfile is None:
         outfile = "-"
 
     code = "\n\n".join(codes)
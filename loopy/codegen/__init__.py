@@ -28,8 +28,7 @@ from loopy.diagnostic import LoopyError, warn
 from pytools import ImmutableRecord
 import islpy as isl
 
-from pytools.persistent_dict import WriteOncePersistentDict
-from loopy.tools import LoopyKeyBuilder
+from loopy.tools import RenamingInvariantPersistentDict
 from loopy.version import DATA_MODEL_VERSION
 
 import logging
@@ -187,6 +186,15 @@ class CodeGenerationState(object):
         generated.
 
     .. attribute:: schedule_index_end
+
+    .. attribute:: strength_reduced_subscripts
+
+        A mapping from tuples ``(array_name, subscript)`` of flattened
+        array subscripts to tuples ``(offset_name, offset_terms)``, where
+        *offset_name* is the name of a variable holding the sum of the
+        terms of *subscript* (a :class:`pymbolic.primitives.Sum`) with
+        indices *offset_terms*. See
+        :attr:`loopy.Options.strength_reduce_index_arithmetic`.
     """
 
     def __init__(self, kernel,
@@ -196,7 +204,8 @@ class CodeGenerationState(object):
             vectorization_info=None, var_name_generator=None,
             is_generating_device_code=None,
             gen_program_name=None,
-            schedule_index_end=None):
+            schedule_index_end=None,
+            strength_reduced_subscripts={}):
         self.kernel = kernel
         self.implemented_data_info = implemented_data_info
         self.implemented_domain = implemented_domain
@@ -211,6 +220,7 @@ class CodeGenerationState(object):
         self.is_generating_device_code = is_generating_device_code
         self.gen_program_name = gen_program_name
         self.schedule_index_end = schedule_index_end
+        self.strength_reduced_subscripts = strength_reduced_subscripts
 
     # {{{ copy helpers
 
@@ -219,7 +229,8 @@ class CodeGenerationState(object):
             var_subst_map=None, vectorization_info=None,
             is_generating_device_code=None,
             gen_program_name=None,
-            schedule_index_end=None):
+            schedule_index_end=None,
+            strength_reduced_subscripts=None):
 
         if kernel is None:
             kernel = self.kernel
@@ -242,6 +253,9 @@ class CodeGenerationState(object):
         if schedule_index_end is None:
             schedule_index_end = self.schedule_index_end
 
+        if strength_reduced_subscripts is None:
+            strength_reduced_subscripts = self.strength_reduced_subscripts
+
         return CodeGenerationState(
                 kernel=kernel,
                 implemented_data_info=implemented_data_info,
@@ -257,7 +271,8 @@ class CodeGenerationState(object):
                 var_name_generator=self.var_name_generator,
                 is_generating_device_code=is_generating_device_code,
                 gen_program_name=gen_program_name,
-                schedule_index_end=schedule_index_end)
+                schedule_index_end=schedule_index_end,
+                strength_reduced_subscripts=strength_reduced_subscripts)
 
     def copy_and_assign(self, name, value):
         """Make a copy of self with variable *name* fixed to *value*."""
@@ -357,9 +372,60 @@ class CodeGenerationState(object):
 # }}}
 
 
-code_gen_cache = WriteOncePersistentDict(
-         "loopy-code-gen-cache-v3-"+DATA_MODEL_VERSION,
-         key_builder=LoopyKeyBuilder())
+# {{{ code generation cache
+
+def _get_code_gen_canonicalization_kwargs(kernel):
+    # Generated code spells out the names of the kernel, its inames and
+    # temporaries, so only instruction ids are made canonical. Those
+    # instruction ids that end up in comments in the generated code are
+    # kept, too.
+
+    from loopy.kernel.instruction import NoOpInstruction
+    fixed_insn_ids = set(
+            insn.id for insn in kernel.instructions
+            if isinstance(insn, NoOpInstruction))
+
+    from loopy.schedule import Barrier
+    from loopy.kernel.tools import _rename_identifiers_in_text
+    insn_ids = set(insn.id for insn in kernel.instructions)
+    for sched_item in kernel.schedule:
+        if isinstance(sched_item, Barrier):
+            _rename_identifiers_in_text(
+                    sched_item.comment,
+                    dict((insn_id, insn_id) for insn_id in insn_ids),
+                    found=fixed_insn_ids)
+
+    return dict(
+            rename_variables=False,
+            rename_kernel_name=False,
+            fixed_insn_ids=frozenset(fixed_insn_ids))
+
+
+def _rename_cached_codegen_result(codegen_result, renaming):
+    id_renames = renaming.insn_ids
+
+    from loopy.tools import LazilyUnpicklingDict
+    implemented_domains = codegen_result.implemented_domains
+    if isinstance(implemented_domains, LazilyUnpicklingDict):
+        # avoid unpickling the values
+        implemented_domains = implemented_domains._map
+
+    new_implemented_domains = dict(
+            (id_renames.get(insn_id, insn_id), domains)
+            for insn_id, domains in six.iteritems(implemented_domains))
+    if len(new_implemented_domains) != len(implemented_domains):
+        return None
+
+    return codegen_result.copy(
+            implemented_domains=LazilyUnpicklingDict(new_implemented_domains))
+
+
+code_gen_cache = RenamingInvariantPersistentDict(
+        "loopy-code-gen-cache-v4-"+DATA_MODEL_VERSION,
+        rename_value=_rename_cached_codegen_result,
+        canonicalization_kwargs=_get_code_gen_canonicalization_kwargs)
+
+# }}}
 
 
 class PreambleInfo(ImmutableRecord):
@@ -374,6 +440,9 @@ class PreambleInfo(ImmutableRecord):
 
 # {{{ main code generation entrypoint
 
+DEFAULT_VERSIONED_INSN_COPIES = 32
+
+
 def generate_code_v2(kernel):
     """
     :returns: a :class:`CodeGenerationResult`
@@ -399,7 +468,7 @@ def generate_code_v2(kernel):
     if CACHING_ENABLED:
         input_kernel = kernel
         try:
-            result = code_gen_cache[input_kernel]
+            result = code_gen_cache[code_gen_cache.make_key(input_kernel)]
             logger.debug("%s: code generation cache hit" % kernel.name)
             return result
         except KeyError:
@@ -415,6 +484,17 @@ def generate_code_v2(kernel):
 
     logger.info("%s: generate code: start" % kernel.name)
 
+    if kernel.options.version_tile_loops:
+        from loopy.codegen.loop import get_tile_versioning_slab_increments
+        max_insn_copies = kernel.options.version_tile_loops
+        if max_insn_copies is True:
+            max_insn_copies = DEFAULT_VERSIONED_INSN_COPIES
+
+        iname_slab_increments = kernel.iname_slab_increments.copy()
+        iname_slab_increments.update(
+                get_tile_versioning_slab_increments(kernel, max_insn_copies))
+        kernel = kernel.copy(iname_slab_increments=iname_slab_increments)
+
     # {{{ examine arg list
 
     from loopy.kernel.data import ValueArg
@@ -519,7 +599,8 @@ def generate_code_v2(kernel):
     logger.info("%s: generate code: done" % kernel.name)
 
     if CACHING_ENABLED:
-        code_gen_cache.store_if_not_present(input_kernel, codegen_result)
+        code_gen_cache.store_if_not_present(
+                code_gen_cache.make_key(input_kernel), codegen_result)
 
     return codegen_result
 
@@ -29,8 +29,12 @@ from loopy.codegen.result import merge_codegen_results
 import islpy as isl
 from islpy import dim_type
 from loopy.codegen.control import build_loop_nest
+from loopy.symbolic import WalkMapper
 from pymbolic.mapper.stringifier import PREC_NONE
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 # {{{ conditional-reducing slab decomposition
 
@@ -114,6 +118,172 @@ def get_slab_decomposition(kernel, iname):
 # }}}
 
 
+# {{{ automatic tile loop versioning
+
+def _is_independent_of(domain, iname, other_iname):
+    """Return whether the range of *other_iname* in *domain* is the same
+    for all values of *iname*.
+    """
+    domain = domain.project_out_except([iname, other_iname], [dim_type.set])
+
+    var_dict = domain.get_var_dict(dim_type.set)
+    box = (
+            domain.eliminate(dim_type.set, var_dict[iname][1], 1)
+            & domain.eliminate(dim_type.set, var_dict[other_iname][1], 1))
+
+    return box.is_subset(domain)
+
+
+def get_versioning_slab_increments(kernel, iname, nested_inames):
+    """Return a tuple ``(head_it_count, tail_it_count)`` for the loop over
+    *iname* (see :attr:`loopy.LoopKernel.iname_slab_increments`), such that
+    the range of some other iname in the loop's domain depends on *iname*,
+    but not within the bulk slab, or *None* if no such increments (of at
+    most one iteration each) exist. All inames whose range depends on
+    *iname* must be among *nested_inames*, the inames of the loops nested
+    within that over *iname*.
+
+    This is the case for the outer iname resulting from
+    :func:`loopy.split_iname` with an inner length that need not divide the
+    loop length.
+    """
+    domain = kernel.get_inames_domain(iname)
+    if domain.is_empty():
+        return None
+
+    bounds = kernel.get_iname_bounds(iname)
+    lower_bound_pw_aff_pieces = bounds.lower_bound_pw_aff.coalesce().get_pieces()
+    upper_bound_pw_aff_pieces = bounds.upper_bound_pw_aff.coalesce().get_pieces()
+    if (len(lower_bound_pw_aff_pieces) != 1
+            or len(upper_bound_pw_aff_pieces) != 1):
+        # not supported by get_slab_decomposition
+        return None
+
+    (_, lower_bound_aff), = lower_bound_pw_aff_pieces
+    (_, upper_bound_aff), = upper_bound_pw_aff_pieces
+
+    all_inames = kernel.all_inames()
+    for bound_aff in [lower_bound_aff, upper_bound_aff]:
+        for i in range(bound_aff.dim(dim_type.param)):
+            if (bound_aff.get_dim_name(dim_type.param, i) in all_inames
+                    and not bound_aff.get_coefficient_val(
+                        dim_type.param, i).is_zero()):
+                # The loop's extent depends on that of an enclosing loop,
+                # so it is not a tile loop.
+                return None
+
+    def intersect_with_assumptions(set_):
+        assumptions = isl.BasicSet.from_params(kernel.assumptions)
+        set_, assumptions = isl.align_two(set_, assumptions)
+        return set_ & assumptions
+
+    other_inames = [
+            other_iname
+            for other_iname in domain.get_var_names(dim_type.set)
+            if other_iname != iname]
+    full_domain = intersect_with_assumptions(domain)
+    dependent_inames = [
+            other_iname
+            for other_iname in other_inames
+            if not _is_independent_of(full_domain, iname, other_iname)]
+
+    if not dependent_inames or not set(dependent_inames) <= nested_inames:
+        return None
+
+    from loopy.isl_helpers import iname_rel_aff
+
+    for lower_incr, upper_incr in [(0, 1), (1, 0), (1, 1)]:
+        bulk_slab = isl.BasicSet.universe(domain.space)
+        if lower_incr:
+            bulk_slab = bulk_slab.add_constraint(
+                    isl.Constraint.inequality_from_aff(
+                        iname_rel_aff(domain.space,
+                            iname, ">=", lower_bound_aff+lower_incr)))
+        if upper_incr:
+            bulk_slab = bulk_slab.add_constraint(
+                    isl.Constraint.inequality_from_aff(
+                        iname_rel_aff(domain.space,
+                            iname, "<=", upper_bound_aff-upper_incr)))
+
+        bulk_domain = intersect_with_assumptions(domain & bulk_slab)
+        if all(
+                _is_independent_of(bulk_domain, iname, other_iname)
+                for other_iname in dependent_inames):
+            return lower_incr, upper_incr
+
+    return None
+
+
+def get_tile_versioning_slab_increments(kernel, max_insn_copies):
+    """Return a mapping from inames of sequential loops to tuples
+    ``(head_it_count, tail_it_count)`` as found by
+    :func:`get_versioning_slab_increments`, for loops whose iname does not
+    already have nonzero slab increments.
+
+    Since each slab of a loop contains a copy of the loop's body, loops are
+    only versioned as long as no instruction would be generated more than
+    *max_insn_copies* times in total. Loops with fewer instructions (which
+    are typically the inner, hotter ones) are considered first.
+
+    See :attr:`loopy.Options.version_tile_loops`.
+    """
+    from loopy.kernel.data import (
+            ForceSequentialTag, InOrderSequentialSequentialTag)
+
+    from loopy.schedule import EnterLoop, LeaveLoop
+
+    # iname -> inames of the loops nested within the loop over it
+    iname_to_nested_inames = {}
+    active_inames = []
+    for sched_item in kernel.schedule:
+        if isinstance(sched_item, EnterLoop):
+            for outer_iname in active_inames:
+                iname_to_nested_inames[outer_iname].add(sched_item.iname)
+            iname_to_nested_inames.setdefault(sched_item.iname, set())
+            active_inames.append(sched_item.iname)
+        elif isinstance(sched_item, LeaveLoop):
+            active_inames.pop()
+
+    candidates = []
+    for iname in sorted(iname_to_nested_inames):
+        if any(kernel.iname_slab_increments.get(iname, (0, 0))):
+            continue
+        if any(
+                not isinstance(tag,
+                    (ForceSequentialTag, InOrderSequentialSequentialTag))
+                for tag in kernel.iname_tags(iname)):
+            continue
+
+        slab_increments = get_versioning_slab_increments(
+                kernel, iname, iname_to_nested_inames[iname])
+        if slab_increments is not None:
+            candidates.append((iname, slab_increments))
+
+    iname_to_insns = kernel.iname_to_insns()
+    candidates.sort(key=lambda item: (len(iname_to_insns[item[0]]), item[0]))
+
+    insn_copies = dict((insn.id, 1) for insn in kernel.instructions)
+    result = {}
+
+    for iname, slab_increments in candidates:
+        nslabs = 1 + sum(1 for incr in slab_increments if incr)
+        body = iname_to_insns[iname]
+
+        if nslabs * sum(insn_copies[insn_id] for insn_id in body) > (
+                max_insn_copies):
+            logger.debug("%s: not versioning loop over '%s' to limit code size"
+                    % (kernel.name, iname))
+            continue
+
+        for insn_id in body:
+            insn_copies[insn_id] *= nslabs
+        result[iname] = slab_increments
+
+    return result
+
+# }}}
+
+
 # {{{ unrolled loops
 
 def generate_unroll_loop(codegen_state, sched_index):
@@ -338,6 +508,160 @@ def set_up_hw_parallel_loops(codegen_state, schedule_index, next_func,
 
 # }}}
 
+# {{{ index strength reduction
+
+
+class _SubscriptCollector(WalkMapper):
+    def __init__(self):
+        self.subscripts = set()
+
+    def map_subscript(self, expr, *args, **kwargs):
+        self.subscripts.add(expr)
+        WalkMapper.map_subscript(self, expr, *args, **kwargs)
+
+
+def get_strength_reduced_subscripts(codegen_state, sched_index, lbound):
+    """For the sequential loop entered at *sched_index* starting at
+    *lbound*, find the flattened array subscripts in the loop body with terms
+    that are affine in the loop's iname with a loop-invariant stride.
+
+    :returns: a tuple ``(strength_reduced_subscripts, offsets)``, where the
+        former is the updated value of
+        :attr:`CodeGenerationState.strength_reduced_subscripts` for the loop
+        body, and *offsets* is a list of tuples ``(offset_name,
+        initial_value, stride)`` of the offset variables to maintain.
+        *initial_value* is a C expression, while *stride* is an expression
+        in terms of the kernel's variables.
+
+    See :attr:`loopy.Options.strength_reduce_index_arithmetic`.
+    """
+    kernel = codegen_state.kernel
+    loop_iname = kernel.schedule[sched_index].iname
+
+    from loopy.schedule import get_insn_ids_for_block_at
+    from loopy.kernel.data import (
+            ArrayArg, ConstantArg, TemporaryVariable, ValueArg, VectorizeTag,
+            MultiAssignmentBase)
+    from loopy.kernel.array import get_access_info
+    from loopy.symbolic import (
+            simplify_using_aff, get_dependencies, CoefficientCollector,
+            SubstitutionMapper)
+    from pymbolic import evaluate, var
+    from pymbolic.mapper.substitutor import make_subst_func
+    from pymbolic.primitives import Sum, Variable, flattened_sum
+
+    from loopy.codegen.bounds import get_usable_inames_for_conditional
+    invariant_names = (
+            get_usable_inames_for_conditional(kernel, sched_index)
+            | frozenset(
+                arg.name for arg in kernel.args if isinstance(arg, ValueArg)))
+
+    # {{{ gather subscripts
+
+    collector = _SubscriptCollector()
+    for insn_id in get_insn_ids_for_block_at(kernel.schedule, sched_index):
+        insn = kernel.id_to_insn[insn_id]
+        if not isinstance(insn, MultiAssignmentBase):
+            continue
+        if kernel.iname_tags_of_type(kernel.insn_inames(insn), VectorizeTag):
+            continue
+
+        for expr in insn.assignees + (insn.expression,) + tuple(insn.predicates):
+            collector(expr)
+
+    subscripts = set()
+    for expr in collector.subscripts:
+        if not isinstance(expr.aggregate, Variable):
+            continue
+
+        ary = kernel.arg_dict.get(expr.aggregate.name)
+        if ary is None:
+            ary = kernel.temporary_variables.get(expr.aggregate.name)
+        if not isinstance(ary, (ArrayArg, ConstantArg, TemporaryVariable)):
+            continue
+
+        index_tuple = tuple(
+                simplify_using_aff(kernel, idx) for idx in expr.index_tuple)
+
+        try:
+            access_info = get_access_info(kernel.target, ary, index_tuple,
+                    lambda expr: evaluate(expr, codegen_state.var_subst_map),
+                    None)
+        except LoopyError:
+            continue
+
+        if (access_info.vector_index is not None
+                or len(access_info.subscripts) != 1):
+            continue
+
+        subscript, = access_info.subscripts
+        subscripts.add((access_info.array_name, subscript))
+
+    # }}}
+
+    ecm = codegen_state.expression_to_code_mapper
+    subst_mapper = SubstitutionMapper(make_subst_func({loop_iname: lbound}))
+
+    strength_reduced_subscripts = codegen_state.strength_reduced_subscripts.copy()
+    offsets = []
+
+    for array_name, subscript in sorted(subscripts, key=str):
+        terms = subscript.children if isinstance(subscript, Sum) else (subscript,)
+
+        offset_terms = set()
+        stride = 0
+
+        for i, term in enumerate(terms):
+            deps = get_dependencies(term)
+
+            if loop_iname in deps:
+                if not deps <= invariant_names | frozenset([loop_iname]):
+                    break
+
+                try:
+                    coeffs = CoefficientCollector([loop_iname])(term)
+                except (RuntimeError, ValueError, LoopyError):
+                    # not affine
+                    break
+
+                stride = stride + coeffs.get(var(loop_iname), 0)
+                offset_terms.add(i)
+
+            elif deps <= invariant_names:
+                offset_terms.add(i)
+
+        else:
+            if stride == 0:
+                continue
+
+            offset_name = codegen_state.var_name_generator(
+                    "%s_%s_offset" % (array_name, loop_iname))
+
+            # Start from the offset maintained by the enclosing loop, if any.
+            outer_offset_name, outer_offset_terms = (
+                    codegen_state.strength_reduced_subscripts.get(
+                        (array_name, subscript), (None, frozenset())))
+            if not outer_offset_terms <= offset_terms:
+                outer_offset_name, outer_offset_terms = None, frozenset()
+
+            initial_value = simplify_using_aff(
+                    kernel,
+                    ecm.rec(
+                        subst_mapper(flattened_sum(tuple(
+                            terms[i] for i in sorted(offset_terms)
+                            if i not in outer_offset_terms))),
+                        "i"))
+            if outer_offset_name is not None:
+                initial_value = var(outer_offset_name) + initial_value
+
+            strength_reduced_subscripts[array_name, subscript] = (
+                    offset_name, frozenset(offset_terms))
+            offsets.append((offset_name, initial_value, stride))
+
+    return strength_reduced_subscripts, offsets
+
+# }}}
+
 
 # {{{ sequential loop
 
@@ -433,6 +757,26 @@ def generate_sequential_loop_dim_code(codegen_state, sched_index):
                 .copy(kernel=intersect_kernel_with_slab(
                     kernel, slab, loop_iname)))
 
+        astb = codegen_state.ast_builder
+
+        from loopy.symbolic import pw_aff_to_expr
+        from loopy.isl_helpers import simplify_pw_aff
+        from loopy.target.c import CFamilyASTBuilder
+
+        is_single_trip = impl_ubound.is_equal(impl_lbound)
+        lbound_expr = pw_aff_to_expr(simplify_pw_aff(lbound, kernel.assumptions))
+
+        offsets = []
+        if (not is_single_trip
+                and kernel.options.strength_reduce_index_arithmetic
+                and isinstance(astb, CFamilyASTBuilder)
+                and codegen_state.vectorization_info is None):
+            strength_reduced_subscripts, offsets = \
+                    get_strength_reduced_subscripts(
+                            new_codegen_state, sched_index, lbound_expr)
+            new_codegen_state = new_codegen_state.copy(
+                    strength_reduced_subscripts=strength_reduced_subscripts)
+
         inner = build_loop_nest(new_codegen_state, sched_index+1)
 
         # }}}
@@ -440,11 +784,7 @@ def generate_sequential_loop_dim_code(codegen_state, sched_index):
         if cmt is not None:
             result.append(codegen_state.ast_builder.emit_comment(cmt))
 
-        astb = codegen_state.ast_builder
-
-        from loopy.symbolic import pw_aff_to_expr
-
-        if impl_ubound.is_equal(impl_lbound):
+        if is_single_trip:
             # single-trip, generate just a variable assignment, not a loop
             inner = merge_codegen_results(codegen_state, [
                 astb.emit_initializer(
@@ -464,16 +804,45 @@ def generate_sequential_loop_dim_code(codegen_state, sched_index):
         else:
             inner_ast = inner.current_ast(codegen_state)
 
-            from loopy.isl_helpers import simplify_pw_aff
-
-            result.append(
-                inner.with_new_ast(
-                    codegen_state,
-                    astb.emit_sequential_loop(
+            if offsets:
+                from cgen import Statement
+                increments = [
+                        Statement("%s += %s" % (
+                            offset_name, ecm(stride, PREC_NONE, "i")))
+                        for offset_name, _, stride in offsets]
+                if isinstance(inner_ast, astb.ast_block_class):
+                    inner_ast = astb.ast_block_class(
+                            inner_ast.contents + increments)
+                else:
+                    inner_ast = astb.ast_block_class([inner_ast] + increments)
+
+            ubound_expr = pw_aff_to_expr(
+                    simplify_pw_aff(ubound, kernel.assumptions))
+
+            loop_ast = None
+            if not offsets:
+                loop_ast = astb.emit_array_sequential_loop(
+                        new_codegen_state, sched_index,
+                        lbound_expr, ubound_expr, inner_ast)
+
+            if loop_ast is None:
+                loop_ast = astb.emit_sequential_loop(
                         codegen_state, loop_iname, kernel.index_dtype,
-                        pw_aff_to_expr(simplify_pw_aff(lbound, kernel.assumptions)),
-                        pw_aff_to_expr(simplify_pw_aff(ubound, kernel.assumptions)),
-                        inner_ast)))
+                        lbound_expr, ubound_expr, inner_ast)
+
+            if offsets:
+                from loopy.target.c import CExpression
+                loop_ast = astb.ast_block_scope_class([
+                    astb.emit_initializer(
+                        codegen_state, kernel.index_dtype, offset_name,
+                        CExpression(
+                            astb.get_c_expression_to_code_mapper(),
+                            initial_value),
+                        is_const=False)
+                    for offset_name, initial_value, _ in offsets]
+                    + [loop_ast])
+
+            result.append(inner.with_new_ast(codegen_state, loop_ast))
 
     return merge_codegen_results(codegen_state, result)
 
@@ -23,6 +23,9 @@ THE SOFTWARE.
 """
 
 
+import threading
+from contextlib import contextmanager
+
 from pytools import MovedFunctionDeprecationWrapper
 
 
@@ -50,6 +53,55 @@ class WriteRaceConditionWarning(LoopyWarning):
 # }}}
 
 
+# {{{ recording warnings
+
+_warning_recorders = threading.local()
+
+
+def _get_warning_recorders():
+    try:
+        return _warning_recorders.stack
+    except AttributeError:
+        _warning_recorders.stack = []
+        return _warning_recorders.stack
+
+
+@contextmanager
+def record_kernel_warnings():
+    """Return a context manager recording the warnings issued (in the
+    current thread) by :func:`warn_with_kernel` and
+    :func:`reissue_kernel_warnings` within it, as tuples *(message,
+    category)*, into the list it returns. The warnings are still issued as
+    usual.
+    """
+    recorders = _get_warning_recorders()
+    result = []
+    recorders.append(result)
+    try:
+        yield result
+    finally:
+        # by identity, recorders may compare equal
+        del recorders[[id(r) for r in recorders].index(id(result))]
+
+
+def _record_kernel_warning(message, category):
+    for recorder in _get_warning_recorders():
+        recorder.append((message, category))
+
+
+def reissue_kernel_warnings(recorded_warnings, stacklevel=2):
+    """Issue the warnings in *recorded_warnings* (as recorded by
+    :func:`record_kernel_warnings`) again, for instance when retrieving the
+    result of an operation that issued them from a cache.
+    """
+    from warnings import warn
+    for message, category in recorded_warnings:
+        _record_kernel_warning(message, category)
+        warn(message, category, stacklevel=stacklevel+1)
+
+# }}}
+
+
 def warn_with_kernel(kernel, id, text, type=LoopyWarning):
     from fnmatch import fnmatchcase
     for sw in kernel.silenced_warnings:
@@ -59,8 +111,11 @@ def warn_with_kernel(kernel, id, text, type=LoopyWarning):
     text += (" (add '%s' to silenced_warnings kernel attribute to disable)"
             % id)
 
+    message = "in kernel %s: %s" % (kernel.name, text)
+    _record_kernel_warning(message, type)
+
     from warnings import warn
-    warn("in kernel %s: %s" % (kernel.name, text), type, stacklevel=2)
+    warn(message, type, stacklevel=2)
 
 
 warn = MovedFunctionDeprecationWrapper(warn_with_kernel)
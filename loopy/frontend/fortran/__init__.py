@@ -22,7 +22,40 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
-from loopy.diagnostic import LoopyError
+from loopy.diagnostic import (
+        LoopyError, record_kernel_warnings, reissue_kernel_warnings)
+from loopy.tools import LoopyPersistentDict
+from loopy.version import DATA_MODEL_VERSION
+
+
+# {{{ frontend cache
+
+fortran_frontend_cache = LoopyPersistentDict(
+        "loopy-fortran-frontend-cache-v2-"+DATA_MODEL_VERSION)
+
+
+def _get_frontend_cache_key(*args):
+    """Return a key for :data:`fortran_frontend_cache` describing *args*, or
+    *None* if caching is disabled or *args* cannot be hashed persistently.
+    """
+    from loopy import CACHING_ENABLED
+    if not CACHING_ENABLED:
+        return None
+
+    try:
+        return fortran_frontend_cache.key_builder(args)
+    except (TypeError, ValueError):
+        return None
+
+
+def _get_default_target(target):
+    if target is None:
+        from loopy import _DEFAULT_TARGET
+        target = _DEFAULT_TARGET
+
+    return target
+
+# }}}
 
 
 def c_preprocess(source, defines=None, filename=None, include_paths=None):
@@ -157,6 +190,15 @@ def parse_transformed_fortran(source, free_form=True, strict=True,
     The transform code must define ``RESULT``, conventionally a list of
     kernels, which is returned from this function unmodified.
 
+    If ``RESULT`` is a list or tuple of kernels, it is cached persistently,
+    keyed on *source*, *filename*, *pre_transform_code*,
+    *transform_code_context* (which must then consist of persistently
+    hashable values) and the default target. Modules imported by the
+    transform code are not part of the key--clear the cache (see
+    :mod:`loopy.cache`) after changing them. As for :func:`loopy.make_kernel`,
+    warnings about the kernels issued by the transform code are issued
+    again when the result is retrieved from the cache.
+
     An example of *source* may look as follows::
 
         subroutine fill(out, a, n)
@@ -180,6 +222,21 @@ def parse_transformed_fortran(source, free_form=True, strict=True,
         !$loopy end
     """
 
+    cache_key = _get_frontend_cache_key(
+            "transformed", source, filename, pre_transform_code,
+            transform_code_context, _get_default_target(None))
+
+    if cache_key is not None:
+        try:
+            result, cached_warnings = fortran_frontend_cache[cache_key]
+        except KeyError:
+            pass
+        else:
+            reissue_kernel_warnings(cached_warnings)
+
+            from loopy.kernel.creation import _restore_cached_kernel
+            return type(result)(_restore_cached_kernel(knl) for knl in result)
+
     source, transform_code = _extract_loopy_lines(source)
     if not transform_code:
         raise LoopyError("no transform code found")
@@ -219,13 +276,14 @@ def parse_transformed_fortran(source, free_form=True, strict=True,
         if infile_dirname:
             sys.path = prev_sys_path + [infile_dirname]
 
-        if pre_transform_code is not None:
-            proc_dict["_MODULE_SOURCE_CODE"] = pre_transform_code
-            exec(compile(pre_transform_code,
-                "<loopy pre-transform code>", "exec"), proc_dict)
+        with record_kernel_warnings() as transform_warnings:
+            if pre_transform_code is not None:
+                proc_dict["_MODULE_SOURCE_CODE"] = pre_transform_code
+                exec(compile(pre_transform_code,
+                    "<loopy pre-transform code>", "exec"), proc_dict)
 
-        proc_dict["_MODULE_SOURCE_CODE"] = transform_code
-        exec(compile(transform_code, filename, "exec"), proc_dict)
+            proc_dict["_MODULE_SOURCE_CODE"] = transform_code
+            exec(compile(transform_code, filename, "exec"), proc_dict)
 
     finally:
         sys.path = prev_sys_path
@@ -233,13 +291,54 @@ def parse_transformed_fortran(source, free_form=True, strict=True,
     if "RESULT" not in proc_dict:
         raise LoopyError("transform code did not set RESULT")
 
-    return proc_dict["RESULT"]
+    result = proc_dict["RESULT"]
+
+    from loopy.kernel import LoopKernel
+    if (cache_key is not None
+            and isinstance(result, (list, tuple))
+            and all(isinstance(knl, LoopKernel) for knl in result)):
+        fortran_frontend_cache.store_if_not_present(
+                cache_key, (result, transform_warnings))
+
+    return result
+
+
+_FPARSER_LOG_HANDLER = None
+
+
+def _add_fparser_log_handler():
+    global _FPARSER_LOG_HANDLER
+
+    if _FPARSER_LOG_HANDLER is not None:
+        return
+
+    import logging
+    console = logging.StreamHandler()
+    console.setLevel(logging.INFO)
+    formatter = logging.Formatter('%(name)-12s: %(levelname)-8s %(message)s')
+    console.setFormatter(formatter)
+    logging.getLogger('fparser').addHandler(console)
+
+    _FPARSER_LOG_HANDLER = console
 
 
 def parse_fortran(source, filename="<floopy code>", free_form=True, strict=True,
-        seq_dependencies=None, auto_dependencies=None, target=None):
+        seq_dependencies=None, auto_dependencies=None, target=None,
+        max_workers=None):
     """
+    :arg max_workers: If greater than one, the kernels for the subroutines
+        in *source* are created in up to this many worker processes.
     :returns: a list of :class:`loopy.LoopKernel` objects
+
+    The result is cached persistently, keyed on *source* and the remaining
+    arguments that influence the translation. As for
+    :func:`loopy.make_kernel`, warnings issued while creating the kernels
+    are issued again when they are retrieved from the cache, except for
+    those issued in worker processes.
+
+    .. versionchanged:: 2019.1
+
+        Added *max_workers* and persistent caching.
     """
 
     if seq_dependencies is not None and auto_dependencies is not None:
@@ -254,12 +353,24 @@ def parse_fortran(source, filename="<floopy code>", free_form=True, strict=True,
     if seq_dependencies is None:
         seq_dependencies = True
 
-    import logging
-    console = logging.StreamHandler()
-    console.setLevel(logging.INFO)
-    formatter = logging.Formatter('%(name)-12s: %(levelname)-8s %(message)s')
-    console.setFormatter(formatter)
-    logging.getLogger('fparser').addHandler(console)
+    target = _get_default_target(target)
+
+    cache_key = _get_frontend_cache_key(
+            "parse", source, filename, free_form, strict, seq_dependencies,
+            target)
+
+    if cache_key is not None:
+        try:
+            result, cached_warnings = fortran_frontend_cache[cache_key]
+        except KeyError:
+            pass
+        else:
+            reissue_kernel_warnings(cached_warnings)
+
+            from loopy.kernel.creation import _restore_cached_kernel
+            return [_restore_cached_kernel(knl, target) for knl in result]
+
+    _add_fparser_log_handler()
 
     from fparser import api
     tree = api.parse(source, isfree=free_form, isstrict=strict,
@@ -273,7 +384,15 @@ def parse_fortran(source, filename="<floopy code>", free_form=True, strict=True,
     f2loopy = F2LoopyTranslator(filename, target=target)
     f2loopy(tree)
 
-    return f2loopy.make_kernels(seq_dependencies=seq_dependencies)
+    with record_kernel_warnings() as creation_warnings:
+        result = f2loopy.make_kernels(seq_dependencies=seq_dependencies,
+                max_workers=max_workers)
+
+    if cache_key is not None:
+        fortran_frontend_cache.store_if_not_present(
+                cache_key, (result, creation_warnings))
+
+    return result
 
 
 # vim: foldmethod=marker
@@ -664,8 +664,13 @@ class F2LoopyTranslator(FTreeWalkerBase):
 
     # }}}
 
-    def make_kernels(self, seq_dependencies):
-        result = []
+    def make_kernels(self, seq_dependencies, max_workers=None):
+        """
+        :arg max_workers: If greater than one, the kernels for the
+            translated subroutines are created in up to this many worker
+            processes.
+        """
+        make_kernel_args = []
 
         for sub in self.kernels:
             # {{{ figure out arguments
@@ -706,26 +711,73 @@ class F2LoopyTranslator(FTreeWalkerBase):
 
             # }}}
 
-            from loopy.version import MOST_RECENT_LANGUAGE_VERSION
-            knl = lp.make_kernel(
-                    sub.index_sets,
-                    sub.instructions,
-                    kernel_data,
-                    name=sub.subprogram_name,
-                    default_order="F",
-                    index_dtype=self.index_dtype,
-                    target=self.target,
-                    seq_dependencies=seq_dependencies,
-                    lang_version=MOST_RECENT_LANGUAGE_VERSION
-                    )
-
-            from loopy.loop import fuse_loop_domains
-            knl = fuse_loop_domains(knl)
-            knl = lp.fold_constants(knl)
-
-            result.append(knl)
-
-        return result
+            make_kernel_args.append((
+                    sub.index_sets, sub.instructions, kernel_data,
+                    sub.subprogram_name, self.index_dtype, self.target,
+                    seq_dependencies))
+
+        if max_workers is None or max_workers <= 1 or len(make_kernel_args) <= 1:
+            return [_make_kernel_for_subprogram(args)
+                    for args in make_kernel_args]
+
+        # Types can only be pickled (for the worker processes) along with
+        # their target.
+        target = self.target
+        if target is None:
+            from loopy import _DEFAULT_TARGET
+            target = _DEFAULT_TARGET
+
+        def with_target(kernel_data):
+            return [
+                    data.copy(dtype=data.dtype.with_target(target))
+                    if data.dtype not in [None, lp.auto]
+                    and data.dtype.target is None
+                    else data
+                    for data in kernel_data]
+
+        make_kernel_args = [
+                (domains, instructions, with_target(kernel_data), name,
+                    index_dtype, target, seq_dependencies)
+                for (domains, instructions, kernel_data, name, index_dtype, _,
+                    seq_dependencies) in make_kernel_args]
+
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(
+                max_workers=min(max_workers, len(make_kernel_args))) as executor:
+            return list(executor.map(
+                _make_kernel_for_subprogram, make_kernel_args))
+
+# }}}
+
+
+# {{{ kernel creation
+
+def _make_kernel_for_subprogram(args):
+    """Create the kernel for one translated subroutine. Kept at module level
+    (and taking a single, picklable argument) so that it may be run in a
+    worker process.
+    """
+    (domains, instructions, kernel_data, name, index_dtype, target,
+            seq_dependencies) = args
+
+    from loopy.version import MOST_RECENT_LANGUAGE_VERSION
+    knl = lp.make_kernel(
+            domains,
+            instructions,
+            kernel_data,
+            name=name,
+            default_order="F",
+            index_dtype=index_dtype,
+            target=target,
+            seq_dependencies=seq_dependencies,
+            lang_version=MOST_RECENT_LANGUAGE_VERSION
+            )
+
+    from loopy.loop import fuse_loop_domains
+    knl = fuse_loop_domains(knl)
+    knl = lp.fold_constants(knl)
+
+    return knl
 
 # }}}
 
@@ -35,6 +35,8 @@ from loopy.kernel.data import (
         MultiAssignmentBase, Assignment,
         SubstitutionRule)
 from loopy.diagnostic import LoopyError, warn_with_kernel
+from loopy.tools import LoopyPersistentDict
+from loopy.version import DATA_MODEL_VERSION
 import islpy as isl
 from islpy import dim_type
 from pytools import ProcessLogger
@@ -1819,8 +1821,68 @@ def apply_single_writer_depencency_heuristic(kernel, warn_if_used=True):
 # }}}
 
 
+# {{{ creation cache
+
+creation_cache = LoopyPersistentDict(
+        "loopy-creation-cache-v2-"+DATA_MODEL_VERSION)
+
+
+def _get_creation_cache_key(domains, instructions, kernel_data, kwargs):
+    """Return a key for :data:`creation_cache` describing the arguments of
+    :func:`make_kernel`, or *None* if they cannot be hashed persistently
+    (for example, because they include functions).
+    """
+    try:
+        return creation_cache.key_builder(
+                (domains, instructions, kernel_data, kwargs))
+    except (TypeError, ValueError):
+        return None
+
+
+def _record_creation_warnings(func):
+    """Decorate :func:`make_kernel` to record the warnings issued during
+    kernel creation by means of :func:`loopy.diagnostic.warn_with_kernel`,
+    so that they can be issued again when the kernel is retrieved from
+    :data:`creation_cache`. The list of recorded warnings is passed as the
+    keyword argument *_creation_warnings*.
+    """
+    from functools import wraps
+
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        from loopy.diagnostic import record_kernel_warnings
+        with record_kernel_warnings() as creation_warnings:
+            return func(*args, _creation_warnings=creation_warnings, **kwargs)
+
+    return wrapper
+
+
+def _restore_cached_kernel(kernel, target=None):
+    """Prepare *kernel*, as retrieved from a persistent cache of newly
+    created kernels, for transformation.
+
+    :arg target: If not *None*, replaces the target of *kernel*. Targets are
+        only cached by their persistent hash, while the one passed may carry
+        state (such as a compiler) of its own.
+    """
+    if target is None:
+        target = kernel.target
+
+    # Transformations expect a plain list of instructions rather than the
+    # lazily unpickled one, and must not inherit the written variables
+    # recorded at pickling time.
+    from loopy.preprocess import prepare_for_caching
+    return prepare_for_caching(kernel.copy(
+        instructions=list(kernel.instructions),
+        target=target,
+        _cached_written_variables=None))
+
+# }}}
+
+
 # {{{ kernel creation top-level
 
+@_record_creation_warnings
 def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
     """User-facing kernel creation entrypoint.
 
@@ -1938,6 +2000,9 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
             logger,
             "%s: instantiate" % kwargs.get("name", "(unnamed)"))
 
+    creation_warnings = kwargs.pop("_creation_warnings")
+    orig_kwargs = kwargs.copy()
+
     defines = kwargs.pop("defines", {})
     default_order = kwargs.pop("default_order", "C")
     default_offset = kwargs.pop("default_offset", 0)
@@ -1952,7 +2017,7 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
         from warnings import warn
         warn("'defines' argument to make_kernel is deprecated. "
                 "Use lp.fix_parameters instead",
-                DeprecationWarning, stacklevel=2)
+                DeprecationWarning, stacklevel=3)
 
     if target is None:
         from loopy import _DEFAULT_TARGET
@@ -1964,7 +2029,7 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
 
         from warnings import warn
         warn("'flags' is deprecated. Use 'options' instead",
-                DeprecationWarning, stacklevel=2)
+                DeprecationWarning, stacklevel=3)
         options = flags
 
     from loopy.options import make_options
@@ -1984,7 +2049,8 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
 
         # This *is* gross. But it seems like the right thing interface-wise.
         import inspect
-        caller_globals = inspect.currentframe().f_back.f_globals
+        # (skipping the frame of the wrapper recording creation warnings)
+        caller_globals = inspect.currentframe().f_back.f_back.f_globals
 
         for ver_sym in LANGUAGE_VERSION_SYMBOLS:
             try:
@@ -2011,12 +2077,38 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
                         ver=MOST_RECENT_LANGUAGE_VERSION,
                         sym_ver=version_to_symbol[MOST_RECENT_LANGUAGE_VERSION]
                         ),
-                    LoopyWarning, stacklevel=2)
+                    LoopyWarning, stacklevel=3)
 
             lang_version = FALLBACK_LANGUAGE_VERSION
 
     if lang_version not in version_to_symbol:
         raise LoopyError("Language version '%s' is not known." % (lang_version,))
+
+    # {{{ cache retrieval
+
+    from loopy import CACHING_ENABLED
+
+    cache_key = None
+    if CACHING_ENABLED:
+        orig_kwargs.update(lang_version=lang_version, target=target)
+        cache_key = _get_creation_cache_key(
+                domains, instructions, kernel_data, orig_kwargs)
+
+    if cache_key is not None:
+        try:
+            result, cached_warnings = creation_cache[cache_key]
+        except KeyError:
+            pass
+        else:
+            logger.debug("%s: creation cache hit" % result.name)
+
+            from loopy.diagnostic import reissue_kernel_warnings
+            reissue_kernel_warnings(cached_warnings, stacklevel=3)
+
+            creation_plog.done()
+            return _restore_cached_kernel(result, target)
+
+    # }}}
     if lang_version >= (2018, 1):
         options = options.copy(enforce_variable_access_ordered=True)
     if lang_version >= (2018, 2):
@@ -2166,6 +2258,10 @@ def make_kernel(domains, instructions, kernel_data=["..."], **kwargs):
     from loopy.kernel.tools import infer_arg_is_output_only
     knl = infer_arg_is_output_only(knl)
 
+    if cache_key is not None:
+        creation_cache.store_if_not_present(
+                cache_key, (knl, list(creation_warnings)))
+
     return knl
 
 # }}}
@@ -1885,4 +1885,413 @@ def infer_arg_is_output_only(kernel):
 
 # }}}
 
+
+# {{{ identifier renaming and canonicalization
+
+class IdentifierRenaming(object):
+    """A simultaneous renaming of the inames, temporary variables and
+    instruction ids, and of the name of a kernel. Each attribute maps old
+    names to new names, names not present are left unchanged.
+
+    .. attribute:: inames
+    .. attribute:: temporaries
+    .. attribute:: insn_ids
+    .. attribute:: kernel_name
+
+    .. automethod:: is_identity
+    .. automethod:: inverted
+    .. automethod:: then
+    """
+
+    fields = ("inames", "temporaries", "insn_ids", "kernel_name")
+
+    def __init__(self, inames=None, temporaries=None, insn_ids=None,
+            kernel_name=None):
+        self.inames = inames or {}
+        self.temporaries = temporaries or {}
+        self.insn_ids = insn_ids or {}
+        self.kernel_name = kernel_name or {}
+
+    def is_identity(self):
+        return all(
+                old == new
+                for field in self.fields
+                for old, new in six.iteritems(getattr(self, field)))
+
+    def inverted(self):
+        return IdentifierRenaming(**dict(
+            (field, dict(
+                (new, old)
+                for old, new in six.iteritems(getattr(self, field))))
+            for field in self.fields))
+
+    def then(self, other):
+        """Return the renaming that results from applying *self*, then
+        *other*.
+        """
+        def compose(first, second):
+            result = dict(
+                    (old, second.get(new, new))
+                    for old, new in six.iteritems(first))
+            for old, new in six.iteritems(second):
+                result.setdefault(old, new)
+            return dict(
+                    (old, new)
+                    for old, new in six.iteritems(result)
+                    if old != new)
+
+        return IdentifierRenaming(**dict(
+            (field, compose(getattr(self, field), getattr(other, field)))
+            for field in self.fields))
+
+    def update_persistent_hash(self, key_hash, key_builder):
+        for field in self.fields:
+            key_builder.rec(key_hash, getattr(self, field))
+
+    def __eq__(self, other):
+        return (type(self) is type(other)
+                and all(getattr(self, field) == getattr(other, field)
+                    for field in self.fields))
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+
+def _rename_identifiers_in_text(text, renames, found=None):
+    """Rename whole-word occurrences of the keys of *renames* in *text*.
+    If *found* is given, the names that occur in *text* are added to it.
+    """
+    if not renames:
+        return text
+
+    def replace(match):
+        name = match.group(1)
+        if found is not None:
+            found.add(name)
+        return renames[name]
+
+    import re
+    return re.sub(
+            r"\b(%s)\b" % "|".join(
+                re.escape(name)
+                for name in sorted(renames, key=len, reverse=True)),
+            replace,
+            text)
+
+
+def rename_identifiers(kernel, renaming):
+    """Return a copy of *kernel* with identifiers renamed according to the
+    :class:`IdentifierRenaming` *renaming*. The schedule of *kernel*, if
+    present, is renamed as well.
+
+    The caller is responsible for making sure that the new names do not
+    clash with any existing names.
+    """
+    if renaming.is_identity():
+        return kernel
+
+    from loopy.symbolic import IdentityMapper, TaggedVariable
+    from pymbolic.primitives import Variable
+
+    var_renames = dict(renaming.inames)
+    var_renames.update(renaming.temporaries)
+    iname_renames = renaming.inames
+    id_renames = renaming.insn_ids
+
+    class IdentifierRenamer(IdentityMapper):
+        def map_variable(self, expr, *args, **kwargs):
+            new_name = var_renames.get(expr.name)
+            if new_name is None:
+                return expr
+            return Variable(new_name)
+
+        def map_tagged_variable(self, expr, *args, **kwargs):
+            new_name = var_renames.get(expr.name)
+            if new_name is None:
+                return expr
+            return TaggedVariable(new_name, expr.tag)
+
+    renamer = IdentifierRenamer()
+
+    def rename_inames(inames):
+        return type(inames)(iname_renames.get(iname, iname) for iname in inames)
+
+    def rename_ids(ids):
+        return type(ids)(id_renames.get(insn_id, insn_id) for insn_id in ids)
+
+    def rename_atomicity(atomicity):
+        if atomicity.var_name not in var_renames:
+            return atomicity
+        from copy import copy
+        atomicity = copy(atomicity)
+        atomicity.var_name = var_renames[atomicity.var_name]
+        return atomicity
+
+    # {{{ domains
+
+    new_domains = []
+    for dom in kernel.domains:
+        for dt in [dim_type.set, dim_type.param]:
+            for i in range(dom.dim(dt)):
+                new_name = iname_renames.get(dom.get_dim_name(dt, i))
+                if new_name is not None:
+                    dom = dom.set_dim_name(dt, i, new_name)
+        new_domains.append(dom)
+
+    # }}}
+
+    # {{{ instructions
+
+    new_insns = []
+    for insn in kernel.instructions:
+        insn = insn.with_transformed_expressions(renamer)
+        insn = insn.copy(
+                id=id_renames.get(insn.id, insn.id),
+                depends_on=rename_ids(insn.depends_on),
+                no_sync_with=frozenset(
+                    (id_renames.get(insn_id, insn_id), scope)
+                    for insn_id, scope in insn.no_sync_with),
+                within_inames=rename_inames(insn.within_inames))
+        if insn.boostable_into is not None:
+            insn = insn.copy(boostable_into=rename_ids(insn.boostable_into))
+        if getattr(insn, "atomicity", ()):
+            insn = insn.copy(atomicity=tuple(
+                rename_atomicity(atomicity) for atomicity in insn.atomicity))
+        new_insns.append(insn)
+
+    # }}}
+
+    # {{{ temporaries
+
+    new_temporaries = {}
+    for tv in six.itervalues(kernel.temporary_variables):
+        tv = tv.copy(
+                name=renaming.temporaries.get(tv.name, tv.name),
+                base_storage=renaming.temporaries.get(
+                    tv.base_storage, tv.base_storage))
+        new_temporaries[tv.name] = tv
+
+    # }}}
+
+    # {{{ schedule
+
+    old_name = kernel.name
+    new_name = renaming.kernel_name.get(old_name, old_name)
+
+    def rename_subkernel(subkernel_name):
+        if subkernel_name.startswith(old_name):
+            return new_name + subkernel_name[len(old_name):]
+        return subkernel_name
+
+    new_schedule = kernel.schedule
+    if new_schedule is not None:
+        from loopy.schedule import (
+                EnterLoop, LeaveLoop, RunInstruction, CallKernel,
+                ReturnFromKernel, Barrier)
+
+        comment_renames = dict(var_renames)
+        comment_renames.update(id_renames)
+
+        new_schedule = []
+        for sched_item in kernel.schedule:
+            if isinstance(sched_item, (EnterLoop, LeaveLoop)):
+                sched_item = sched_item.copy(
+                        iname=iname_renames.get(
+                            sched_item.iname, sched_item.iname))
+            elif isinstance(sched_item, RunInstruction):
+                sched_item = sched_item.copy(
+                        insn_id=id_renames.get(
+                            sched_item.insn_id, sched_item.insn_id))
+            elif isinstance(sched_item, CallKernel):
+                sched_item = sched_item.copy(
+                        kernel_name=rename_subkernel(sched_item.kernel_name),
+                        extra_args=[
+                            var_renames.get(arg, arg)
+                            for arg in sched_item.extra_args],
+                        extra_inames=rename_inames(sched_item.extra_inames))
+            elif isinstance(sched_item, ReturnFromKernel):
+                sched_item = sched_item.copy(
+                        kernel_name=rename_subkernel(sched_item.kernel_name))
+            elif isinstance(sched_item, Barrier):
+                sched_item = sched_item.copy(
+                        comment=_rename_identifiers_in_text(
+                            sched_item.comment, comment_renames),
+                        originating_insn_id=id_renames.get(
+                            sched_item.originating_insn_id,
+                            sched_item.originating_insn_id))
+            new_schedule.append(sched_item)
+
+    # }}}
+
+    def rename_silenced_warning(warning):
+        # e.g. write_race(insn_id)
+        if warning.endswith(")") and "(" in warning:
+            prefix, _, arg = warning[:-1].partition("(")
+            if arg in id_renames:
+                return "%s(%s)" % (prefix, id_renames[arg])
+        return warning
+
+    return kernel.copy(
+            name=new_name,
+            domains=new_domains,
+            instructions=new_insns,
+            temporary_variables=new_temporaries,
+            schedule=new_schedule,
+            iname_to_tags=dict(
+                (iname_renames.get(iname, iname), tags)
+                for iname, tags in six.iteritems(kernel.iname_to_tags)),
+            iname_slab_increments=dict(
+                (iname_renames.get(iname, iname), incr)
+                for iname, incr in six.iteritems(
+                    kernel.iname_slab_increments)),
+            loop_priority=frozenset(
+                tuple(iname_renames.get(iname, iname) for iname in prio)
+                for prio in kernel.loop_priority),
+            substitutions=dict(
+                (rule_name, rule.copy(expression=renamer(rule.expression)))
+                for rule_name, rule in six.iteritems(kernel.substitutions)),
+            applied_iname_rewrites=[
+                dict(
+                    (iname_renames.get(iname, iname), renamer(expr))
+                    for iname, expr in six.iteritems(rewrite))
+                for rewrite in kernel.applied_iname_rewrites],
+            silenced_warnings=[
+                rename_silenced_warning(w) for w in kernel.silenced_warnings])
+
+
+def rename_identifiers_if_unambiguous(kernel, renaming):
+    """Like :func:`rename_identifiers`, but return *None* if *renaming*
+    would map two distinct identifiers of *kernel* to the same name.
+    """
+    var_renames = dict(renaming.inames)
+    var_renames.update(renaming.temporaries)
+
+    old_name = kernel.name
+    new_name = renaming.kernel_name.get(old_name, old_name)
+
+    def rename_kernel_name(name):
+        if name.startswith(old_name):
+            return new_name + name[len(old_name):]
+        return name
+
+    _, _, insn_ids, kernel_names = get_kernel_identifiers(kernel)
+
+    for names, renames in [
+            (kernel.all_variable_names(), var_renames.get),
+            (insn_ids, renaming.insn_ids.get),
+            ]:
+        if len(set(renames(name, name) for name in names)) != len(set(names)):
+            return None
+
+    if (len(set(rename_kernel_name(name) for name in kernel_names))
+            != len(kernel_names)):
+        return None
+
+    return rename_identifiers(kernel, renaming)
+
+
+def get_kernel_identifiers(kernel):
+    """Return a tuple ``(inames, temporaries, insn_ids, kernel_names)`` of
+    :class:`set` instances holding the identifiers defined in *kernel*,
+    where *kernel_names* includes the names of scheduled subkernels.
+    """
+    subkernel_names = set([kernel.name])
+    if kernel.schedule is not None:
+        from loopy.schedule import CallKernel
+        subkernel_names.update(
+                sched_item.kernel_name
+                for sched_item in kernel.schedule
+                if isinstance(sched_item, CallKernel))
+
+    return (
+            set(kernel.all_inames()),
+            set(kernel.temporary_variables),
+            set(insn.id for insn in kernel.instructions),
+            subkernel_names)
+
+
+def get_canonical_identifier_renaming(kernel, rename_variables=True,
+        rename_kernel_name=True, fixed_insn_ids=frozenset()):
+    """Return an :class:`IdentifierRenaming` that maps the identifiers of
+    *kernel* to canonical names which only depend on the structure of the
+    kernel: inames are numbered in the order in which they occur in
+    the domains, instruction ids in the order of the instructions, and
+    temporaries in the order of their first use.
+
+    Names that cannot safely be renamed (such as names referenced from
+    :class:`loopy.CInstruction` code or coinciding with substitution rule
+    arguments) are left unchanged.
+
+    :arg rename_variables: whether inames and temporaries are renamed.
+    :arg rename_kernel_name: whether the kernel's name is renamed.
+    :arg fixed_insn_ids: instruction ids that are left unchanged.
+    """
+    from loopy.kernel.instruction import CInstruction
+    from loopy.symbolic import WalkMapper
+
+    if any(isinstance(insn, CInstruction) for insn in kernel.instructions):
+        rename_variables = False
+
+    fixed_names = set()
+    for rule in six.itervalues(kernel.substitutions):
+        fixed_names.add(rule.name)
+        fixed_names.update(rule.arguments)
+
+    def number(names, prefix, fixed):
+        result = {}
+        for name in names:
+            if name not in result and name not in fixed:
+                result[name] = "_lpy_cn_%s%d" % (prefix, len(result))
+        return result
+
+    inames = {}
+    temporaries = {}
+
+    if rename_variables:
+        ordered_inames = [
+                iname
+                for dom in kernel.domains
+                for iname in dom.get_var_names(dim_type.set)]
+        ordered_inames.extend(sorted(kernel.all_inames()))
+        inames = number(ordered_inames, "iname", fixed_names)
+
+        ordered_vars = []
+
+        class OrderedVariableCollector(WalkMapper):
+            def map_variable(self, expr, *args, **kwargs):
+                ordered_vars.append(expr.name)
+
+            map_tagged_variable = map_variable
+
+        from loopy.kernel.instruction import MultiAssignmentBase
+
+        collector = OrderedVariableCollector()
+        for insn in kernel.instructions:
+            if isinstance(insn, MultiAssignmentBase):
+                for assignee in insn.assignees:
+                    collector(assignee)
+                collector(insn.expression)
+            for pred in sorted(insn.predicates, key=str):
+                collector(pred)
+
+        ordered_vars.extend(sorted(kernel.temporary_variables))
+        temporaries = number(
+                [name for name in ordered_vars
+                    if name in kernel.temporary_variables],
+                "tv", fixed_names)
+
+    insn_ids = number(
+            [insn.id for insn in kernel.instructions], "insn", fixed_insn_ids)
+
+    kernel_name = {}
+    if rename_kernel_name:
+        kernel_name = {kernel.name: "_lpy_cn_kernel"}
+
+    return IdentifierRenaming(
+            inames=inames, temporaries=temporaries, insn_ids=insn_ids,
+            kernel_name=kernel_name)
+
+# }}}
+
+
 # vim: foldmethod=marker
@@ -100,6 +100,38 @@ class Options(ImmutableRecord):
         Whether loopy should issue an error if a dependency
         expression does not match any instructions in the kernel.
 
+    .. attribute:: strength_reduce_index_arithmetic
+
+        When generating C-family code for a sequential loop, keep the
+        part of each flattened array subscript that is affine in the
+        loop's iname in an offset variable that is incremented by the
+        stride once per iteration, instead of recomputing the full
+        subscript at each access. Subscripts that are not affine in the
+        iname (or whose stride changes within the loop) are generated
+        as before. Offsets of nested loops are initialized from those
+        of the enclosing loop.
+
+        .. versionadded:: 2019.1
+
+    .. attribute:: version_tile_loops
+
+        If *True*, generate separate code for the first and/or last
+        iteration of sequential loops whenever this makes the bounds of
+        other inames independent of the loop's iname in the remaining
+        ("bulk") iterations, such as for the outer iname of
+        :func:`loopy.split_iname` when the inner length need not divide
+        the loop length. The bulk iterations of the inner loop then need
+        no conditionals. Loops whose iname already has nonzero slab
+        increments (see the *slabs* argument of :func:`loopy.split_iname`)
+        are left alone.
+
+        Since each version contains a copy of the loop's body, loops are
+        only versioned as long as no instruction is generated more than 32
+        times in total. An integer may be given instead of *True* to
+        change this limit.
+
+        .. versionadded:: 2019.1
+
     .. rubric:: Invocation-related options
 
     .. attribute:: skip_arg_checks
@@ -121,6 +153,35 @@ class Options(ImmutableRecord):
 
         Defaults to *True*.
 
+    .. attribute:: cl_exec_memory_pool_max_held_bytes
+
+        Within the PyOpenCL executor, the number of bytes of freed
+        memory the memory pool for a queue may hold on to for reuse
+        before returning it to the OpenCL implementation. The value for the
+        kernel first executed on the queue is used. See
+        :func:`loopy.target.pyopencl_execution.get_memory_pool`.
+
+        Defaults to 128 MiB. *None* means no limit.
+
+    .. attribute:: cl_exec_cache_host_arrays
+
+        Within the PyOpenCL executor, keep device-side copies of
+        :mod:`numpy` arrays passed as arguments that are only read by the
+        kernel and are not writeable, and reuse them for as long as the host
+        array is alive and not writeable. Transfers to and from the host go
+        through pinned staging memory. See
+        :class:`loopy.target.pyopencl_execution.HostArrayCache`.
+
+        Defaults to *False*.
+
+    .. attribute:: cl_exec_host_array_cache_max_bytes
+
+        Within the PyOpenCL executor, the maximum total number of bytes of
+        the device-side copies kept if :attr:`cl_exec_cache_host_arrays` is
+        set. *None* means no limit.
+
+        Defaults to 256 MiB.
+
     .. attribute:: return_dict
 
         Have kernels return a :class:`dict` instead of a tuple as
@@ -172,6 +233,19 @@ class Options(ImmutableRecord):
         to variables.
 
         If equal to ``"no_check"``, then no check is performed.
+
+    .. attribute:: share_temporary_storage
+
+        If *True*, let private and local temporaries with non-overlapping
+        live ranges share storage after scheduling. See
+        :func:`loopy.share_temporary_storage`.
+
+    .. attribute:: minimize_global_barriers
+
+        If *True*, order instructions during scheduling so that global
+        barriers that are not ordered with respect to each other are
+        scheduled next to each other, minimizing the number of device
+        programs the kernel is split into.
     """
 
     _legacy_options_map = {
@@ -212,10 +286,19 @@ class Options(ImmutableRecord):
                 trace_assignments=kwargs.get("trace_assignments", False),
                 trace_assignment_values=kwargs.get("trace_assignment_values", False),
                 ignore_boostable_into=kwargs.get("ignore_boostable_into", False),
+                strength_reduce_index_arithmetic=kwargs.get(
+                    "strength_reduce_index_arithmetic", False),
+                version_tile_loops=kwargs.get("version_tile_loops", False),
 
                 skip_arg_checks=kwargs.get("skip_arg_checks", False),
                 no_numpy=kwargs.get("no_numpy", False),
                 cl_exec_manage_array_events=kwargs.get("no_numpy", True),
+                cl_exec_memory_pool_max_held_bytes=kwargs.get(
+                    "cl_exec_memory_pool_max_held_bytes", 2**27),
+                cl_exec_cache_host_arrays=kwargs.get(
+                    "cl_exec_cache_host_arrays", False),
+                cl_exec_host_array_cache_max_bytes=kwargs.get(
+                    "cl_exec_host_array_cache_max_bytes", 2**28),
                 return_dict=kwargs.get("return_dict", False),
                 write_wrapper=kwargs.get("write_wrapper", False),
                 write_code=kwargs.get("write_code", False),
@@ -229,6 +312,10 @@ class Options(ImmutableRecord):
 
                 enforce_variable_access_ordered=kwargs.get(
                     "enforce_variable_access_ordered", False),
+                share_temporary_storage=kwargs.get(
+                    "share_temporary_storage", False),
+                minimize_global_barriers=kwargs.get(
+                    "minimize_global_barriers", False),
                 )
 
     # {{{ legacy compatibility
@@ -30,9 +30,8 @@ from loopy.diagnostic import (
 
 import islpy as isl
 
-from pytools.persistent_dict import WriteOncePersistentDict
 
-from loopy.tools import LoopyKeyBuilder
+from loopy.tools import RenamingInvariantPersistentDict
 from loopy.version import DATA_MODEL_VERSION
 from loopy.kernel.data import make_assignment, filter_iname_tags_by_type
 # for the benefit of loopy.statistics, for now
@@ -2105,9 +2104,14 @@ def check_atomic_loads(kernel):
 # }}}
 
 
-preprocess_cache = WriteOncePersistentDict(
-        "loopy-preprocess-cache-v2-"+DATA_MODEL_VERSION,
-        key_builder=LoopyKeyBuilder())
+def _rename_cached_kernel(kernel, renaming):
+    from loopy.kernel.tools import rename_identifiers_if_unambiguous
+    return rename_identifiers_if_unambiguous(kernel, renaming)
+
+
+preprocess_cache = RenamingInvariantPersistentDict(
+        "loopy-preprocess-cache-v3-"+DATA_MODEL_VERSION,
+        rename_value=_rename_cached_kernel)
 
 
 def preprocess_kernel(kernel, device=None):
@@ -2127,7 +2131,7 @@ def preprocess_kernel(kernel, device=None):
         input_kernel = kernel
 
         try:
-            result = preprocess_cache[kernel]
+            result = preprocess_cache[preprocess_cache.make_key(kernel)]
             logger.debug("%s: preprocess cache hit" % kernel.name)
             return result
         except KeyError:
@@ -2215,7 +2219,8 @@ def preprocess_kernel(kernel, device=None):
     # }}}
 
     if CACHING_ENABLED:
-        preprocess_cache.store_if_not_present(input_kernel, kernel)
+        preprocess_cache.store_if_not_present(
+                preprocess_cache.make_key(input_kernel), kernel)
 
     return kernel
 
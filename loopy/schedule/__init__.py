@@ -31,8 +31,7 @@ from loopy.diagnostic import warn_with_kernel, LoopyError  # noqa
 
 from pytools import MinRecursionLimit, ProcessLogger
 
-from pytools.persistent_dict import WriteOncePersistentDict
-from loopy.tools import LoopyKeyBuilder
+from loopy.tools import RenamingInvariantPersistentDict
 from loopy.version import DATA_MODEL_VERSION
 
 import logging
@@ -1320,6 +1319,93 @@ def generate_loop_schedules_internal(
 # }}}
 
 
+# {{{ global barrier clustering
+
+def add_dependencies_to_cluster_global_barriers(kernel):
+    """Return a copy of *kernel* with added instruction dependencies that
+    cause global barriers not ordered with respect to each other to be
+    scheduled next to each other, so that the kernel gets split into as few
+    device programs as dependencies allow.
+
+    Each instruction is assigned to the earliest *phase* permitted by its
+    dependencies, where each global barrier starts a new phase. The global
+    barriers of a phase are then made to depend on all instructions of the
+    previous phase, and the instructions of a phase are made to depend on
+    all global barriers starting it. The global barriers of a phase are
+    ordered by their identifiers. Dependencies are only added between
+    instructions within the same (sequential) loop nest.
+    """
+    from loopy.kernel.instruction import BarrierInstruction
+    from loopy.kernel.data import ConcurrentTag, filter_iname_tags_by_type
+
+    def is_global_barrier(insn):
+        return (isinstance(insn, BarrierInstruction)
+                and insn.synchronization_kind == "global")
+
+    if not any(is_global_barrier(insn) for insn in kernel.instructions):
+        return kernel
+
+    parallel_inames = frozenset(
+            iname
+            for iname, tags in six.iteritems(kernel.iname_to_tags)
+            if filter_iname_tags_by_type(tags, ConcurrentTag))
+
+    insn_id_to_phase = {}
+
+    def get_phase(insn_id):
+        try:
+            return insn_id_to_phase[insn_id]
+        except KeyError:
+            pass
+
+        insn = kernel.id_to_insn[insn_id]
+        phase = max(
+                [0] + [get_phase(dep_id) for dep_id in insn.depends_on])
+        if is_global_barrier(insn):
+            phase += 1
+
+        insn_id_to_phase[insn_id] = phase
+        return phase
+
+    # (sequential inames, phase) -> ids
+    phase_to_barrier_ids = {}
+    phase_to_insn_ids = {}
+
+    for insn in kernel.instructions:
+        key = (
+                kernel.insn_inames(insn) - parallel_inames,
+                get_phase(insn.id))
+
+        if is_global_barrier(insn):
+            phase_to_barrier_ids.setdefault(key, set()).add(insn.id)
+        else:
+            phase_to_insn_ids.setdefault(key, set()).add(insn.id)
+
+    new_insns = []
+    for insn in kernel.instructions:
+        seq_inames = kernel.insn_inames(insn) - parallel_inames
+        phase = insn_id_to_phase[insn.id]
+
+        if is_global_barrier(insn):
+            new_deps = (
+                    phase_to_insn_ids.get((seq_inames, phase - 1), set())
+                    | phase_to_barrier_ids.get((seq_inames, phase - 1), set())
+                    | set(
+                        barrier_id
+                        for barrier_id in phase_to_barrier_ids[seq_inames, phase]
+                        if barrier_id < insn.id))
+        else:
+            new_deps = phase_to_barrier_ids.get((seq_inames, phase), set())
+
+        if new_deps - insn.depends_on:
+            insn = insn.copy(depends_on=insn.depends_on | frozenset(new_deps))
+        new_insns.append(insn)
+
+    return kernel.copy(instructions=new_insns)
+
+# }}}
+
+
 # {{{ convert barrier instructions to proper barriers
 
 def convert_barrier_instructions_to_barriers(kernel, schedule):
@@ -1848,6 +1934,10 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
     from loopy.check import pre_schedule_checks
     pre_schedule_checks(kernel)
 
+    if (kernel.state != KernelState.SCHEDULED
+            and kernel.options.minimize_global_barriers):
+        kernel = add_dependencies_to_cluster_global_barriers(kernel)
+
     schedule_count = 0
 
     debug = ScheduleDebugger(**debug_args)
@@ -2010,9 +2100,14 @@ def generate_loop_schedules_inner(kernel, debug_args={}):
 # }}}
 
 
-schedule_cache = WriteOncePersistentDict(
-        "loopy-schedule-cache-v4-"+DATA_MODEL_VERSION,
-        key_builder=LoopyKeyBuilder())
+def _rename_cached_kernel(kernel, renaming):
+    from loopy.kernel.tools import rename_identifiers_if_unambiguous
+    return rename_identifiers_if_unambiguous(kernel, renaming)
+
+
+schedule_cache = RenamingInvariantPersistentDict(
+        "loopy-schedule-cache-v5-"+DATA_MODEL_VERSION,
+        rename_value=_rename_cached_kernel)
 
 
 def _get_one_scheduled_kernel_inner(kernel):
@@ -2031,10 +2126,11 @@ def _get_one_scheduled_kernel_inner(kernel):
 def get_one_scheduled_kernel(kernel):
     from loopy import CACHING_ENABLED
 
-    sched_cache_key = kernel
     from_cache = False
 
     if CACHING_ENABLED:
+        sched_cache_key = schedule_cache.make_key(kernel)
+
         try:
             result = schedule_cache[sched_cache_key]
 
@@ -2048,6 +2144,10 @@ def get_one_scheduled_kernel(kernel):
             with MinRecursionLimitForScheduling(kernel):
                 result = _get_one_scheduled_kernel_inner(kernel)
 
+        if kernel.options.share_temporary_storage:
+            from loopy.transform.data import share_temporary_storage
+            result = share_temporary_storage(result)
+
     if CACHING_ENABLED and not from_cache:
         schedule_cache.store_if_not_present(sched_cache_key, result)
 
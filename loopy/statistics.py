@@ -28,12 +28,13 @@ import loopy as lp
 from islpy import dim_type
 import islpy as isl
 from pymbolic.mapper import CombineMapper
+from pymbolic.mapper.evaluator import EvaluationMapper
 from functools import reduce
 from loopy.kernel.data import (
         MultiAssignmentBase, TemporaryVariable, AddressSpace)
 from loopy.diagnostic import warn_with_kernel, LoopyError
 from loopy.symbolic import CoefficientCollector
-from pytools import Record, memoize_method
+from pytools import Record, memoize, memoize_method
 
 
 __doc__ = """
@@ -52,14 +53,189 @@ __doc__ = """
 .. autofunction:: gather_access_footprints
 .. autofunction:: gather_access_footprint_bytes
 
+.. autofunction:: get_mem_access_trace_stats
+
 .. currentmodule:: loopy.statistics
 
 .. autoclass:: GuardedPwQPolynomial
+.. autoclass:: PwQPolynomialArrayEvaluator
+
+.. autofunction:: count_points
+
+.. autoclass:: MemAccessTraceStats
 
 .. currentmodule:: loopy
 """
 
 
+# {{{ vectorized evaluation of piecewise quasi-polynomials
+
+try:
+    from math import gcd as _gcd
+except ImportError:
+    from fractions import gcd as _gcd
+
+
+class _ArrayEvaluationMapper(EvaluationMapper):
+    def map_logical_and(self, expr):
+        import numpy as np
+        return reduce(np.logical_and, [self.rec(ch) for ch in expr.children])
+
+    def map_logical_or(self, expr):
+        import numpy as np
+        return reduce(np.logical_or, [self.rec(ch) for ch in expr.children])
+
+    def map_if(self, expr):
+        import numpy as np
+        return np.where(self.rec(expr.condition),
+                self.rec(expr.then), self.rec(expr.else_))
+
+
+def _qpolynomial_to_expr(qpoly):
+    """Convert *qpoly* to a :mod:`pymbolic` expression with integer
+    coefficients.
+
+    :return: a tuple ``(numerator, denominator)``, where *denominator* is a
+        positive :class:`int`.
+    """
+    from pymbolic import var
+    from loopy.symbolic import aff_to_expr
+
+    terms = qpoly.get_terms()
+
+    denom = 1
+    for term in terms:
+        den = term.get_coefficient_val().get_den_val().to_python()
+        denom = denom * den // _gcd(denom, den)
+
+    result = 0
+    for term in terms:
+        coeff = (term.get_coefficient_val() * denom).to_python()
+        if not coeff:
+            continue
+
+        term_expr = coeff
+        for i in range(term.dim(dim_type.param)):
+            exp = term.get_exp(dim_type.param, i)
+            if exp:
+                term_expr = term_expr * var(
+                        qpoly.space.get_dim_name(dim_type.param, i))**exp
+
+        for i in range(term.dim(dim_type.div)):
+            exp = term.get_exp(dim_type.div, i)
+            if exp:
+                term_expr = term_expr * aff_to_expr(term.get_div(i))**exp
+
+        result = result + term_expr
+
+    return result, denom
+
+
+def _set_to_mask_expr(isl_set):
+    """Like :func:`loopy.symbolic.set_to_cond_expr`, but returns *True* for
+    universes instead of raising.
+    """
+    from loopy.symbolic import constraint_to_cond_expr
+    from pymbolic.primitives import LogicalAnd, LogicalOr
+
+    conjs = []
+    for bset in isl_set.compute_divs().get_basic_sets():
+        constrs = [constraint_to_cond_expr(cns)
+                for cns in bset.get_constraints()]
+        if not constrs:
+            return True
+        elif len(constrs) == 1:
+            conjs.append(constrs[0])
+        else:
+            conjs.append(LogicalAnd(tuple(constrs)))
+
+    if not conjs:
+        return False
+    elif len(conjs) == 1:
+        return conjs[0]
+    else:
+        return LogicalOr(tuple(conjs))
+
+
+class PwQPolynomialArrayEvaluator(object):
+    """Evaluates a :class:`GuardedPwQPolynomial` on whole arrays of parameter
+    values at once.
+
+    The quasi-polynomial of each piece is converted once (upon construction)
+    to an expression with integer coefficients, and the piece domains and the
+    guard are converted to conditions that are evaluated as :mod:`numpy`
+    masks. Arithmetic is carried out in 64-bit integers.
+
+    .. automethod:: __call__
+    """
+
+    def __init__(self, guarded_pwqpolynomial):
+        pwqpolynomial = guarded_pwqpolynomial.pwqpolynomial
+
+        if isinstance(pwqpolynomial, int):
+            self.param_names = []
+            self.pieces = [(True, pwqpolynomial, 1)]
+        else:
+            space = pwqpolynomial.space
+            self.param_names = [
+                    space.get_dim_name(dim_type.param, i)
+                    for i in range(space.dim(dim_type.param))]
+            self.pieces = [
+                    (_set_to_mask_expr(piece_set),)
+                    + _qpolynomial_to_expr(qpoly)
+                    for piece_set, qpoly in pwqpolynomial.get_pieces()]
+
+        self.valid_domain_mask = _set_to_mask_expr(
+                guarded_pwqpolynomial.valid_domain)
+
+    def __call__(self, value_dict):
+        """
+        :arg value_dict: a mapping from parameter names to scalars or
+            arrays of parameter values. All arrays are broadcast against each
+            other.
+        :return: a :class:`numpy.ndarray` of the broadcast shape holding
+            the values of the piecewise quasi-polynomial. Its data type is
+            integral, unless the polynomial takes non-integer values at some
+            of the points.
+        """
+        import numpy as np
+
+        names = list(value_dict.keys())
+        values = np.broadcast_arrays(
+                *[np.asarray(value_dict[name], dtype=np.int64)
+                    for name in names])
+        context = dict(zip(names, values))
+        shape = values[0].shape if values else ()
+
+        mapper = _ArrayEvaluationMapper(context)
+
+        def evaluate(expr):
+            return np.broadcast_to(mapper(expr), shape)
+
+        if not evaluate(self.valid_domain_mask).all():
+            raise ValueError("evaluation point outside of domain of "
+                    "definition of piecewise quasipolynomial")
+
+        result = np.zeros(shape, dtype=np.int64)
+        for mask_expr, numerator, denominator in self.pieces:
+            mask = evaluate(mask_expr)
+            if not mask.any():
+                continue
+
+            value = evaluate(numerator)
+            if denominator != 1:
+                if (value[mask] % denominator).any():
+                    value = value / denominator
+                else:
+                    value = value // denominator
+
+            result = np.where(mask, value, result)
+
+        return result
+
+# }}}
+
+
 # {{{ GuardedPwQPolynomial
 
 class GuardedPwQPolynomial(object):
@@ -91,7 +267,25 @@ class GuardedPwQPolynomial(object):
 
     __rmul__ = __mul__
 
+    @memoize_method
+    def get_array_evaluator(self):
+        """Return a (cached) :class:`PwQPolynomialArrayEvaluator` for
+        *self*.
+        """
+        return PwQPolynomialArrayEvaluator(self)
+
     def eval_with_dict(self, value_dict):
+        """Evaluate at the parameter values given in *value_dict*.
+
+        If any of the values in *value_dict* is a :class:`numpy.ndarray`,
+        evaluation is vectorized over all (broadcast) entries of the arrays
+        using :meth:`get_array_evaluator`, and an array of counts is
+        returned.
+        """
+        import numpy as np
+        if any(isinstance(val, np.ndarray) for val in six.itervalues(value_dict)):
+            return self.get_array_evaluator()(value_dict)
+
         space = self.pwqpolynomial.space
         pt = isl.Point.zero(space.params())
 
@@ -433,6 +627,9 @@ class ToCountMap(object):
 
         :return: An :class:`int` containing the sum of all counts in the
             :class:`ToCountMap` evaluated with the parameters provided.
+            If any parameter value is a :class:`numpy.ndarray`, an array of
+            sums over the (broadcast) parameter arrays is returned instead,
+            see :meth:`GuardedPwQPolynomial.eval_with_dict`.
 
         Example usage::
 
@@ -444,6 +641,10 @@ class ToCountMap(object):
                                              variable=['a', 'g'])
             tot_loads_a_g = filtered_map.eval_and_sum(params)
 
+            # evaluate over a whole parameter sweep in one call
+            sweep = {'n': np.arange(64, 4096, 64), 'm': 256, 'l': 128}
+            tot_loads_a_g_sweep = filtered_map.eval_and_sum(sweep)
+
             # (now use these counts to, e.g., predict performance)
 
         """
@@ -1120,6 +1321,258 @@ def add_assumptions_guard(kernel, pwqpolynomial):
     return GuardedPwQPolynomial(pwqpolynomial, kernel.assumptions)
 
 
+# {{{ exact counting for concrete parameter values
+
+class _CountLevel(object):
+    """Describes the range of one set dimension of a parameter-free basic set,
+    as a function of the preceding (outer) dimensions.
+
+    .. attribute:: lower
+
+        A :mod:`pymbolic` expression for the lower bound.
+
+    .. attribute:: upper
+
+        A :mod:`pymbolic` expression for the upper bound.
+
+    .. attribute:: stride
+
+        An :class:`int`.
+
+    .. attribute:: membership
+
+        *None* if every value ``lower + k*stride`` between the bounds is
+        in the set (for points of the outer dimensions that are in the
+        set), otherwise an expression in the dimensions up to and including
+        this one that checks membership in the projection of the set.
+    """
+
+    def __init__(self, lower, upper, stride, membership):
+        self.lower = lower
+        self.upper = upper
+        self.stride = stride
+        self.membership = membership
+
+
+def _get_count_levels(bset):
+    from loopy.isl_helpers import get_simple_strides
+    from loopy.symbolic import pw_aff_to_expr
+
+    ndim = bset.dim(dim_type.set)
+    for i in range(ndim):
+        bset = bset.set_dim_name(dim_type.set, i, "_lpy_cnt_dim%d" % i)
+
+    levels = []
+    for idim in range(ndim):
+        proj = bset.project_out(dim_type.set, idim+1, ndim-idim-1)
+        fiber = proj.move_dims(dim_type.param, 0, dim_type.set, 0, idim)
+
+        dmin = fiber.dim_min(0)
+        dmax = fiber.dim_max(0)
+
+        stride = get_simple_strides(fiber, key_by="index").get(
+                (dim_type.set, 0))
+        stride = 1 if stride is None else int(stride)
+
+        # {{{ check whether bounds and stride describe the fiber exactly
+
+        zero = isl.Aff.zero_on_domain(isl.LocalSpace.from_space(fiber.space))
+        iname = isl.PwAff.from_aff(
+                zero.set_coefficient_val(dim_type.in_, 0, 1))
+
+        def match(pwaff):
+            return pwaff.insert_dims(dim_type.in_, 0, 1).set_dim_id(
+                    dim_type.in_, 0, fiber.get_dim_id(dim_type.set, 0))
+
+        dmin_matched = match(dmin)
+        rebuilt = (
+                iname.ge_set(dmin_matched)
+                & iname.le_set(match(dmax))
+                & (iname-dmin_matched).mod_val(stride).eq_set(zero))
+
+        if fiber <= rebuilt and rebuilt <= fiber:
+            membership = None
+        else:
+            membership = _set_to_mask_expr(proj)
+
+        # }}}
+
+        levels.append(_CountLevel(
+            pw_aff_to_expr(dmin, int_ok=True),
+            pw_aff_to_expr(dmax, int_ok=True),
+            stride, membership))
+
+    return levels
+
+
+def _get_level_lengths(levels, idim, prefixes):
+    import numpy as np
+
+    level = levels[idim]
+    nprefixes = len(prefixes)
+
+    mapper = _ArrayEvaluationMapper(dict(
+        ("_lpy_cnt_dim%d" % i, prefixes[:, i]) for i in range(idim)))
+
+    def evaluate(expr):
+        return np.broadcast_to(mapper(expr), (nprefixes,)).astype(np.int64)
+
+    lower = evaluate(level.lower)
+    upper = evaluate(level.upper)
+    return lower, np.maximum((upper - lower) // level.stride + 1, 0)
+
+
+def _expand_level(levels, idim, prefixes, max_chunk_size):
+    """Enumerate dimension *idim* of the set described by *levels* for the
+    points of the outer dimensions given by the rows of *prefixes*. Yields
+    arrays of points (with *idim* + 1 columns) of at most *max_chunk_size*
+    rows.
+    """
+    import numpy as np
+
+    level = levels[idim]
+    lower, lengths = _get_level_lengths(levels, idim, prefixes)
+
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    total_length = int(ends[-1]) if len(prefixes) else 0
+
+    for chunk_start in range(0, total_length, max_chunk_size):
+        positions = np.arange(chunk_start,
+                min(chunk_start + max_chunk_size, total_length),
+                dtype=np.int64)
+        rows = np.searchsorted(ends, positions, side="right")
+
+        values = lower[rows] + (positions - starts[rows]) * level.stride
+        new_prefixes = np.column_stack([prefixes[rows], values])
+
+        if level.membership is not None:
+            in_set = np.broadcast_to(
+                    _ArrayEvaluationMapper(dict(
+                        ("_lpy_cnt_dim%d" % i, new_prefixes[:, i])
+                        for i in range(idim+1)))(level.membership),
+                    (len(new_prefixes),))
+            new_prefixes = new_prefixes[in_set]
+
+        yield new_prefixes
+
+
+def _count_with_levels(levels, idim, prefixes, max_chunk_size):
+    """Count the points of the set described by *levels* whose first
+    *idim* coordinates are given by the rows of *prefixes*.
+    """
+    if idim + 1 == len(levels) and levels[idim].membership is None:
+        # closed form for the innermost extent
+        _, lengths = _get_level_lengths(levels, idim, prefixes)
+        return int(lengths.sum())
+
+    result = 0
+    for new_prefixes in _expand_level(levels, idim, prefixes, max_chunk_size):
+        if idim + 1 == len(levels):
+            result += len(new_prefixes)
+        else:
+            result += _count_with_levels(
+                    levels, idim+1, new_prefixes, max_chunk_size)
+
+    return result
+
+
+def _iterate_points_with_levels(levels, idim, prefixes, max_chunk_size):
+    for new_prefixes in _expand_level(levels, idim, prefixes, max_chunk_size):
+        if idim + 1 == len(levels):
+            yield new_prefixes
+        else:
+            for points in _iterate_points_with_levels(
+                    levels, idim+1, new_prefixes, max_chunk_size):
+                yield points
+
+
+def _enumerate_points(set, max_chunk_size=2**20):
+    """Return a tuple ``(names, points)``, where *points* is an integer
+    :class:`numpy.ndarray` with one row per point of the parameter-free
+    *set* and one column for each of the set dimensions named in *names*.
+    """
+    import numpy as np
+
+    names = set.get_var_names(dim_type.set)
+
+    chunks = [np.empty((0, len(names)), dtype=np.int64)]
+    for bset in set.make_disjoint().get_basic_sets():
+        if bset.is_empty():
+            continue
+
+        if not names:
+            chunks.append(np.empty((1, 0), dtype=np.int64))
+            continue
+
+        chunks.extend(_iterate_points_with_levels(
+                _get_count_levels(bset), 0,
+                np.empty((1, 0), dtype=np.int64),
+                max_chunk_size))
+
+    return names, np.concatenate(chunks)
+
+
+@memoize
+def _count_points_in_param_free_set(set, max_chunk_size):
+    import numpy as np
+
+    result = 0
+    for bset in set.make_disjoint().get_basic_sets():
+        if bset.is_empty():
+            continue
+
+        if bset.dim(dim_type.set) == 0:
+            result += 1
+            continue
+
+        result += _count_with_levels(
+                _get_count_levels(bset), 0,
+                np.empty((1, 0), dtype=np.int64),
+                max_chunk_size)
+
+    return result
+
+
+def count_points(set, param_values=None, max_chunk_size=2**20):
+    """Count the integer points in *set* exactly, without relying on
+    :mod:`barvinok`.
+
+    The outer dimensions of *set* are enumerated in vectorized form (using
+    :mod:`numpy`), while the extent of the innermost dimension is obtained
+    in closed form wherever its bounds and stride describe it exactly.
+    Results are cached per set.
+
+    :arg param_values: a mapping from parameter names to :class:`int`
+        values. Each parameter of *set* must either be given here or
+        not constrain *set*.
+    :arg max_chunk_size: the maximal number of points of a partially
+        enumerated dimension that are held in memory at once.
+    :return: an :class:`int`
+    """
+    if param_values is None:
+        param_values = {}
+
+    for name, value in six.iteritems(param_values):
+        dt_idx = set.get_var_dict(dim_type.param).get(name)
+        if dt_idx is not None:
+            _, idx = dt_idx
+            set = (set
+                    .fix_val(dim_type.param, idx, value)
+                    .project_out(dim_type.param, idx, 1))
+
+    nparams = set.dim(dim_type.param)
+    param_free_set = set.project_out(dim_type.param, 0, nparams)
+
+    if not param_free_set.align_params(set.space) <= set:
+        raise ValueError("count_points: set depends on parameters for "
+                "which no values were given")
+
+    return _count_points_in_param_free_set(param_free_set, max_chunk_size)
+
+# }}}
+
+
 def count(kernel, set, space=None):
     try:
         if space is not None:
@@ -1129,6 +1582,21 @@ def count(kernel, set, space=None):
     except AttributeError:
         pass
 
+    if set.project_out(
+            dim_type.param, 0, set.dim(dim_type.param)
+            ).align_params(set.space) <= set:
+        # The set does not depend on any parameters (e.g. because they
+        # were fixed using :func:`loopy.fix_parameters`), so it can be
+        # counted exactly.
+        result = isl.PwAff.val_on_domain(
+                isl.Set.universe(set.space.params()),
+                isl.Val(str(count_points(set)), set.get_ctx()))
+        if space is not None:
+            result = result.align_params(space)
+
+        return add_assumptions_guard(kernel,
+                isl.PwQPolynomial.from_pw_aff(result))
+
     count = isl.PwQPolynomial.zero(
             set.space
             .drop_dims(dim_type.set, 0, set.dim(dim_type.set))
@@ -1864,6 +2332,339 @@ def gather_access_footprint_bytes(kernel, ignore_uncountable=False):
 # }}}
 
 
+# {{{ memory access trace simulation
+
+class MemAccessTraceStats(Record):
+    """Statistics on the addresses touched by one array access of one
+    instruction, as found by :func:`get_mem_access_trace_stats`.
+
+    .. attribute:: insn_id
+    .. attribute:: variable
+    .. attribute:: mtype
+
+        **global** or **local**
+
+    .. attribute:: direction
+
+        **load** or **store**
+
+    .. attribute:: dtype
+
+        A :class:`numpy.dtype`.
+
+    .. attribute:: accesses
+
+        The number of accesses by individual work-items.
+
+    .. attribute:: subgroup_accesses
+
+        The number of times the access is executed by a (possibly partially
+        populated) sub-group.
+
+    .. attribute:: cache_lines
+
+        The number of cache lines touched, summed over all sub-group
+        executions of the access.
+
+    .. attribute:: unique_cache_lines
+
+        The number of distinct cache lines touched over the entire run.
+
+    .. attribute:: transactions
+
+        A :class:`dict` mapping each transaction size (in bytes) to the
+        number of aligned segments of that size touched, summed over all
+        sub-group executions of the access.
+
+    .. attribute:: reuse_distances
+
+        A :class:`dict` mapping powers of two *d* to the number of repeated
+        touches of a cache line with a reuse distance in ``(d/2, d]``. The
+        reuse distance is measured in sub-group-wide cache line touches of
+        this access since the preceding touch of the same line.
+
+    .. attribute:: bank_conflicts
+
+        For local memory, the number of additional (serialized) passes
+        caused by multiple distinct words mapping to the same bank,
+        summed over all sub-group executions. *None* for global memory.
+    """
+
+
+class _TracedAccessCollector(CombineMapper):
+    def combine(self, values):
+        return sum(values, [])
+
+    def map_constant(self, expr):
+        return []
+
+    def map_variable(self, expr):
+        return [(expr.name, ())]
+
+    map_tagged_variable = map_variable
+
+    def map_subscript(self, expr):
+        index = expr.index
+        if not isinstance(index, tuple):
+            index = (index,)
+
+        return [(expr.aggregate.name, index)] + self.rec(expr.index)
+
+    def map_reduction(self, expr):
+        return self.rec(expr.expr)
+
+
+def _get_iname_nesting_order(knl):
+    from loopy.schedule import EnterLoop
+
+    result = []
+    for sched_item in knl.schedule:
+        if (isinstance(sched_item, EnterLoop)
+                and sched_item.iname not in result):
+            result.append(sched_item.iname)
+
+    return result
+
+
+def _get_reuse_distance_histogram(instance_idx, lines):
+    """*instance_idx* and *lines* describe (distinct) cache line touches
+    ordered by *instance_idx*.
+    """
+    import numpy as np
+
+    time = np.arange(len(lines))
+    order = np.lexsort((time, lines))
+    same_line = lines[order][1:] == lines[order][:-1]
+    distances = np.diff(time[order])[same_line]
+
+    if not len(distances):
+        return {}
+
+    buckets = np.ceil(np.log2(distances)).astype(np.int64)
+    counts = np.bincount(buckets)
+    return dict(
+            (2**int(bucket), int(cnt))
+            for bucket, cnt in enumerate(counts)
+            if cnt)
+
+
+def get_mem_access_trace_stats(knl, param_values, subgroup_size=None,
+        cache_line_size=128, transaction_sizes=(32, 64, 128),
+        local_mem_banks=32, local_mem_bank_width=4, max_chunk_size=2**20):
+    """Simulate the memory accesses of *knl* for concrete parameter values.
+
+    For every access to a global array argument or a local temporary, all
+    the points of the instruction's loop domain are enumerated (using
+    :mod:`numpy`) and mapped to byte addresses according to the array's
+    strides. Accesses are grouped into sub-group-wide executions by the
+    values of the group-, sequential- and sub-group indices, where the
+    linearized local id (with local axis 0 varying fastest) determines the
+    sub-group and inames tagged ``vec`` act as additional SIMD lanes.
+    Each array is assumed to start on a cache line boundary.
+
+    This gives more accurate numbers on coalescing and cache behavior than
+    the stride heuristics of :func:`get_mem_access_map`, at a cost
+    proportional to the number of accesses simulated.
+
+    Accesses whose index cannot be evaluated from the loop indices and
+    parameters alone (e.g. indirect accesses) are skipped with a warning.
+    Redundant execution of an instruction along hardware axes it does not
+    use is not modeled.
+
+    :arg param_values: a mapping from parameter names to :class:`int`
+        values, which must fix all parameters the kernel's domains depend
+        on.
+    :arg subgroup_size: as for :func:`get_mem_access_map`.
+    :arg cache_line_size: the cache line size in bytes.
+    :arg transaction_sizes: the (aligned) memory transaction sizes in bytes
+        for which segment counts are reported.
+    :arg local_mem_banks: the number of local memory banks.
+    :arg local_mem_bank_width: the width of a local memory bank in bytes.
+    :return: a :class:`list` of :class:`MemAccessTraceStats`, in order of
+        the kernel's instructions.
+    """
+    import numpy as np
+    from loopy.kernel.array import FixedStrideArrayDimTag
+    from loopy.kernel.data import (
+            LocalIndexTag, GroupIndexTag, VectorizeTag)
+    from loopy.kernel import KernelState
+    from loopy.preprocess import preprocess_kernel, infer_unknown_types
+    from loopy.schedule import get_one_scheduled_kernel
+    from pymbolic.mapper.evaluator import UnknownVariableError
+
+    subgroup_size = _process_subgroup_size(knl, subgroup_size)
+
+    knl = infer_unknown_types(knl, expect_completion=True)
+    if knl.state < KernelState.PREPROCESSED:
+        knl = preprocess_kernel(knl)
+    if knl.schedule is None:
+        knl = get_one_scheduled_kernel(knl)
+
+    nesting_order = _get_iname_nesting_order(knl)
+
+    def evaluate_scalar(expr):
+        return int(EvaluationMapper(param_values)(expr))
+
+    _, local_sizes = knl.get_grid_size_upper_bounds_as_exprs()
+    local_sizes = [evaluate_scalar(lsize) for lsize in local_sizes]
+
+    result = []
+
+    for insn in knl.instructions:
+        if not isinstance(insn, MultiAssignmentBase):
+            continue
+
+        insn_inames = knl.insn_inames(insn)
+        domain = (knl.get_inames_domain(insn_inames)
+                .project_out_except(insn_inames, [dim_type.set]))
+        for name, value in six.iteritems(param_values):
+            dt_idx = domain.get_var_dict(dim_type.param).get(name)
+            if dt_idx is not None:
+                domain = domain.fix_val(dim_type.param, dt_idx[1], value)
+        domain = domain.project_out(
+                dim_type.param, 0, domain.dim(dim_type.param))
+
+        names, points = _enumerate_points(domain, max_chunk_size)
+        if not len(points):
+            continue
+
+        columns = dict((name, points[:, i]) for i, name in enumerate(names))
+
+        # {{{ sort iname values into group, sequential and lane indices
+
+        group_keys = []
+        lane_inames = []
+        sequential_inames = []
+        for iname in sorted(names, key=lambda iname: (
+                nesting_order.index(iname)
+                if iname in nesting_order else len(nesting_order), iname)):
+            group_tags = knl.iname_tags_of_type(iname, GroupIndexTag)
+            local_tags = knl.iname_tags_of_type(iname, LocalIndexTag)
+
+            if group_tags:
+                group_keys.append(columns[iname])
+            elif local_tags:
+                tag, = local_tags
+                lane_inames.append((tag.axis, iname))
+            elif knl.iname_tags_of_type(iname, VectorizeTag):
+                lane_inames.append((len(local_sizes), iname))
+            else:
+                sequential_inames.append(iname)
+
+        linear_lane = np.zeros(len(points), dtype=np.int64)
+        lane_stride = 1
+        for axis, iname in sorted(lane_inames):
+            linear_lane += lane_stride*columns[iname]
+            if axis < len(local_sizes):
+                lane_stride *= local_sizes[axis]
+            else:
+                lane_stride *= int(columns[iname].max()) + 1
+
+        instance_keys = np.column_stack(
+                group_keys
+                + [columns[iname] for iname in sequential_inames]
+                + [linear_lane // subgroup_size])
+        _, instance_idx = np.unique(
+                instance_keys, axis=0, return_inverse=True)
+        instance_idx = instance_idx.reshape(-1)
+
+        # }}}
+
+        accesses = (
+                [(name, index, "load")
+                    for name, index in _TracedAccessCollector()(
+                        insn.expression)]
+                + [(name, index, "store")
+                    for assignee in insn.assignees
+                    for name, index in _TracedAccessCollector()(assignee)[:1]])
+
+        for name, index, direction in accesses:
+            if name in knl.arg_dict and isinstance(
+                    knl.arg_dict[name], lp.ArrayArg):
+                array = knl.arg_dict[name]
+                mtype = "global"
+            elif name in knl.temporary_variables and (
+                    knl.temporary_variables[name].address_space
+                    == AddressSpace.LOCAL):
+                array = knl.temporary_variables[name]
+                mtype = "local"
+            else:
+                continue
+
+            itemsize = array.dtype.numpy_dtype.itemsize
+
+            # {{{ compute addresses
+
+            context = dict(param_values)
+            context.update(columns)
+
+            try:
+                if not all(isinstance(dim_tag, FixedStrideArrayDimTag)
+                        for dim_tag in array.dim_tags or ()):
+                    raise LoopyError("array '%s' has non-fixed-stride axes"
+                            % name)
+
+                element = np.zeros(len(points), dtype=np.int64)
+                for idx, dim_tag in zip(index, array.dim_tags or ()):
+                    element = element + (
+                            np.asarray(_ArrayEvaluationMapper(context)(idx))
+                            * evaluate_scalar(dim_tag.stride))
+
+            except (UnknownVariableError, LoopyError) as e:
+                warn_with_kernel(knl, "trace_untraceable_access",
+                        "get_mem_access_trace_stats: skipping access to '%s' "
+                        "in instruction '%s': %s" % (name, insn.id, e))
+                continue
+
+            addresses = np.broadcast_to(element, (len(points),)) * itemsize
+
+            # }}}
+
+            def count_segments(segment_size):
+                return len(np.unique(np.column_stack(
+                    [instance_idx, addresses // segment_size]), axis=0))
+
+            touched_lines = np.unique(np.column_stack(
+                [instance_idx, addresses // cache_line_size]), axis=0)
+
+            bank_conflicts = None
+            if mtype == "local":
+                words = np.unique(np.column_stack(
+                    [instance_idx, addresses // local_mem_bank_width]),
+                    axis=0)
+                bank_keys, words_per_bank = np.unique(
+                        np.column_stack(
+                            [words[:, 0], words[:, 1] % local_mem_banks]),
+                        axis=0, return_counts=True)
+                max_words_per_bank = np.zeros(
+                        instance_idx.max() + 1, dtype=np.int64)
+                np.maximum.at(max_words_per_bank, bank_keys[:, 0],
+                        words_per_bank)
+                bank_conflicts = int(np.maximum(
+                    max_words_per_bank - 1, 0).sum())
+
+            result.append(MemAccessTraceStats(
+                insn_id=insn.id,
+                variable=name,
+                mtype=mtype,
+                direction=direction,
+                dtype=array.dtype.numpy_dtype,
+                accesses=len(points),
+                subgroup_accesses=len(np.unique(instance_idx)),
+                cache_lines=len(touched_lines),
+                unique_cache_lines=len(np.unique(touched_lines[:, 1])),
+                transactions=dict(
+                    (size, count_segments(size))
+                    for size in transaction_sizes),
+                reuse_distances=_get_reuse_distance_histogram(
+                    touched_lines[:, 0], touched_lines[:, 1]),
+                bank_conflicts=bank_conflicts))
+
+    return result
+
+# }}}
+
+
 # {{{ compat goop
 
 def get_lmem_access_poly(knl):
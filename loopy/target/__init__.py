@@ -40,6 +40,7 @@ __doc__ = """
 .. autoclass:: ISPCTarget
 .. autoclass:: NumbaTarget
 .. autoclass:: NumbaCudaTarget
+.. autoclass:: PythonTarget
 
 """
 
@@ -217,6 +218,16 @@ class ASTBuilderBase(object):
             static_lbound, static_ubound, inner):
         raise NotImplementedError()
 
+    def emit_array_sequential_loop(self, codegen_state, sched_index,
+            lbound, ubound, inner):
+        """
+        :returns: code for the sequential loop entered at *sched_index* of
+            the schedule, with body *inner*, carried out by operations on
+            whole arrays instead of a loop, or *None* to use
+            :meth:`emit_sequential_loop`.
+        """
+        return None
+
     @property
     def can_implement_conditionals(self):
         return False
@@ -58,7 +58,7 @@ class CExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
 
     # {{{ handle non numpy arguements
 
-    def handle_non_numpy_arg(self, gen, arg):
+    def handle_non_numpy_arg(self, gen, arg, kernel):
         pass
 
     # }}}
@@ -39,7 +39,7 @@ from pymbolic import var
 
 
 from loopy.expression import dtype_to_type_context
-from loopy.type_inference import TypeInferenceMapper
+from loopy.type_inference import NodeMemoizingTypeInferenceMapper
 
 from loopy.diagnostic import LoopyError, LoopyWarning
 from loopy.tools import is_integer
@@ -54,7 +54,9 @@ class ExpressionToCExpressionMapper(IdentityMapper):
         self.codegen_state = codegen_state
 
         if type_inf_mapper is None:
-            type_inf_mapper = TypeInferenceMapper(self.kernel)
+            # Lowering requests the type of each subexpression at every
+            # level of the tree. Memoizing keeps this linear in its size.
+            type_inf_mapper = NodeMemoizingTypeInferenceMapper(self.kernel)
         self.type_inf_mapper = type_inf_mapper
 
         self.allow_complex = codegen_state.allow_complex
@@ -245,11 +247,37 @@ class ExpressionToCExpressionMapper(IdentityMapper):
 
             else:
                 subscript, = access_info.subscripts
+
+                offset = None
+                if self.codegen_state.vectorization_info is None:
+                    offset = self.codegen_state.strength_reduced_subscripts.get(
+                            (access_info.array_name, subscript))
+
+                if offset is not None:
+                    # see loopy.codegen.loop.get_strength_reduced_subscripts
+                    from pymbolic.primitives import Sum
+                    offset_name, offset_terms = offset
+                    terms = (subscript.children if isinstance(subscript, Sum)
+                            else (subscript,))
+
+                    index = var(offset_name)
+                    other_terms = tuple(
+                            term for i, term in enumerate(terms)
+                            if i not in offset_terms)
+                    if other_terms:
+                        from pymbolic.primitives import flattened_sum
+                        index = index + simplify_using_aff(
+                                self.kernel,
+                                self.rec(flattened_sum(other_terms), 'i'))
+
+                else:
+                    index = simplify_using_aff(
+                            self.kernel, self.rec(subscript, 'i'))
+
                 result = self.make_subscript(
                         ary,
                         make_var(access_info.array_name),
-                        simplify_using_aff(
-                            self.kernel, self.rec(subscript, 'i')))
+                        index)
 
             if access_info.vector_index is not None:
                 return self.codegen_state.ast_builder.add_vector_access(
@@ -33,8 +33,7 @@ from pytools.py_codegen import (
 import logging
 logger = logging.getLogger(__name__)
 
-from pytools.persistent_dict import WriteOncePersistentDict
-from loopy.tools import LoopyKeyBuilder
+from loopy.tools import LoopyPersistentDict
 from loopy.version import DATA_MODEL_VERSION
 
 
@@ -333,7 +332,7 @@ class ExecutionWrapperGeneratorBase(object):
 
     # {{{ handle non numpy arguements
 
-    def handle_non_numpy_arg(self, gen, arg):
+    def handle_non_numpy_arg(self, gen, arg, kernel):
         raise NotImplementedError()
 
     # }}}
@@ -403,7 +402,7 @@ class ExecutionWrapperGeneratorBase(object):
             gen("")
 
             if not options.no_numpy:
-                self.handle_non_numpy_arg(gen, arg)
+                self.handle_non_numpy_arg(gen, arg, kernel)
 
             if not options.skip_arg_checks and not is_written:
                 gen("if %s is None:" % arg.name)
@@ -693,14 +692,12 @@ class _Kernels(object):
     pass
 
 
-typed_and_scheduled_cache = WriteOncePersistentDict(
-        "loopy-typed-and-scheduled-cache-v1-"+DATA_MODEL_VERSION,
-        key_builder=LoopyKeyBuilder())
+typed_and_scheduled_cache = LoopyPersistentDict(
+        "loopy-typed-and-scheduled-cache-v1-"+DATA_MODEL_VERSION)
 
 
-invoker_cache = WriteOncePersistentDict(
-        "loopy-invoker-cache-v1-"+DATA_MODEL_VERSION,
-        key_builder=LoopyKeyBuilder())
+invoker_cache = LoopyPersistentDict(
+        "loopy-invoker-cache-v1-"+DATA_MODEL_VERSION)
 
 
 # {{{ kernel executor
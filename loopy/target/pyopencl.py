@@ -523,9 +523,19 @@ def generate_value_arg_setup(kernel, devices, implemented_data_info):
             gen(Assign(idi.name, "%s(%s)" % (py_type, idi.name)))
             gen(Line())
 
+        first_cl_arg_idx = cl_arg_idx
+        set_arg_code = []
+
         if idi.dtype.is_composite():
+            # May have been modified in place since the last launch, always
+            # set.
             gen(S("_lpy_knl.set_arg(%d, %s)" % (cl_arg_idx, idi.name)))
+            gen(Line())
+            gen(Comment("}}}"))
+            gen(Line())
+
             cl_arg_idx += 1
+            continue
 
         elif idi.dtype.is_complex():
             assert isinstance(idi.dtype, NumpyType)
@@ -546,33 +556,36 @@ def generate_value_arg_setup(kernel, devices, implemented_data_info):
             else:
                 raise TypeError("unexpected complex type: %s" % dtype)
 
+            arg_value = "_lpy_pack('{arg_char}{arg_char}', {arg_var}.real, " \
+                    "{arg_var}.imag)".format(arg_char=arg_char, arg_var=idi.name)
+
             if (work_around_arg_count_bug
                     and dtype.numpy_dtype == np.complex128
                     and fp_arg_count + 2 <= 8):
-                gen(Assign(
+                set_arg_code.append(Assign(
                     "_lpy_buf",
                     "_lpy_pack('{arg_char}', {arg_var}.real)"
                     .format(arg_char=arg_char, arg_var=idi.name)))
-                gen(S(
+                set_arg_code.append(S(
                     "_lpy_knl.set_arg({cl_arg_idx}, _lpy_buf)"
                     .format(cl_arg_idx=cl_arg_idx)))
                 cl_arg_idx += 1
 
-                gen(Assign(
+                set_arg_code.append(Assign(
                     "_lpy_buf",
                     "_lpy_pack('{arg_char}', {arg_var}.imag)"
                     .format(arg_char=arg_char, arg_var=idi.name)))
-                gen(S(
+                set_arg_code.append(S(
                         "_lpy_knl.set_arg({cl_arg_idx}, _lpy_buf)"
                         .format(cl_arg_idx=cl_arg_idx)))
                 cl_arg_idx += 1
             else:
-                gen(Assign(
+                set_arg_code.append(Assign(
                     "_lpy_buf",
                     "_lpy_pack('{arg_char}{arg_char}', "
                     "{arg_var}.real, {arg_var}.imag)"
                     .format(arg_char=arg_char, arg_var=idi.name)))
-                gen(S(
+                set_arg_code.append(S(
                     "_lpy_knl.set_arg({cl_arg_idx}, _lpy_buf)"
                     .format(cl_arg_idx=cl_arg_idx)))
                 cl_arg_idx += 1
@@ -583,9 +596,9 @@ def generate_value_arg_setup(kernel, devices, implemented_data_info):
             if idi.dtype.dtype.kind == "f":
                 fp_arg_count += 1
 
-            gen(S(
-                "_lpy_knl.set_arg(%d, _lpy_pack('%s', %s))"
-                % (cl_arg_idx, idi.dtype.dtype.char, idi.name)))
+            arg_value = "_lpy_pack('%s', %s)" % (idi.dtype.dtype.char, idi.name)
+            set_arg_code.append(S(
+                "_lpy_knl.set_arg(%d, _lpy_arg_value)" % cl_arg_idx))
 
             cl_arg_idx += 1
 
@@ -593,6 +606,15 @@ def generate_value_arg_setup(kernel, devices, implemented_data_info):
             raise LoopyError("do not know how to pass argument of type '%s'"
                     % idi.dtype)
 
+        # Only set the argument if its value differs from the one set in the
+        # previous launch. The values are compared in their packed form,
+        # which distinguishes e.g. 0.0 and -0.0. See get_kernel_call.
+        gen(Assign("_lpy_arg_value", arg_value))
+        gen(If("_lpy_knl_args.get(%d) != _lpy_arg_value" % first_cl_arg_idx,
+            Suite(set_arg_code + [
+                Assign("_lpy_knl_args[%d]" % first_cl_arg_idx,
+                    "_lpy_arg_value")])))
+
         gen(Line())
 
         gen(Comment("}}}"))
@@ -605,7 +627,7 @@ def generate_value_arg_setup(kernel, devices, implemented_data_info):
 
 def generate_array_arg_setup(kernel, implemented_data_info, arg_idx_to_cl_arg_idx):
     from loopy.kernel.array import ArrayBase
-    from genpy import Statement as S, Suite
+    from genpy import Assign, If, Statement as S, Suite
 
     result = []
     gen = result.append
@@ -616,11 +638,76 @@ def generate_array_arg_setup(kernel, implemented_data_info, arg_idx_to_cl_arg_id
 
         cl_arg_idx = arg_idx_to_cl_arg_idx[arg_idx]
 
-        gen(S("_lpy_knl.set_arg(%d, %s)" % (cl_arg_idx, arg.name)))
+        # Compare the memory object handles rather than the Python objects,
+        # to avoid keeping the buffers alive.
+        gen(Assign("_lpy_mem_ptr",
+            "%s.int_ptr if %s is not None else 0" % (arg.name, arg.name)))
+        gen(If("_lpy_knl_args.get(%d) != _lpy_mem_ptr" % cl_arg_idx,
+            Suite([
+                S("_lpy_knl.set_arg(%d, %s)" % (cl_arg_idx, arg.name)),
+                Assign("_lpy_knl_args[%d]" % cl_arg_idx, "_lpy_mem_ptr"),
+                ])))
 
     return Suite(result)
 
 
+# {{{ subkernel data dependencies
+
+def _get_global_vars_accessed_in_subkernel(kernel, subkernel):
+    """Return a tuple ``(read, written)`` of sorted tuples of the names of
+    global arrays (or of the base storage of global temporaries) read and
+    written by the instructions in *subkernel*.
+    """
+    from loopy.kernel.tools import get_subkernel_to_insn_id_map
+    from loopy.kernel.data import AddressSpace
+    from loopy.kernel.array import ArrayBase
+
+    def get_storage_name(var_name):
+        if var_name in kernel.temporary_variables:
+            tv = kernel.temporary_variables[var_name]
+            if tv.address_space != AddressSpace.GLOBAL:
+                return None
+            if tv.base_storage is not None:
+                return tv.base_storage
+            return var_name
+
+        arg = kernel.arg_dict.get(var_name)
+        if arg is not None and isinstance(arg, ArrayBase):
+            return var_name
+
+        return None
+
+    read = set()
+    written = set()
+
+    for insn_id in get_subkernel_to_insn_id_map(kernel)[subkernel]:
+        insn = kernel.id_to_insn[insn_id]
+
+        for var_name in insn.read_dependency_names():
+            storage_name = get_storage_name(var_name)
+            if storage_name is not None:
+                read.add(storage_name)
+
+        for var_name in insn.write_dependency_names():
+            storage_name = get_storage_name(var_name)
+            if storage_name is not None:
+                written.add(storage_name)
+
+    return tuple(sorted(read - written)), tuple(sorted(written))
+
+
+def _uses_event_dag(kernel):
+    """Whether the host code tracks the dependencies between subkernels
+    using events, rather than serializing all of them.
+    """
+    from loopy.schedule import CallKernel
+    return sum(
+            1 for sched_item in kernel.schedule
+            if isinstance(sched_item, CallKernel)) > 1
+
+# }}}
+
+
 # {{{ host ast builder
 
 class PyOpenCLPythonASTBuilder(PythonASTBuilderBase):
@@ -640,6 +727,29 @@ class PyOpenCLPythonASTBuilder(PythonASTBuilderBase):
 
         from genpy import (For, Function, Suite, Import, ImportAs, Return,
                 FromImport, If, Assign, Line, Statement as S)
+
+        if _uses_event_dag(codegen_state.kernel):
+            # Each subkernel waits for the last writers (and, if it writes
+            # them, the readers) of the global arrays it accesses. See
+            # get_kernel_call.
+            event_dag_init = [
+                    If("wait_for is None", Assign("wait_for", "[]")),
+                    Assign("_lpy_write_evts", "{}"),
+                    Assign("_lpy_read_evts", "{}"),
+                    Line(),
+                    ]
+            event_dag_finish = [
+                    Line(),
+                    Assign("_lpy_evt", "%s.enqueue_marker(queue, wait_for=("
+                        "list(_lpy_write_evts.values())"
+                        " + [_lpy_evt for _lpy_evts in _lpy_read_evts.values()"
+                        " for _lpy_evt in _lpy_evts]))"
+                        % self.target.pyopencl_module_name),
+                    ]
+        else:
+            event_dag_init = []
+            event_dag_finish = []
+
         return Function(
                 codegen_result.current_program(codegen_state).name,
                 args,
@@ -653,11 +763,11 @@ class PyOpenCLPythonASTBuilder(PythonASTBuilderBase):
                             "allocator",
                             "_lpy_cl_tools.DeferredAllocator(queue.context)")),
                     Line(),
-                    ] + [
+                    ] + event_dag_init + [
                     Line(),
                     function_body,
                     Line(),
-                    ] + [
+                    ] + event_dag_finish + [
                     For("_tv", "_global_temporaries",
                         # free global temporaries
                         S("_tv.release()"))
@@ -724,26 +834,67 @@ class PyOpenCLPythonASTBuilder(PythonASTBuilderBase):
             all_args,
             arg_idx_to_cl_arg_idx)
 
-        from genpy import Suite, Assign, Assert, Line, Comment
+        from genpy import (Suite, Assign, Assert, If, Line, Comment, For,
+                Statement as S)
         from pymbolic.mapper.stringifier import PREC_NONE
 
-        # TODO: Generate finer-grained dependency structure
+        kernel = codegen_state.kernel
+
+        if _uses_event_dag(kernel):
+            read, written = _get_global_vars_accessed_in_subkernel(kernel, name)
+
+            def tuple_literal(names):
+                return "(%s)" % "".join(repr(name) + ", " for name in names)
+
+            wait_for_code = [
+                    Assign("_lpy_wait_for", "wait_for + ["
+                        "_lpy_write_evts[_lpy_var] "
+                        "for _lpy_var in %s if _lpy_var in _lpy_write_evts]"
+                        % tuple_literal(read + written)),
+                    For("_lpy_var", tuple_literal(written),
+                        S("_lpy_wait_for.extend("
+                            "_lpy_read_evts.pop(_lpy_var, []))")),
+                    ]
+            wait_for = "_lpy_wait_for"
+            event_update_code = [
+                    For("_lpy_var", tuple_literal(written),
+                        Assign("_lpy_write_evts[_lpy_var]", "_lpy_evt")),
+                    For("_lpy_var", tuple_literal(read),
+                        S("_lpy_read_evts.setdefault(_lpy_var, [])"
+                            ".append(_lpy_evt)")),
+                    ]
+        else:
+            wait_for_code = []
+            wait_for = "wait_for"
+            event_update_code = [Assign("wait_for", "[_lpy_evt]")]
+
         return Suite([
             Comment("{{{ enqueue %s" % name),
             Line(),
             Assign("_lpy_knl", "_lpy_cl_kernels."+name),
-            Assert("_lpy_knl.num_args == %d" % cl_arg_count),
+            # maps CL argument indices to the values last passed to set_arg
+            # for _lpy_knl, to skip setting arguments that did not change
+            Assign("_lpy_knl_args",
+                "getattr(_lpy_knl, '_lpy_arg_values', None)"),
+            If("_lpy_knl_args is None",
+                Suite([
+                    Assert("_lpy_knl.num_args == %d" % cl_arg_count),
+                    Assign("_lpy_knl_args",
+                        "_lpy_knl._lpy_arg_values = {}"),
+                    ])),
             Line(),
             value_arg_code,
             arry_arg_code,
+            ] + wait_for_code + [
             Assign("_lpy_evt", "%(pyopencl_module_name)s.enqueue_nd_range_kernel("
                 "queue, _lpy_knl, "
-                "%(gsize)s, %(lsize)s,  wait_for=wait_for, g_times_l=True)"
+                "%(gsize)s, %(lsize)s,  wait_for=%(wait_for)s, g_times_l=True)"
                 % dict(
                     pyopencl_module_name=self.target.pyopencl_module_name,
                     gsize=ecm(gsize, prec=PREC_NONE, type_context="i"),
-                    lsize=ecm(lsize, prec=PREC_NONE, type_context="i"))),
-            Assign("wait_for", "[_lpy_evt]"),
+                    lsize=ecm(lsize, prec=PREC_NONE, type_context="i"),
+                    wait_for=wait_for)),
+            ] + event_update_code + [
             Line(),
             Comment("}}}"),
             Line(),
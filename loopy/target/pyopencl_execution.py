@@ -22,9 +22,12 @@ OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
 THE SOFTWARE.
 """
 
+import six
 from six.moves import range, zip
+import weakref
 
 from pytools import memoize_method
+from loopy.diagnostic import LoopyError
 from pytools.py_codegen import Indentation
 from loopy.target.execution import (
     KernelExecutorBase, ExecutionWrapperGeneratorBase, _KernelInfo, _Kernels)
@@ -48,7 +51,11 @@ class PyOpenCLExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
         system_args = [
             "_lpy_cl_kernels", "queue", "allocator=None", "wait_for=None",
             # ignored if options.no_numpy
-            "out_host=None"
+            "out_host=None",
+            # only used if options.cl_exec_cache_host_arrays
+            "_lpy_host_array_cache=None",
+            # see PyOpenCLKernelExecutor.get_launch_plan
+            "_lpy_bind_only=False",
             ]
         super(PyOpenCLExecutionWrapperGenerator, self).__init__(system_args)
 
@@ -62,13 +69,18 @@ class PyOpenCLExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
 
     # {{{ handle non-numpy args
 
-    def handle_non_numpy_arg(self, gen, arg):
+    def handle_non_numpy_arg(self, gen, arg, kernel):
         gen("if isinstance(%s, _lpy_np.ndarray):" % arg.name)
         with Indentation(gen):
-            gen("# synchronous, nothing to worry about")
-            gen("%s = _lpy_cl_array.to_device("
-                    "queue, %s, allocator=allocator)"
-                    % (arg.name, arg.name))
+            if (kernel.options.cl_exec_cache_host_arrays
+                    and arg.base_name not in kernel.get_written_variables()):
+                gen("%s = _lpy_host_array_cache.to_device(queue, %s)"
+                        % (arg.name, arg.name))
+            else:
+                gen("# synchronous, nothing to worry about")
+                gen("%s = _lpy_cl_array.to_device("
+                        "queue, %s, allocator=allocator)"
+                        % (arg.name, arg.name))
             gen("_lpy_encountered_numpy = True")
         gen("elif %s is not None:" % arg.name)
         with Indentation(gen):
@@ -153,6 +165,17 @@ class PyOpenCLExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
 
     def generate_invocation(self, gen, kernel_name, args,
             kernel, implemented_data_info):
+        from loopy.kernel.data import KernelArgument
+        gen("if _lpy_bind_only:")
+        with Indentation(gen):
+            gen("return {kernel_name}, {{{args}}}".format(
+                kernel_name=kernel_name,
+                args=", ".join(
+                    "\"{name}\": {name}".format(name=arg.name)
+                    for arg in implemented_data_info
+                    if issubclass(arg.arg_class, KernelArgument))))
+        gen("")
+
         if kernel.options.cl_exec_manage_array_events:
             gen("""
                 if wait_for is None:
@@ -208,7 +231,13 @@ class PyOpenCLExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
                         continue
 
                     is_written = arg.base_name in kernel.get_written_variables()
-                    if is_written:
+                    if not is_written:
+                        continue
+
+                    if options.cl_exec_cache_host_arrays:
+                        gen("%s = _lpy_host_array_cache.get(queue, %s)"
+                                % (arg.name, arg.name))
+                    else:
                         gen("%s = %s.get(queue=queue)" % (arg.name, arg.name))
 
             gen("")
@@ -241,6 +270,469 @@ class PyOpenCLExecutionWrapperGenerator(ExecutionWrapperGeneratorBase):
 # }}}
 
 
+# {{{ memory pool allocator
+
+class MemoryPoolAllocator(object):
+    """A :mod:`pyopencl` allocator handing out buffers from a
+    :class:`pyopencl.tools.MemoryPool`, so that memory freed by one kernel
+    invocation (such as that of output arrays no longer referenced and of
+    global temporaries) is reused by the next one instead of being
+    allocated anew.
+
+    Memory freed by an invocation is only safe to reuse for invocations
+    that are ordered after it, so the allocator should only be used for
+    invocations on a single in-order queue. See :func:`get_memory_pool`.
+
+    .. attribute:: pool
+
+        The underlying :class:`pyopencl.tools.MemoryPool`.
+
+    .. attribute:: max_held_bytes
+
+        If not *None*, held (i.e. freed but not yet returned) memory is
+        released once it exceeds this number of bytes.
+
+    .. attribute:: allocation_count
+
+        The number of allocations performed through this allocator.
+
+    .. attribute:: reuse_count
+
+        The number of allocations that were satisfied by memory held
+        by the pool.
+
+    .. automethod:: __call__
+    .. automethod:: free_held
+    .. automethod:: get_statistics
+
+    .. versionadded:: 2019.1
+    """
+
+    def __init__(self, queue, max_held_bytes=None):
+        import pyopencl.tools as cl_tools
+        self.pool = cl_tools.MemoryPool(cl_tools.ImmediateAllocator(queue))
+        self.max_held_bytes = max_held_bytes
+
+        self.allocation_count = 0
+        self.reuse_count = 0
+
+    @property
+    def held_bytes(self):
+        return self.pool.managed_bytes - self.pool.active_bytes
+
+    def __call__(self, nbytes):
+        """Return a :class:`pyopencl.tools.PooledBuffer` of at least *nbytes*
+        bytes.
+        """
+        pool = self.pool
+
+        if (self.max_held_bytes is not None
+                and self.held_bytes > self.max_held_bytes):
+            pool.free_held()
+
+        held_blocks = pool.held_blocks
+        result = pool.allocate(nbytes)
+
+        self.allocation_count += 1
+        if pool.held_blocks < held_blocks:
+            self.reuse_count += 1
+
+        return result
+
+    def free_held(self):
+        """Return all memory held by the pool to the OpenCL implementation.
+        """
+        self.pool.free_held()
+
+    def get_statistics(self):
+        """Return a :class:`dict` with the keys ``allocation_count``,
+        ``reuse_count``, ``active_bytes``, ``held_bytes`` and
+        ``held_blocks``.
+        """
+        return {
+                "allocation_count": self.allocation_count,
+                "reuse_count": self.reuse_count,
+                "active_bytes": self.pool.active_bytes,
+                "held_bytes": self.held_bytes,
+                "held_blocks": self.pool.held_blocks,
+                }
+
+
+_MEMORY_POOLS = weakref.WeakKeyDictionary()
+
+
+def get_memory_pool(queue, max_held_bytes=None):
+    """Return the :class:`MemoryPoolAllocator` shared by all kernel
+    executors for invocations on the (in-order) :class:`pyopencl.CommandQueue`
+    *queue*, creating it with *max_held_bytes* if it does not exist yet. The
+    pool is released along with *queue*.
+
+    .. versionadded:: 2019.1
+    """
+    try:
+        return _MEMORY_POOLS[queue]
+    except KeyError:
+        pass
+
+    # The pool must not refer to *queue*, which would keep it alive. The
+    # queue it allocates on only serves to make allocations immediate.
+    import pyopencl as cl
+    result = MemoryPoolAllocator(
+            cl.CommandQueue(queue.context, queue.device),
+            max_held_bytes=max_held_bytes)
+    _MEMORY_POOLS[queue] = result
+    return result
+
+# }}}
+
+
+# {{{ host array cache
+
+class _HostArrayCacheEntry(object):
+    def __init__(self, host_ref, device_array):
+        self.host_ref = host_ref
+        self.device_array = device_array
+
+
+def _as_byte_view(ary):
+    # *ary* must be contiguous (in either order)
+    import numpy as np
+    return ary.reshape(-1, order="A").view(np.uint8)
+
+
+def _is_contiguous(ary):
+    return ary.flags.c_contiguous or ary.flags.f_contiguous
+
+
+class HostArrayCache(object):
+    """Keeps device-side copies of :mod:`numpy` arrays passed as arguments
+    that are only read by a kernel, so that inputs passed unchanged to
+    repeated invocations are transferred only once. Used by
+    :class:`PyOpenCLKernelExecutor` if
+    :attr:`loopy.Options.cl_exec_cache_host_arrays` is set.
+
+    Only copies of arrays whose :attr:`numpy.ndarray.flags` mark them as
+    not writeable (which are thus assumed not to change) are kept, so that
+    checking for modification does not cost as much as the transfer it
+    would avoid. Writable arrays are transferred anew on each use. Copies
+    are found by the identity of the host array, and kept for as long as
+    their host array is alive and not writeable, and the total size of the
+    copies does not exceed *max_bytes*, beyond which the least recently used
+    copies are dropped.
+
+    Transfers of contiguous arrays in either direction are staged through
+    a buffer in pinned host memory.
+
+    .. attribute:: max_bytes
+
+        The maximum total size of the kept copies, or *None* for no limit.
+
+    .. attribute:: nbytes
+
+        The total size of the kept copies.
+
+    .. attribute:: upload_count
+
+        The number of host arrays transferred to the device.
+
+    .. attribute:: hit_count
+
+        The number of times a device-side copy was reused.
+
+    .. automethod:: to_device
+    .. automethod:: get
+    .. automethod:: clear
+
+    .. versionadded:: 2019.1
+    """
+
+    def __init__(self, context, max_bytes=None):
+        self.context = context
+        self.max_bytes = max_bytes
+
+        self._key_to_entry = {}
+        # keys of _key_to_entry, least recently used first
+        self._keys = []
+        self.nbytes = 0
+
+        self._staging_buffer = None
+        self._staging_event = None
+
+        self.upload_count = 0
+        self.hit_count = 0
+
+    # {{{ pinned staging memory
+
+    def _get_staging_buffer(self, nbytes):
+        if self._staging_event is not None:
+            # a previous upload may still be reading from the staging buffer
+            self._staging_event.wait()
+            self._staging_event = None
+
+        if self._staging_buffer is None or self._staging_buffer.size < nbytes:
+            import pyopencl as cl
+            self._staging_buffer = cl.Buffer(self.context,
+                    cl.mem_flags.READ_WRITE | cl.mem_flags.ALLOC_HOST_PTR,
+                    nbytes)
+
+        return self._staging_buffer
+
+    def _map_staging_buffer(self, queue, nbytes, flags, wait_for=None):
+        import numpy as np
+        import pyopencl as cl
+
+        staging_buffer = self._get_staging_buffer(nbytes)
+        mapped, _ = cl.enqueue_map_buffer(queue, staging_buffer, flags,
+                0, (nbytes,), np.uint8, wait_for=wait_for, is_blocking=True)
+        return staging_buffer, mapped
+
+    # }}}
+
+    def _upload(self, queue, ary):
+        import pyopencl as cl
+        import pyopencl.array as cl_array
+
+        if ary.nbytes == 0 or not _is_contiguous(ary):
+            return cl_array.to_device(queue, ary)
+
+        result = cl_array.Array(queue, ary.shape, ary.dtype, strides=ary.strides)
+
+        staging_buffer, mapped = self._map_staging_buffer(
+                queue, ary.nbytes, cl.map_flags.WRITE)
+        mapped[:] = _as_byte_view(ary)
+        mapped.base.release(queue)
+
+        self._staging_event = cl.enqueue_copy(queue,
+                result.base_data, staging_buffer, byte_count=ary.nbytes)
+        result.add_event(self._staging_event)
+
+        return result
+
+    def _remove_entry(self, key):
+        entry = self._key_to_entry.pop(key)
+        self._keys.remove(key)
+        self.nbytes -= entry.device_array.nbytes
+
+    def to_device(self, queue, ary):
+        """Return a :class:`pyopencl.array.Array` with the contents of the
+        :class:`numpy.ndarray` *ary*, reusing an earlier copy if possible.
+        The result must not be modified.
+        """
+        key = (ary.__array_interface__["data"][0],
+                ary.shape, ary.strides, ary.dtype)
+
+        entry = self._key_to_entry.get(key)
+        if entry is not None:
+            if entry.host_ref() is ary and not ary.flags.writeable:
+                self.hit_count += 1
+                self._keys.remove(key)
+                self._keys.append(key)
+                return entry.device_array
+
+            self._remove_entry(key)
+
+        device_array = self._upload(queue, ary)
+        self.upload_count += 1
+
+        if ary.flags.writeable or (
+                self.max_bytes is not None and ary.nbytes > self.max_bytes):
+            return device_array
+
+        while (self.max_bytes is not None
+                and self.nbytes + ary.nbytes > self.max_bytes):
+            self._remove_entry(self._keys[0])
+
+        cache_ref = weakref.ref(self)
+
+        def remove_entry(host_ref):
+            cache = cache_ref()
+            if cache is None:
+                return
+
+            other_entry = cache._key_to_entry.get(key)
+            if other_entry is not None and other_entry.host_ref is host_ref:
+                cache._remove_entry(key)
+
+        self._key_to_entry[key] = _HostArrayCacheEntry(
+                weakref.ref(ary, remove_entry), device_array)
+        self._keys.append(key)
+        self.nbytes += ary.nbytes
+
+        return device_array
+
+    def get(self, queue, ary):
+        """Return a :class:`numpy.ndarray` with the contents of the
+        :class:`pyopencl.array.Array` *ary*.
+        """
+        import numpy as np
+        import pyopencl as cl
+
+        if ary.nbytes == 0 or not _is_contiguous(ary):
+            return ary.get(queue=queue)
+
+        result = np.empty(ary.shape, ary.dtype,
+                order="C" if ary.flags.c_contiguous else "F")
+
+        staging_buffer = self._get_staging_buffer(ary.nbytes)
+        evt = cl.enqueue_copy(queue, staging_buffer, ary.base_data,
+                byte_count=ary.nbytes, src_offset=ary.offset,
+                wait_for=ary.events)
+
+        _, mapped = self._map_staging_buffer(
+                queue, ary.nbytes, cl.map_flags.READ, wait_for=[evt])
+        _as_byte_view(result)[:] = mapped
+        mapped.base.release(queue)
+
+        return result
+
+    def clear(self):
+        """Drop all device-side copies and the staging buffer."""
+        self._key_to_entry.clear()
+        del self._keys[:]
+        self.nbytes = 0
+        self._staging_buffer = None
+        self._staging_event = None
+
+# }}}
+
+
+# {{{ launch plan
+
+class PyOpenCLLaunchPlan(object):
+    """A kernel invocation with all of its arguments bound, which may be
+    launched repeatedly at a lower cost than calling the kernel. The checks,
+    conversions and allocations done by a kernel call happen only once, when
+    the plan is created by :meth:`PyOpenCLKernelExecutor.get_launch_plan`.
+    Each launch then only passes those arguments to the OpenCL kernels that
+    changed since their previous launch.
+
+    Unlike a kernel call, launching a plan does not consult or update
+    :attr:`pyopencl.array.Array.events`. Use the *wait_for* argument of
+    :meth:`__call__` and the returned event instead.
+
+    .. attribute:: args
+
+        A :class:`dict` mapping the names of the (implemented) kernel
+        arguments to their bound values, including output arrays allocated
+        when creating the plan.
+
+    .. automethod:: rebind
+    .. automethod:: __call__
+
+    .. versionadded:: 2019.1
+    """
+
+    def __init__(self, kernel, cl_kernels, queue, allocator, host_function,
+            implemented_data_info, args):
+        from loopy.kernel.data import KernelArgument
+        from loopy.kernel.array import ArrayBase
+        import loopy as lp
+
+        self.kernel = kernel
+        self.cl_kernels = cl_kernels
+        self.queue = queue
+        self.allocator = allocator
+        self.host_function = host_function
+        self.args = args
+
+        arg_infos = [idi for idi in implemented_data_info
+                if issubclass(idi.arg_class, KernelArgument)]
+
+        self._arg_name_to_index = dict(
+                (idi.name, i) for i, idi in enumerate(arg_infos))
+        self._array_arg_names = frozenset(
+                idi.name for idi in arg_infos
+                if issubclass(idi.arg_class, ArrayBase))
+        self._buffer_arg_names = frozenset(
+                idi.name for idi in arg_infos
+                if idi.arg_class in [lp.ArrayArg, lp.ConstantArg])
+
+        # {{{ find value arguments that the argument layout depends on
+
+        from loopy.symbolic import get_dependencies
+
+        layout_arg_names = set()
+        for idi in arg_infos:
+            if (idi.offset_for_name is not None
+                    or idi.stride_for_name_and_axis is not None):
+                layout_arg_names.add(idi.name)
+
+            for expr in (idi.shape or ()) + (idi.strides or ()):
+                if expr is not None:
+                    layout_arg_names.update(get_dependencies(expr))
+
+        self._layout_arg_names = frozenset(layout_arg_names)
+
+        # }}}
+
+        self._host_args = [
+                self._get_host_arg(idi.name, args[idi.name])
+                for idi in arg_infos]
+
+        written_variables = kernel.get_written_variables()
+        self._output_names = [
+                idi.name for idi in arg_infos
+                if idi.base_name in written_variables]
+
+    def _get_host_arg(self, name, value):
+        if name in self._buffer_arg_names and value is not None:
+            return value.base_data
+        else:
+            return value
+
+    def rebind(self, **changed):
+        """Replace the values of the arguments given as keyword arguments.
+
+        Arrays may only be replaced by arrays with the same data type, shape,
+        strides and offset. Values on which the shape or layout of
+        arguments depends may not be changed.
+        """
+        for name, value in six.iteritems(changed):
+            try:
+                arg_index = self._arg_name_to_index[name]
+            except KeyError:
+                raise TypeError("launch plan has no argument '%s'" % name)
+
+            if name in self._layout_arg_names:
+                raise LoopyError("cannot rebind '%s': the shape or layout of "
+                        "arguments depends on it--create a new launch plan "
+                        "instead" % name)
+
+            if name in self._array_arg_names:
+                old_value = self.args[name]
+
+                def get_signature(ary):
+                    return (ary.dtype, ary.shape, ary.strides,
+                            getattr(ary, "offset", 0))
+
+                if (not hasattr(value, "base_data")
+                        or get_signature(value) != get_signature(old_value)):
+                    raise LoopyError("cannot rebind '%s': only arrays of the "
+                            "same data type, shape, strides and offset as the "
+                            "one bound may be passed--create a new launch plan "
+                            "instead" % name)
+
+            self.args[name] = value
+            self._host_args[arg_index] = self._get_host_arg(name, value)
+
+    def __call__(self, wait_for=None):
+        """Launch the kernel with the bound arguments.
+
+        :returns: ``(evt, output)`` as for a kernel call, where the arrays in
+            *output* are always on the device.
+        """
+        evt = self.host_function(self.cl_kernels, self.queue,
+                *self._host_args, wait_for=wait_for, allocator=self.allocator)
+
+        if self.kernel.options.return_dict:
+            return evt, dict(
+                    (name, self.args[name]) for name in self._output_names)
+        else:
+            return evt, tuple(self.args[name] for name in self._output_names)
+
+# }}}
+
+
 # {{{ kernel executor
 
 
@@ -248,8 +740,15 @@ class PyOpenCLKernelExecutor(KernelExecutorBase):
     """An object connecting a kernel to a :class:`pyopencl.Context`
     for execution.
 
+    .. attribute:: host_array_cache
+
+        The :class:`HostArrayCache` used if
+        :attr:`loopy.Options.cl_exec_cache_host_arrays` is set, or *None* if
+        it has not been created yet.
+
     .. automethod:: __init__
     .. automethod:: __call__
+    .. automethod:: get_launch_plan
     """
 
     def __init__(self, context, kernel):
@@ -270,6 +769,8 @@ class PyOpenCLKernelExecutor(KernelExecutorBase):
             self.kernel = kernel.copy(target=(
                 kernel.target.with_device(context.devices[0])))
 
+        self.host_array_cache = None
+
     def get_invoker_uncached(self, kernel, codegen_result):
         generator = PyOpenCLExecutionWrapperGenerator()
         return generator(kernel, codegen_result)
@@ -315,11 +816,60 @@ class PyOpenCLKernelExecutor(KernelExecutorBase):
                 implemented_data_info=codegen_result.implemented_data_info,
                 invoker=self.get_invoker(kernel, codegen_result))
 
+    def get_default_allocator(self, queue):
+        import pyopencl as cl
+
+        if (queue.properties
+                & cl.command_queue_properties.OUT_OF_ORDER_EXEC_MODE_ENABLE):
+            # Global temporaries are released as soon as the last subkernel
+            # is enqueued. Handing their memory to another invocation is only
+            # safe if the queue orders the two.
+            return None
+
+        return get_memory_pool(queue,
+                max_held_bytes=(
+                    self.kernel.options.cl_exec_memory_pool_max_held_bytes))
+
+    def get_launch_plan(self, queue, **kwargs):
+        """Return a :class:`PyOpenCLLaunchPlan` for repeated invocations with
+        the arguments *kwargs*, which are processed as for :meth:`__call__`.
+        Arguments given as :mod:`numpy` arrays are transferred to the device
+        once. *allocator* is used for output arrays and global temporaries.
+        """
+        allocator = kwargs.pop("allocator", None)
+        if allocator is None:
+            allocator = self.get_default_allocator(queue)
+
+        if (self.kernel.options.cl_exec_cache_host_arrays
+                and self.host_array_cache is None):
+            self.host_array_cache = HostArrayCache(self.context,
+                    max_bytes=(
+                        self.kernel.options.cl_exec_host_array_cache_max_bytes))
+
+        kwargs = self.packing_controller.unpack(kwargs)
+
+        kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
+
+        host_function, args = kernel_info.invoker(
+                kernel_info.cl_kernels, queue, allocator, None,
+                None, self.host_array_cache, True, **kwargs)
+
+        if allocator is None:
+            import pyopencl.tools as cl_tools
+            allocator = cl_tools.DeferredAllocator(queue.context)
+
+        return PyOpenCLLaunchPlan(kernel_info.kernel, kernel_info.cl_kernels,
+                queue, allocator, host_function,
+                kernel_info.implemented_data_info, args)
+
     def __call__(self, queue, **kwargs):
         """
         :arg allocator: a callable passed a byte count and returning
             a :class:`pyopencl.Buffer`. A :class:`pyopencl` allocator
-            maybe.
+            maybe. If not given, allocations are made from
+            the memory pool shared by all kernels for *queue* (see
+            :func:`get_memory_pool`), except on out-of-order queues, where
+            buffers are allocated anew for each invocation.
         :arg wait_for: A list of :class:`pyopencl.Event` instances
             for which to wait.
         :arg out_host: :class:`bool`
@@ -346,13 +896,22 @@ class PyOpenCLKernelExecutor(KernelExecutorBase):
         wait_for = kwargs.pop("wait_for", None)
         out_host = kwargs.pop("out_host", None)
 
+        if allocator is None:
+            allocator = self.get_default_allocator(queue)
+
+        if (self.kernel.options.cl_exec_cache_host_arrays
+                and self.host_array_cache is None):
+            self.host_array_cache = HostArrayCache(self.context,
+                    max_bytes=(
+                        self.kernel.options.cl_exec_host_array_cache_max_bytes))
+
         kwargs = self.packing_controller.unpack(kwargs)
 
         kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
 
         return kernel_info.invoker(
                 kernel_info.cl_kernels, queue, allocator, wait_for,
-                out_host, **kwargs)
+                out_host, self.host_array_cache, **kwargs)
 
 # }}}
 
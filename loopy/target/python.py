@@ -32,9 +32,14 @@ from pymbolic.mapper.stringifier import StringifyMapper
 from loopy.type_inference import TypeInferenceMapper
 from loopy.kernel.data import ValueArg
 from loopy.diagnostic import LoopyError  # noqa
-from loopy.target import ASTBuilderBase
+from loopy.target import TargetBase, ASTBuilderBase, DummyHostASTBuilder
+from loopy.codegen import Unvectorizable
+from pytools import memoize_method
 from genpy import Suite
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 # {{{ expression to code
 
@@ -145,6 +150,129 @@ class ExpressionToPythonMapper(StringifyMapper):
                 else_=self.rec(expr.else_, PREC_LOGICAL_OR)),
             enclosing_prec, PREC_IFTHENELSE)
 
+
+class ArrayExpressionToPythonMapper(ExpressionToPythonMapper):
+    """Maps expressions to code evaluating them for all iterations of the
+    loop over *iname* at once, as NumPy arrays. Subscripts by an affine
+    function of the iname (along a single axis) become slices, other
+    occurrences of the iname refer to an array of its values, which is
+    recorded in :attr:`uses_iname_array`.
+
+    *array_names* is the set of names of variables whose values are
+    arrays, including *iname*.
+    """
+
+    def __init__(self, codegen_state, iname, lbound, ubound, array_names,
+            type_inf_mapper=None):
+        super(ArrayExpressionToPythonMapper, self).__init__(
+                codegen_state, type_inf_mapper)
+
+        self.iname = iname
+        self.lbound = lbound
+        self.ubound = ubound
+        self.array_names = array_names
+        self.uses_iname_array = False
+
+    def is_array(self, expr):
+        from loopy.symbolic import get_dependencies
+        return bool(get_dependencies(expr) & self.array_names)
+
+    def get_slice(self, index):
+        """Return a :class:`pymbolic.primitives.Slice` of the values taken
+        by *index* in the loop, or *None* if *index* is not an increasing
+        affine function of the iname.
+        """
+        from pymbolic import var
+        from pymbolic.primitives import Slice
+        from loopy.symbolic import CoefficientCollector, ConstantFoldingMapper
+
+        try:
+            coeffs = CoefficientCollector([self.iname])(index)
+        except (RuntimeError, ValueError, LoopyError):
+            # not affine
+            return None
+
+        stride = coeffs.pop(var(self.iname), 0)
+        offset = coeffs.pop(1, 0)
+
+        if (coeffs
+                or not isinstance(stride, (int, np.integer))
+                or stride <= 0
+                or self.is_array(offset)):
+            return None
+
+        cfm = ConstantFoldingMapper()
+        start = cfm(stride*self.lbound + offset)
+        stop = cfm(stride*(self.ubound + 1) + offset)
+        if stride == 1:
+            return Slice((start, stop))
+        else:
+            return Slice((start, stop, stride))
+
+    def map_variable(self, expr, enclosing_prec):
+        if expr.name == self.iname:
+            self.uses_iname_array = True
+
+        return super(ArrayExpressionToPythonMapper, self).map_variable(
+                expr, enclosing_prec)
+
+    def map_subscript(self, expr, enclosing_prec):
+        from pymbolic.primitives import Subscript
+
+        index = expr.index_tuple
+        array_axes = [
+                axis for axis, axis_index in enumerate(index)
+                if self.is_array(axis_index)]
+
+        if len(array_axes) == 1:
+            axis, = array_axes
+            slice_ = self.get_slice(index[axis])
+            if slice_ is not None:
+                expr = Subscript(
+                        expr.aggregate,
+                        index[:axis] + (slice_,) + index[axis+1:])
+
+        return super(ArrayExpressionToPythonMapper, self).map_subscript(
+                expr, enclosing_prec)
+
+    def map_call(self, expr, enclosing_prec):
+        result = super(ArrayExpressionToPythonMapper, self).map_call(
+                expr, enclosing_prec)
+
+        if self.is_array(expr) and not result.startswith("_lpy_np."):
+            raise Unvectorizable("call to '%s'" % expr.function)
+
+        return result
+
+    def map_if(self, expr, enclosing_prec):
+        if self.is_array(expr):
+            # Both branches would be evaluated for all iterations.
+            raise Unvectorizable("conditional expression")
+
+        return super(ArrayExpressionToPythonMapper, self).map_if(
+                expr, enclosing_prec)
+
+    def map_logical_not(self, expr, enclosing_prec):
+        if self.is_array(expr):
+            raise Unvectorizable("logical operator")
+
+        return super(ArrayExpressionToPythonMapper, self).map_logical_not(
+                expr, enclosing_prec)
+
+    def map_logical_and(self, expr, enclosing_prec):
+        if self.is_array(expr):
+            raise Unvectorizable("logical operator")
+
+        return super(ArrayExpressionToPythonMapper, self).map_logical_and(
+                expr, enclosing_prec)
+
+    def map_logical_or(self, expr, enclosing_prec):
+        if self.is_array(expr):
+            raise Unvectorizable("logical operator")
+
+        return super(ArrayExpressionToPythonMapper, self).map_logical_or(
+                expr, enclosing_prec)
+
 # }}}
 
 
@@ -308,4 +436,267 @@ class PythonASTBuilderBase(ASTBuilderBase):
 
 # }}}
 
+
+# {{{ ast builder with whole-array loops
+
+def _get_loop_body_insn_ids(kernel, sched_index):
+    """Return the IDs of the instructions in the body of the loop entered at
+    *sched_index*, or *None* if it contains anything other than instructions.
+    """
+    from loopy.schedule import RunInstruction, LeaveLoop
+
+    result = []
+    for sched_item in kernel.schedule[sched_index+1:]:
+        if isinstance(sched_item, LeaveLoop):
+            return result
+        elif isinstance(sched_item, RunInstruction):
+            result.append(sched_item.insn_id)
+        else:
+            return None
+
+
+def _count_assignments(ast):
+    """Return the number of assignments in *ast*, or *None* if it contains
+    anything other than assignments (such as conditionals).
+    """
+    from genpy import Assign, Line, Comment
+
+    if isinstance(ast, Assign):
+        return 1
+    elif isinstance(ast, (Line, Comment)):
+        return 0
+    elif isinstance(ast, Suite):
+        result = 0
+        for item in ast.contents:
+            item_count = _count_assignments(item)
+            if item_count is None:
+                return None
+            result += item_count
+
+        return result
+    else:
+        return None
+
+
+def _get_array_assignments(codegen_state, iname, insn_ids, lbound, ubound):
+    """Return assignments carrying out the instructions *insn_ids* for all
+    iterations of the loop over *iname* at once. Raise
+    :exc:`loopy.codegen.Unvectorizable` if the iterations might depend on
+    each other.
+    """
+    kernel = codegen_state.kernel
+
+    from pymbolic.mapper.stringifier import PREC_NONE, PREC_SUM
+    from pymbolic.primitives import Subscript, Sum
+    from loopy.kernel.data import Assignment
+    from loopy.symbolic import ArrayAccessFinder, get_dependencies
+    from genpy import Assign
+
+    insns = [kernel.id_to_insn[insn_id] for insn_id in insn_ids]
+    body_insn_ids = frozenset(insn_ids)
+
+    reader_map = kernel.reader_map()
+    writer_map = kernel.writer_map()
+
+    array_names = set([iname])
+    ecm = ArrayExpressionToPythonMapper(
+            codegen_state, iname, lbound, ubound, array_names)
+
+    result = []
+
+    for insn in insns:
+        if not isinstance(insn, Assignment) or insn.atomicity:
+            raise Unvectorizable(
+                    "instruction '%s' is not a plain assignment" % insn.id)
+
+        var_name, = insn.assignee_var_names()
+        assignee = insn.assignee
+        if isinstance(assignee, Subscript):
+            index = assignee.index_tuple
+        else:
+            index = ()
+
+        loop_reader_ids = reader_map.get(var_name, set()) & body_insn_ids
+        loop_writer_ids = writer_map[var_name] & body_insn_ids
+
+        array_axes = [
+                axis for axis, axis_index in enumerate(index)
+                if ecm.is_array(axis_index)]
+
+        if array_axes:
+            # Written at a different index in each iteration, which may only
+            # be read in the same iteration.
+            if (len(array_axes) != 1
+                    or ecm.get_slice(index[array_axes[0]]) is None):
+                raise Unvectorizable("'%s' is written at an index that is "
+                        "not an increasing affine function of '%s'"
+                        % (var_name, iname))
+
+            for other_insn_id in loop_reader_ids | loop_writer_ids:
+                other_insn = kernel.id_to_insn[other_insn_id]
+                accesses = ArrayAccessFinder(var_name)(other_insn.expression)
+                if other_insn_id in loop_writer_ids:
+                    accesses.add(other_insn.assignee)
+
+                if any(access.index_tuple != index for access in accesses):
+                    raise Unvectorizable("'%s' is accessed at differing "
+                            "indices within the loop" % var_name)
+
+            expression = ecm(insn.expression, PREC_NONE)
+
+        elif (not index
+                and var_name in kernel.temporary_variables
+                and (reader_map.get(var_name, set()) | writer_map[var_name])
+                <= body_insn_ids
+                and loop_writer_ids == set([insn.id])
+                and all(insn_ids.index(reader_id) > insn_ids.index(insn.id)
+                    for reader_id in loop_reader_ids)):
+            # A scalar temporary only used within the loop and assigned
+            # before being read in each iteration, which becomes an array.
+            expression = ecm(insn.expression, PREC_NONE)
+            if ecm.is_array(insn.expression):
+                array_names.add(var_name)
+
+        else:
+            # The same element is accessed in all iterations, which is only
+            # supported for sums accumulating into it.
+            terms = ()
+            if isinstance(insn.expression, Sum):
+                terms = insn.expression.children
+
+            other_terms = tuple(term for term in terms if term != assignee)
+
+            if (loop_reader_ids | loop_writer_ids != set([insn.id])
+                    or len(other_terms) != len(terms) - 1
+                    or var_name in get_dependencies(other_terms)
+                    or not ecm.is_array(other_terms)):
+                raise Unvectorizable("'%s' is accessed at the same index "
+                        "in all iterations" % var_name)
+
+            if len(other_terms) == 1:
+                summand, = other_terms
+            else:
+                summand = Sum(other_terms)
+
+            expression = "%s + _lpy_np.sum(%s)" % (
+                    ecm(assignee, PREC_SUM), ecm(summand, PREC_NONE))
+
+        result.append(Assign(ecm(assignee, PREC_NONE), expression))
+
+    if ecm.uses_iname_array:
+        result.insert(0, Assign(
+            iname,
+            "_lpy_np.arange(%s, %s + 1)" % (
+                ecm(lbound, PREC_NONE), ecm(ubound, PREC_SUM))))
+
+    return result
+
+
+class PythonASTBuilder(PythonASTBuilderBase):
+    """A Python AST builder for :class:`PythonTarget`, which carries out
+    innermost loops whose iterations do not depend on each other by
+    operations on whole NumPy arrays.
+    """
+
+    def emit_array_sequential_loop(self, codegen_state, sched_index,
+            lbound, ubound, inner):
+        kernel = codegen_state.kernel
+        iname = kernel.schedule[sched_index].iname
+
+        insn_ids = _get_loop_body_insn_ids(kernel, sched_index)
+        if insn_ids is None or _count_assignments(inner) != len(insn_ids):
+            # The loop contains other loops, barriers or conditionals.
+            return None
+
+        try:
+            assignments = _get_array_assignments(
+                    codegen_state, iname, insn_ids, lbound, ubound)
+        except Unvectorizable as e:
+            logger.debug("%s: not using array operations for loop over '%s': "
+                    "%s" % (kernel.name, iname, e))
+            return None
+
+        ecm = codegen_state.expression_to_code_mapper
+
+        from pymbolic.mapper.stringifier import PREC_COMPARISON
+        return self.emit_if(
+                "%s <= %s" % (
+                    ecm(lbound, PREC_COMPARISON, "i"),
+                    ecm(ubound, PREC_COMPARISON, "i")),
+                Suite(assignments))
+
+# }}}
+
+
+# {{{ target
+
+class PythonTarget(TargetBase):
+    """A target for plain Python using NumPy, without any parallel extensions.
+    Kernels are executable (with arrays passed as :class:`numpy.ndarray`
+    instances), without needing a compiler.
+
+    Innermost sequential loops (i.e. loops over inames without an
+    implementation tag) are carried out by operations on whole NumPy arrays
+    if they only contain assignments without predicates or conditionals,
+    and their iterations do not depend on each other. This is the case if
+    every variable written in such a loop is either
+
+    * written at an index increasing affinely with the iname along one axis
+      and only accessed at that index within the loop,
+    * a scalar temporary that is only used within the loop and assigned
+      before being read in each iteration, or
+    * only accessed by a single instruction within the loop, which adds to
+      it (as in a reduction).
+
+    Other loops are executed as Python loops.
+
+    .. versionadded:: 2019.1
+    """
+
+    def split_kernel_at_global_barriers(self):
+        return False
+
+    def get_host_ast_builder(self):
+        return DummyHostASTBuilder(self)
+
+    def get_device_ast_builder(self):
+        return PythonASTBuilder(self)
+
+    # {{{ types
+
+    @memoize_method
+    def get_dtype_registry(self):
+        from loopy.target.c import DTypeRegistryWrapper
+        from loopy.target.c.compyte.dtypes import (
+                DTypeRegistry, fill_registry_with_c_types)
+        result = DTypeRegistry()
+        fill_registry_with_c_types(result, respect_windows=False,
+                include_bool=True)
+        return DTypeRegistryWrapper(result)
+
+    def is_vector_dtype(self, dtype):
+        return False
+
+    def get_vector_dtype(self, base, count):
+        raise KeyError()
+
+    def get_or_register_dtype(self, names, dtype=None):
+        # These kind of shouldn't be here.
+        return self.get_dtype_registry().get_or_register_dtype(names, dtype)
+
+    def dtype_to_typename(self, dtype):
+        # These kind of shouldn't be here.
+        return self.get_dtype_registry().dtype_to_ctype(dtype)
+
+    # }}}
+
+    def get_kernel_executor_cache_key(self, *args, **kwargs):
+        return None
+
+    def get_kernel_executor(self, knl, *args, **kwargs):
+        from loopy.target.python_execution import PythonKernelExecutor
+        return PythonKernelExecutor(knl)
+
+# }}}
+
 # vim: foldmethod=marker
@@ -0,0 +1,125 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+import six
+
+from pytools import memoize_method
+from pytools.py_codegen import Indentation
+
+from loopy.target.execution import (
+    KernelExecutorBase, ExecutionWrapperGeneratorBase, _KernelInfo,
+    get_highlighted_python_code)
+from loopy.target.c.c_execution import CExecutionWrapperGenerator
+
+
+class PythonExecutionWrapperGenerator(CExecutionWrapperGenerator):
+    """
+    Specialized form of the :class:`ExecutionWrapperGeneratorBase` for
+    execution of kernels generated for :class:`loopy.PythonTarget`
+    """
+
+    def __init__(self):
+        system_args = ["_lpy_python_kernels"]
+        ExecutionWrapperGeneratorBase.__init__(self, system_args)
+
+    # {{{ generate invocation
+
+    def generate_invocation(self, gen, kernel_name, args,
+            kernel, implemented_data_info):
+        gen("for knl in _lpy_python_kernels:")
+        with Indentation(gen):
+            gen('knl({args})'.format(
+                args=", ".join(args)))
+
+    # }}}
+
+
+class PythonKernelExecutor(KernelExecutorBase):
+    """An object connecting a kernel to the Python functions generated for it
+    for execution.
+
+    .. automethod:: __call__
+    """
+
+    def get_invoker_uncached(self, kernel, codegen_result):
+        generator = PythonExecutionWrapperGenerator()
+        return generator(kernel, codegen_result)
+
+    @memoize_method
+    def kernel_info(self, arg_to_dtype_set=frozenset(), all_kwargs=None):
+        kernel = self.get_typed_and_scheduled_kernel(arg_to_dtype_set)
+
+        from loopy.codegen import generate_code_v2
+        codegen_result = generate_code_v2(kernel)
+
+        dev_code = codegen_result.device_code()
+
+        if self.kernel.options.write_cl:
+            output = dev_code
+            if self.kernel.options.highlight_cl:
+                output = get_highlighted_python_code(output)
+
+            if self.kernel.options.write_cl is True:
+                print(output)
+            else:
+                with open(self.kernel.options.write_cl, "w") as outf:
+                    outf.write(output)
+
+        if self.kernel.options.edit_cl:
+            from pytools import invoke_editor
+            dev_code = invoke_editor(dev_code, "code.py")
+
+        namespace = {}
+        six.exec_(
+                compile(dev_code, "<generated code for '%s'>" % kernel.name,
+                    "exec"),
+                namespace)
+
+        return _KernelInfo(
+                kernel=kernel,
+                python_kernels=[
+                    namespace[dp.name]
+                    for dp in codegen_result.device_programs],
+                implemented_data_info=codegen_result.implemented_data_info,
+                invoker=self.get_invoker(kernel, codegen_result))
+
+    def __call__(self, *args, **kwargs):
+        """
+        :returns: ``(None, output)`` the output is a tuple of output arguments
+            (arguments that are written as part of the kernel). The order is given
+            by the order of kernel arguments. If this order is unspecified
+            (such as when kernel arguments are inferred automatically),
+            enable :attr:`loopy.Options.return_dict` to make *output* a
+            :class:`dict` instead, with keys of argument names and values
+            of the returned arrays.
+        """
+
+        kwargs = self.packing_controller.unpack(kwargs)
+
+        kernel_info = self.kernel_info(self.arg_to_dtype_set(kwargs))
+
+        return kernel_info.invoker(
+                kernel_info.python_kernels, *args, **kwargs)
+
+# vim: foldmethod=marker
@@ -33,6 +33,7 @@ except ImportError:
 import numpy as np
 from pytools import memoize_method
 from pytools.persistent_dict import KeyBuilder as KeyBuilderBase
+from pytools.persistent_dict import WriteOncePersistentDict
 from loopy.symbolic import WalkMapper as LoopyWalkMapper
 from pymbolic.mapper.persistent_hash import (
         PersistentHashWalkMapper as PersistentHashWalkMapperBase)
@@ -98,12 +99,20 @@ class LoopyKeyBuilder(KeyBuilderBase):
             method(key_hash, key)
             return
 
+        if issubclass(key, np.generic):
+            # numpy scalar types, such as numpy.float32
+            self.rec(key_hash, np.dtype(key))
+            return
+
         raise TypeError("unsupported type for persistent hash keying: %s"
                 % type(key))
 
     def update_for_type_auto(self, key_hash, key):
         key_hash.update("auto".encode("utf8"))
 
+    def update_for_ellipsis(self, key_hash, key):
+        key_hash.update("...".encode("utf8"))
+
     def update_for_pymbolic_expression(self, key_hash, key):
         if key is None:
             self.update_for_NoneType(key_hash, key)
@@ -187,6 +196,175 @@ class LoopyEqKeyBuilder(object):
 # }}}
 
 
+# {{{ persistent dict with usage statistics
+
+class LoopyPersistentDict(WriteOncePersistentDict):
+    """A :class:`pytools.persistent_dict.WriteOncePersistentDict` using a
+    :class:`LoopyKeyBuilder` that counts hits and misses. The counts are
+    accumulated in a file in the cache directory upon
+    :meth:`flush_statistics`, which is called at interpreter exit, so that
+    they can be reported across processes by :mod:`loopy.cache`.
+
+    .. attribute:: hits
+    .. attribute:: misses
+
+    .. automethod:: flush_statistics
+    """
+
+    statistics_file_name = "loopy-statistics.json"
+
+    def __init__(self, identifier, key_builder=None, container_dir=None):
+        if key_builder is None:
+            key_builder = LoopyKeyBuilder()
+
+        WriteOncePersistentDict.__init__(self, identifier,
+                key_builder=key_builder, container_dir=container_dir)
+
+        self.hits = 0
+        self.misses = 0
+
+        import atexit
+        atexit.register(self.flush_statistics)
+
+    def fetch(self, key, _stacklevel=0):
+        try:
+            result = WriteOncePersistentDict.fetch(
+                    self, key, _stacklevel=1 + _stacklevel)
+        except KeyError:
+            self.misses += 1
+            raise
+
+        self.hits += 1
+        return result
+
+    def __getitem__(self, key):
+        return self.fetch(key, _stacklevel=1)
+
+    @property
+    def statistics_file(self):
+        from os.path import join
+        return join(self.container_dir, self.statistics_file_name)
+
+    def read_statistics(self):
+        """Return a tuple ``(hits, misses)`` of the counts accumulated on
+        disk, not including those not yet flushed by this process.
+        """
+        import json
+        try:
+            with open(self.statistics_file, "r") as inf:
+                stats = json.load(inf)
+        except (IOError, OSError, ValueError):
+            return 0, 0
+
+        return stats.get("hits", 0), stats.get("misses", 0)
+
+    def flush_statistics(self):
+        """Add the hit and miss counts of this process to those stored on
+        disk and reset them.
+        """
+        if not (self.hits or self.misses):
+            return
+
+        import json
+        import os
+        from pytools.persistent_dict import CleanupManager, LockManager
+
+        cleanup_m = CleanupManager()
+        try:
+            try:
+                self._make_container_dir()
+                LockManager(cleanup_m, self.statistics_file + ".lock")
+
+                hits, misses = self.read_statistics()
+
+                tmp_file = "%s.%d" % (self.statistics_file, os.getpid())
+                with open(tmp_file, "w") as outf:
+                    json.dump({
+                        "hits": hits + self.hits,
+                        "misses": misses + self.misses}, outf)
+                os.rename(tmp_file, self.statistics_file)
+
+                self.hits = 0
+                self.misses = 0
+            except Exception:
+                cleanup_m.error_clean_up()
+                raise
+        finally:
+            cleanup_m.clean_up()
+
+# }}}
+
+
+# {{{ renaming-invariant persistent dict
+
+class _RenamingInvariantKey(object):
+    def __init__(self, canonical_key, renaming):
+        self.canonical_key = canonical_key
+        self.renaming = renaming
+
+
+class RenamingInvariantPersistentDict(object):
+    """A :class:`pytools.persistent_dict.WriteOncePersistentDict` for values
+    computed from a :class:`loopy.LoopKernel`, keyed on the kernel up to a
+    renaming of its identifiers (see
+    :func:`loopy.kernel.tools.get_canonical_identifier_renaming`).
+
+    Values are stored together with the renaming that maps the kernel they
+    were computed from to its canonical form. Upon retrieval for a different
+    kernel with the same canonical form, the value is mapped to the names
+    of that kernel using *rename_value*.
+
+    :arg rename_value: a function ``(value, renaming) -> value`` that applies
+        a :class:`loopy.kernel.tools.IdentifierRenaming` to a cached value,
+        or returns *None* if that is not possible (e.g. because of a name
+        clash). In the latter case, the lookup is treated as a miss.
+    :arg canonicalization_kwargs: passed on to
+        :func:`loopy.kernel.tools.get_canonical_identifier_renaming`, or a
+        function that, given a kernel, returns these keyword arguments.
+
+    .. automethod:: make_key
+    .. automethod:: __getitem__
+    .. automethod:: store_if_not_present
+    """
+
+    def __init__(self, identifier, rename_value, canonicalization_kwargs=None):
+        self.persistent_dict = LoopyPersistentDict(identifier)
+        self.rename_value = rename_value
+        self.canonicalization_kwargs = canonicalization_kwargs
+
+    def make_key(self, kernel, *extra_key):
+        from loopy.kernel.tools import (
+                get_canonical_identifier_renaming, rename_identifiers)
+
+        kwargs = self.canonicalization_kwargs
+        if callable(kwargs):
+            kwargs = kwargs(kernel)
+
+        renaming = get_canonical_identifier_renaming(kernel, **(kwargs or {}))
+        return _RenamingInvariantKey(
+                (rename_identifiers(kernel, renaming),) + extra_key,
+                renaming)
+
+    def __getitem__(self, key):
+        cached_renaming, value = self.persistent_dict[key.canonical_key]
+
+        renaming = cached_renaming.then(key.renaming.inverted())
+        if renaming.is_identity():
+            return value
+
+        value = self.rename_value(value, renaming)
+        if value is None:
+            raise KeyError(key)
+
+        return value
+
+    def store_if_not_present(self, key, value):
+        self.persistent_dict.store_if_not_present(
+                key.canonical_key, (key.renaming, value))
+
+# }}}
+
+
 # {{{ remove common indentation
 
 def remove_common_indentation(code, require_leading_newline=True,
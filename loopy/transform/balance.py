@@ -0,0 +1,374 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import six
+import numpy as np
+
+import islpy as isl
+from islpy import dim_type
+
+from loopy.diagnostic import LoopyError
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+
+.. currentmodule:: loopy
+
+Loops over rows of data with a data-dependent amount of work per row (such
+as a sparse matrix in compressed sparse row (CSR) format, for which the
+work for row *i* is given by the difference of consecutive entries
+``rowstarts[i+1] - rowstarts[i]`` of an offset array) may be balanced by
+distributing the rows among a number of *parts* of roughly equal work,
+instead of assigning each row to a work item. The parts are computed by an
+*inspector* kernel from the offsets, and the *executor* kernel (resulting
+from :func:`partition_iname_by_work`) iterates over them::
+
+    knl = lp.partition_iname_by_work(knl, "i", nparts=256)
+    knl = lp.tag_inames(knl, {"i_part": "g.0"})
+
+    inspector = lp.WorkPartitionInspector(256, offsets="rowstarts", nrows="m")
+    part_starts = inspector(queue, rowstarts=rowstarts)
+    evt, (y,) = knl(queue, rowstarts=rowstarts, part_starts=part_starts, ...)
+
+.. autofunction:: make_work_partition_inspector
+
+.. autoclass:: WorkPartitionInspector
+
+.. autofunction:: partition_iname_by_work
+"""
+
+
+# {{{ inspector
+
+def make_work_partition_inspector(nparts, offsets="rowstarts", nrows="m",
+        part_starts="part_starts", index_dtype=np.int32, target=None):
+    """Return a kernel computing a partition of the rows ``0 <= i < nrows``
+    into *nparts* parts of consecutive rows, such that the amount of work
+    (given by the differences of consecutive entries of *offsets*, which
+    has *nrows* + 1 entries) is split as evenly as possible without
+    splitting rows.
+
+    The kernel writes the array *part_starts* of *nparts* + 1 entries, so
+    that part *p* consists of the rows ``part_starts[p] <= i <
+    part_starts[p+1]``. Part *p* starts with the first row starting after
+    (at least) a fraction of ``p/nparts`` of the total work, so that each
+    part is assigned that fraction of the work, plus at most the work of
+    its last row.
+
+    All arrays have the type *index_dtype*, which must be able to hold
+    *nparts* times the total work.
+
+    .. versionadded:: 2019.1
+    """
+    from loopy.kernel.creation import make_kernel
+    from loopy.kernel.data import GlobalArg, ValueArg
+    from loopy.version import MOST_RECENT_LANGUAGE_VERSION
+
+    return make_kernel(
+            "[{nrows}] -> {{[p, i]: 0 <= p < {nparts} and 0 <= i < {nrows}}}"
+            .format(nrows=nrows, nparts=nparts),
+            """
+            {part_starts}[p] = sum(i, if(
+                {nparts}*({offsets}[i] - {offsets}[0])
+                < p*({offsets}[{nrows}] - {offsets}[0]), 1, 0))
+            {part_starts}[{nparts}] = {nrows}
+            """.format(
+                nrows=nrows, nparts=nparts,
+                offsets=offsets, part_starts=part_starts),
+            [
+                GlobalArg(offsets, index_dtype, shape=nrows + " + 1"),
+                GlobalArg(part_starts, index_dtype, shape=(nparts + 1,)),
+                ValueArg(nrows, index_dtype),
+                ],
+            name="partition_work",
+            target=target,
+            index_dtype=index_dtype,
+            lang_version=MOST_RECENT_LANGUAGE_VERSION)
+
+
+class WorkPartitionInspector(object):
+    """Computes partitions of rows by the amount of work per row using a
+    kernel obtained from :func:`make_work_partition_inspector` (with the
+    same arguments as the constructor, except for *max_plans*), and caches
+    them by the content of the offsets they are computed from (i.e., for a
+    sparse matrix, its sparsity structure), the number of rows and the
+    :class:`pyopencl.Context` of the queue (if any), so that the inspector
+    kernel is only run once for each structure.
+
+    .. attribute:: kernel
+
+        The inspector kernel.
+
+    .. attribute:: max_plans
+
+        The number of partitions kept in the cache. Once it is exceeded,
+        the least recently computed partition is dropped. *None* means no
+        limit.
+
+    .. automethod:: __call__
+
+    .. versionadded:: 2019.1
+    """
+
+    def __init__(self, nparts, offsets="rowstarts", nrows="m",
+            part_starts="part_starts", index_dtype=np.int32, target=None,
+            max_plans=16):
+        self.offsets = offsets
+        self.nrows = nrows
+        self.part_starts = part_starts
+        self.kernel = make_work_partition_inspector(
+                nparts, offsets, nrows, part_starts, index_dtype, target)
+
+        self.max_plans = max_plans
+        self.plan_cache = {}
+        self.plan_cache_keys = []
+
+    def __call__(self, *args, **kwargs):
+        """Return the array of part starts (see
+        :func:`make_work_partition_inspector`) for the offsets passed as
+        the keyword argument named like the offsets array. All arguments
+        are passed on to the inspector kernel if the partition is not found
+        in the cache.
+
+        A cached array is returned to each caller asking for the same
+        partition, and must not be modified.
+        """
+        offsets = kwargs[self.offsets]
+
+        queue = args[0] if args else kwargs.get("queue")
+        context = getattr(queue, "context", None)
+
+        if hasattr(offsets, "get"):
+            # a device array
+            host_offsets = offsets.get()
+        else:
+            host_offsets = np.asarray(offsets)
+
+        from hashlib import sha256
+        cache_key = (
+                context,
+                kwargs.get(self.nrows),
+                host_offsets.dtype.str,
+                sha256(np.ascontiguousarray(host_offsets).tobytes()).hexdigest())
+
+        try:
+            return self.plan_cache[cache_key]
+        except KeyError:
+            pass
+
+        logger.debug("%s: plan cache miss" % self.kernel.name)
+
+        _, outputs = self.kernel(*args, **kwargs)
+        part_starts, = outputs
+
+        self.plan_cache[cache_key] = part_starts
+        self.plan_cache_keys.append(cache_key)
+
+        if (self.max_plans is not None
+                and len(self.plan_cache_keys) > self.max_plans):
+            del self.plan_cache[self.plan_cache_keys.pop(0)]
+
+        return part_starts
+
+# }}}
+
+
+# {{{ executor
+
+def partition_iname_by_work(kernel, iname, nparts, part_starts="part_starts",
+        part_iname=None):
+    """Make the loop over *iname* iterate over the rows of a partition
+    computed by :func:`make_work_partition_inspector` (or
+    :class:`WorkPartitionInspector`), passed as the new argument
+    *part_starts* (unless the kernel already has such an argument), inside
+    a new loop over the parts. The loop over *iname* then is sequential
+    within each part, and the loop over the parts may be tagged to be
+    carried out in parallel.
+
+    :arg nparts: the number of parts, as an integer or the name of a
+        (possibly new) parameter of the kernel.
+    :arg part_iname: the name of the iname numbering the parts, by default
+        *iname* followed by ``_part``.
+
+    *iname* must not be tagged, may not be a reduction iname and its
+    bounds may not depend on other inames. Its domain is intersected with
+    the rows of each part, so that the original bounds (such as ``0 <= i <
+    m``) remain in effect.
+
+    .. versionadded:: 2019.1
+    """
+    from pymbolic import var
+    from loopy.kernel.data import (
+            Assignment, TemporaryVariable, GlobalArg, ValueArg, AddressSpace)
+
+    if iname not in kernel.all_inames():
+        raise LoopyError("partition_iname_by_work: iname '%s' not found"
+                % iname)
+
+    if kernel.iname_tags(iname):
+        raise LoopyError("cannot partition tagged iname '%s'" % iname)
+
+    for insn in kernel.instructions:
+        if iname in insn.reduction_inames():
+            raise LoopyError("cannot partition reduction iname '%s'" % iname)
+
+    var_name_gen = kernel.get_var_name_generator()
+    insn_id_gen = kernel.get_instruction_id_generator()
+
+    if part_iname is None:
+        part_iname = var_name_gen(iname + "_part")
+    elif part_iname in kernel.all_inames():
+        raise LoopyError("iname '%s' already exists" % part_iname)
+
+    part_start_name = var_name_gen(iname + "_part_start")
+    part_end_name = var_name_gen(iname + "_part_end")
+
+    # {{{ domains
+
+    dom_idx = kernel.get_home_domain_index(iname)
+    if kernel.parents_per_domain()[dom_idx] is not None:
+        raise LoopyError("cannot partition iname '%s': its domain is nested "
+                "within that of other inames" % iname)
+
+    domain = kernel.domains[dom_idx]
+    other_inames = [
+            dom_iname for dom_iname in domain.get_var_names(dim_type.set)
+            if dom_iname != iname]
+
+    # The domain must be the product of the range of iname and that of the
+    # other inames, which are split off into a domain of their own.
+    var_dict = domain.get_var_dict(dim_type.set)
+    without_iname = domain.eliminate(dim_type.set, var_dict[iname][1], 1)
+    only_iname = domain
+    for other_iname in other_inames:
+        only_iname = only_iname.eliminate(
+                dim_type.set, var_dict[other_iname][1], 1)
+
+    if not (without_iname & only_iname).is_subset(domain):
+        raise LoopyError("cannot partition iname '%s': its bounds depend "
+                "on other inames" % iname)
+
+    iname_domain = domain.project_out_except([iname], [dim_type.set])
+    other_domain = domain.project_out_except(other_inames, [dim_type.set])
+
+    nparams = iname_domain.dim(dim_type.param)
+    iname_domain = (iname_domain
+            .add_dims(dim_type.param, 2)
+            .set_dim_name(dim_type.param, nparams, part_start_name)
+            .set_dim_name(dim_type.param, nparams+1, part_end_name))
+
+    part_bounds = isl.BasicSet(
+            "[{start}, {end}] -> {{[{iname}]: {start} <= {iname} < {end}}}"
+            .format(start=part_start_name, end=part_end_name, iname=iname))
+    iname_domain = iname_domain & isl.align_spaces(part_bounds, iname_domain)
+
+    if isinstance(nparts, six.string_types):
+        part_domain = isl.BasicSet(
+                "[{nparts}] -> {{[{part_iname}]: 0 <= {part_iname} < {nparts}}}"
+                .format(nparts=nparts, part_iname=part_iname))
+    else:
+        part_domain = isl.BasicSet(
+                "{{[{part_iname}]: 0 <= {part_iname} < {nparts}}}"
+                .format(nparts=nparts, part_iname=part_iname))
+
+    new_domains = kernel.domains[:dom_idx]
+    if other_inames:
+        new_domains.append(other_domain)
+    new_domains.extend([part_domain, iname_domain])
+    new_domains.extend(kernel.domains[dom_idx+1:])
+
+    # }}}
+
+    # {{{ arguments and temporaries
+
+    new_args = list(kernel.args)
+    arg_names = set(arg.name for arg in kernel.args)
+
+    if isinstance(nparts, six.string_types):
+        nparts_expr = var(nparts)
+        if nparts not in arg_names:
+            new_args.append(ValueArg(nparts, kernel.index_dtype))
+    else:
+        nparts_expr = nparts
+
+    if part_starts not in arg_names:
+        new_args.append(GlobalArg(
+            part_starts, kernel.index_dtype, shape=(nparts_expr + 1,),
+            dim_tags="c"))
+
+    new_temporary_variables = kernel.temporary_variables.copy()
+    for name in [part_start_name, part_end_name]:
+        new_temporary_variables[name] = TemporaryVariable(
+                name=name,
+                dtype=kernel.index_dtype,
+                shape=(),
+                address_space=AddressSpace.PRIVATE)
+
+    # }}}
+
+    # {{{ instructions
+
+    part_start_insn_id = insn_id_gen(part_start_name)
+    part_end_insn_id = insn_id_gen(part_end_name)
+
+    new_insns = [
+            Assignment(
+                id=part_start_insn_id,
+                assignee=var(part_start_name),
+                expression=var(part_starts)[var(part_iname)],
+                within_inames=frozenset([part_iname]),
+                within_inames_is_final=True),
+            Assignment(
+                id=part_end_insn_id,
+                assignee=var(part_end_name),
+                expression=var(part_starts)[var(part_iname) + 1],
+                within_inames=frozenset([part_iname]),
+                within_inames_is_final=True),
+            ]
+
+    for insn in kernel.instructions:
+        if iname in kernel.insn_inames(insn):
+            insn = insn.copy(
+                    within_inames=(
+                        kernel.insn_inames(insn) | frozenset([part_iname])),
+                    depends_on=insn.depends_on | frozenset(
+                        [part_start_insn_id, part_end_insn_id]))
+
+        new_insns.append(insn)
+
+    # }}}
+
+    return kernel.copy(
+            domains=new_domains,
+            args=new_args,
+            temporary_variables=new_temporary_variables,
+            instructions=new_insns)
+
+# }}}
+
+# vim: foldmethod=marker
@@ -29,8 +29,7 @@ from loopy.symbolic import (get_dependencies,
         RuleAwareIdentityMapper, SubstitutionRuleMappingContext,
         SubstitutionMapper)
 from pymbolic.mapper.substitutor import make_subst_func
-from pytools.persistent_dict import WriteOncePersistentDict
-from loopy.tools import LoopyKeyBuilder, PymbolicExpressionHashWrapper
+from loopy.tools import LoopyPersistentDict, PymbolicExpressionHashWrapper
 from loopy.version import DATA_MODEL_VERSION
 from loopy.diagnostic import LoopyError
 
@@ -124,9 +123,8 @@ class ArrayAccessReplacer(RuleAwareIdentityMapper):
 # }}}
 
 
-buffer_array_cache = WriteOncePersistentDict(
-        "loopy-buffer-array-cache-"+DATA_MODEL_VERSION,
-        key_builder=LoopyKeyBuilder())
+buffer_array_cache = LoopyPersistentDict(
+        "loopy-buffer-array-cache-"+DATA_MODEL_VERSION)
 
 
 # Adding an argument? also add something to the cache_key below.
@@ -0,0 +1,325 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import six
+
+from pymbolic.primitives import Variable, Subscript
+
+from loopy.symbolic import (
+        IdentityMapper, LinearSubscript, TypeCast,
+        EqualityPreservingStringifyMapper)
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+
+.. currentmodule:: loopy
+
+.. autofunction:: eliminate_common_subexpressions
+"""
+
+
+# {{{ normalization
+
+class _CommutativeNormalizer(IdentityMapper):
+    """Sorts the operands of sums and products, so that equal subexpressions
+    differing only in the order of these compare (and stringify) equal.
+    """
+
+    def __init__(self):
+        self.stringify = EqualityPreservingStringifyMapper()
+
+    def map_commutative(self, expr):
+        children = [self.rec(child) for child in expr.children]
+        return type(expr)(tuple(sorted(children, key=self.stringify)))
+
+    map_sum = map_commutative
+    map_product = map_commutative
+
+# }}}
+
+
+# {{{ subexpression mapper
+
+class _SubexpressionMapper(IdentityMapper):
+    """Calls *handle* with each subexpression of an instruction's expression
+    that is a candidate for elimination and its normalized form. If *handle*
+    returns an expression, it replaces the subexpression; otherwise, the
+    subexpression's parts are visited in turn.
+
+    Parts of expressions that may only be valid to evaluate under conditions
+    (such as the branches of :class:`pymbolic.primitives.If`) are not visited,
+    and neither are index expressions, which are kept in place so that
+    accesses remain affine, as well as the arguments of invocations of
+    substitution rules.
+    """
+
+    def __init__(self, subst_names, handle):
+        self.subst_names = subst_names
+        self.handle = handle
+        self.normalizer = _CommutativeNormalizer()
+
+    def rec(self, expr):
+        if _is_operation(expr):
+            result = self.handle(self.normalizer(expr))
+            if result is not None:
+                return result
+
+        return IdentityMapper.rec(self, expr)
+
+    __call__ = rec
+
+    def map_subscript(self, expr):
+        return expr
+
+    map_linear_subscript = map_subscript
+
+    def map_call(self, expr):
+        if (isinstance(expr.function, Variable)
+                and expr.function.name in self.subst_names):
+            return expr
+
+        return IdentityMapper.map_call(self, expr)
+
+    def map_reduction(self, expr):
+        # Parts of the reduction body depend on the reduction inames, which
+        # the instructions computing eliminated subexpressions are not within.
+        return expr
+
+    def map_if(self, expr):
+        return type(expr)(self.rec(expr.condition), expr.then, expr.else_)
+
+    def map_logical_and(self, expr):
+        return type(expr)((self.rec(expr.children[0]),) + expr.children[1:])
+
+    map_logical_or = map_logical_and
+
+
+def _is_operation(expr):
+    if isinstance(expr, TypeCast):
+        expr = expr.child
+
+    return not isinstance(expr,
+            (int, float, complex, tuple, Variable, Subscript, LinearSubscript))
+
+# }}}
+
+
+def _get_transitive_dependencies(id_to_insn):
+    result = {}
+
+    def get_deps(insn_id):
+        try:
+            return result[insn_id]
+        except KeyError:
+            pass
+
+        deps = set()
+        stack = list(id_to_insn[insn_id].depends_on)
+        while stack:
+            dep_id = stack.pop()
+            if dep_id in deps:
+                continue
+            deps.add(dep_id)
+
+            if dep_id in result:
+                deps.update(result[dep_id])
+            else:
+                stack.extend(id_to_insn[dep_id].depends_on)
+
+        result[insn_id] = frozenset(deps)
+        return result[insn_id]
+
+    for insn_id in id_to_insn:
+        get_deps(insn_id)
+
+    return result
+
+
+def eliminate_common_subexpressions(kernel, within=None):
+    """Compute subexpressions that occur repeatedly in (one or several of)
+    the instructions matching *within* once, in a new instruction assigning
+    to a shared private temporary.
+
+    Only occurrences in instructions sharing the same inames (see
+    :meth:`loopy.LoopKernel.insn_inames`) and predicates are combined, and
+    the new instruction is within these inames and has these predicates.
+    Subexpressions are compared by their stringified form (as obtained
+    using :class:`loopy.symbolic.EqualityPreservingStringifyMapper`), after
+    sorting the operands of sums and products. Larger subexpressions are
+    eliminated first, after which their parts may still be found to be
+    common with other occurrences.
+
+    A subexpression is only eliminated if each variable it reads is either
+    not written in the kernel, or only written by instructions that all of
+    the instructions containing the subexpression depend on (directly or
+    indirectly) and that do not themselves depend on any of them. This
+    ensures that the subexpression has the same value at each occurrence.
+    The new instruction depends on these writers, and the instructions using
+    its result depend on it.
+
+    Unlike :class:`pymbolic.primitives.CommonSubexpression` markers (see
+    :ref:`expression-syntax`), which are expanded into assignments during
+    kernel creation, this finds common subexpressions automatically. As
+    with :func:`hoist_invariant_subexpressions`, subscripts, the branches
+    of :class:`pymbolic.primitives.If`, all but the first operands of
+    short-circuiting logical operators, reduction bodies and the arguments
+    of substitution rule invocations are not searched, though entire
+    reductions may be eliminated. Note that evaluating the sorted form of a
+    sum or product may round differently than the original.
+
+    Only :class:`loopy.Assignment` instructions are considered.
+
+    .. versionadded:: 2019.1
+    """
+    from loopy.match import parse_match
+    within = parse_match(within)
+
+    from loopy.kernel.data import (
+            auto, Assignment, TemporaryVariable, AddressSpace)
+    from loopy.symbolic import get_dependencies
+
+    subst_names = frozenset(kernel.substitutions)
+    stringify = EqualityPreservingStringifyMapper()
+
+    var_name_gen = kernel.get_var_name_generator()
+    insn_id_gen = kernel.get_instruction_id_generator()
+
+    id_to_insn = dict((insn.id, insn) for insn in kernel.instructions)
+    new_insn_ids = [insn.id for insn in kernel.instructions]
+    new_temporary_variables = kernel.temporary_variables.copy()
+
+    candidate_insn_ids = [
+            insn.id for insn in kernel.instructions
+            if isinstance(insn, Assignment) and within(kernel, insn)]
+
+    writer_map = {}
+    for insn in kernel.instructions:
+        for var_name in insn.assignee_var_names():
+            writer_map.setdefault(var_name, set()).add(insn.id)
+
+    rejected = set()
+
+    while True:
+        # {{{ gather occurrences
+
+        # (inames, predicates, key) -> (normalized expression, [insn ids])
+        occurrences = {}
+
+        for insn_id in candidate_insn_ids:
+            insn = id_to_insn[insn_id]
+            context = (insn.within_inames, insn.predicates)
+
+            def record(expr):
+                key = stringify(expr)
+                _, insn_ids = occurrences.setdefault(
+                        context + (key,), (expr, []))
+                insn_ids.append(insn_id)
+
+            _SubexpressionMapper(subst_names, record)(insn.expression)
+
+        candidates = sorted(
+                (item for item in six.iteritems(occurrences)
+                    if len(item[1][1]) > 1 and item[0] not in rejected),
+                key=lambda item: (-len(item[0][2]), item[0][2]))
+
+        # }}}
+
+        # {{{ find the largest eliminable subexpression
+
+        trans_deps = _get_transitive_dependencies(id_to_insn)
+
+        for (inames, predicates, key), (expr, user_ids) in candidates:
+            user_ids = frozenset(user_ids)
+
+            writer_ids = set()
+            for var_name in get_dependencies(expr):
+                writer_ids.update(writer_map.get(var_name, ()))
+
+            if all(
+                    writer_id in trans_deps[user_id]
+                    and not trans_deps[writer_id] & user_ids
+                    for writer_id in writer_ids
+                    for user_id in user_ids):
+                break
+
+            rejected.add((inames, predicates, key))
+        else:
+            break
+
+        # }}}
+
+        # {{{ eliminate it
+
+        var_name = var_name_gen("cse_expr")
+        cse_insn_id = insn_id_gen("cse")
+
+        new_temporary_variables[var_name] = TemporaryVariable(
+                name=var_name,
+                dtype=auto,
+                shape=(),
+                address_space=AddressSpace.PRIVATE)
+
+        id_to_insn[cse_insn_id] = Assignment(
+                id=cse_insn_id,
+                assignee=Variable(var_name),
+                expression=expr,
+                within_inames=inames,
+                within_inames_is_final=True,
+                depends_on=frozenset(writer_ids),
+                predicates=predicates)
+        writer_map[var_name] = set([cse_insn_id])
+
+        def replace(normalized_expr):
+            if (normalized_expr == expr
+                    and stringify(normalized_expr) == key):
+                return Variable(var_name)
+
+        for user_id in user_ids:
+            user = id_to_insn[user_id]
+            id_to_insn[user_id] = user.copy(
+                    expression=_SubexpressionMapper(subst_names, replace)(
+                        user.expression),
+                    depends_on=user.depends_on | frozenset([cse_insn_id]))
+
+        idx = min(new_insn_ids.index(user_id) for user_id in user_ids)
+        new_insn_ids.insert(idx, cse_insn_id)
+
+        # The eliminated expression may in turn have parts in common with
+        # the remaining instructions.
+        candidate_insn_ids.append(cse_insn_id)
+
+        logger.debug("%s: eliminated '%s' from '%s'" % (
+            kernel.name, expr, ", ".join(sorted(user_ids))))
+
+        # }}}
+
+    return kernel.copy(
+            instructions=[id_to_insn[insn_id] for insn_id in new_insn_ids],
+            temporary_variables=new_temporary_variables)
+
+# vim: foldmethod=marker
@@ -31,6 +31,9 @@ from loopy.kernel.data import ImageArg
 
 from pytools import MovedFunctionDeprecationWrapper
 
+import logging
+logger = logging.getLogger(__name__)
+
 
 # {{{ convenience: add_prefetch
 
@@ -584,6 +587,200 @@ def alias_temporaries(knl, names, base_name_prefix=None,
 # }}}
 
 
+# {{{ share temporary storage
+
+def _get_temporary_live_intervals(kernel):
+    """Return a tuple ``(intervals, enclosing_loops)``. *intervals* maps the
+    names of temporaries accessed within a single subkernel of the scheduled
+    *kernel* to a tuple ``(start, end)`` of schedule indices, such that the
+    temporary is not live outside of ``start <= sched_index <= end``.
+    *enclosing_loops* is a list of :class:`frozenset` instances of
+    the indices of the :class:`loopy.schedule.EnterLoop` items enclosing
+    each schedule index.
+
+    Since values may be carried across loop iterations, live intervals
+    always cover entire loops containing an access.
+    """
+    from loopy.schedule import (
+            EnterLoop, LeaveLoop, CallKernel, RunInstruction)
+    from loopy.schedule.tools import get_block_boundaries
+
+    block_bounds = get_block_boundaries(kernel.schedule)
+
+    enclosing_loops = []
+    active_loops = []
+    accesses = {}
+    subkernels = {}
+    subkernel = None
+
+    for sched_index, sched_item in enumerate(kernel.schedule):
+        if isinstance(sched_item, EnterLoop):
+            active_loops.append(sched_index)
+            enclosing_loops.append(frozenset(active_loops))
+            continue
+
+        enclosing_loops.append(frozenset(active_loops))
+
+        if isinstance(sched_item, LeaveLoop):
+            active_loops.pop()
+        elif isinstance(sched_item, CallKernel):
+            subkernel = sched_item.kernel_name
+        elif isinstance(sched_item, RunInstruction):
+            insn = kernel.id_to_insn[sched_item.insn_id]
+            for var_name in (
+                    insn.read_dependency_names()
+                    | frozenset(insn.assignee_var_names())):
+                if var_name in kernel.temporary_variables:
+                    accesses.setdefault(var_name, []).append(sched_index)
+                    subkernels.setdefault(var_name, set()).add(subkernel)
+
+    intervals = {}
+    for var_name, var_accesses in six.iteritems(accesses):
+        if len(subkernels[var_name]) > 1:
+            continue
+
+        start = min(var_accesses)
+        end = max(var_accesses)
+        for sched_index in var_accesses:
+            for loop_start in enclosing_loops[sched_index]:
+                start = min(start, loop_start)
+                end = max(end, block_bounds[loop_start])
+
+        intervals[var_name] = (start, end)
+
+    return intervals, enclosing_loops
+
+
+def find_temporary_storage_sharing(kernel, address_spaces=None):
+    """Find groups of temporaries in the scheduled *kernel* which may share
+    storage because their live ranges do not overlap. Only array temporaries
+    of known size that are not already aliased are considered. For local
+    temporaries, a barrier is additionally required between the live ranges
+    of the temporaries in a group.
+
+    :arg address_spaces: an iterable of :class:`loopy.AddressSpace` values,
+        defaults to private and local memory. Global temporaries are not
+        supported, as their storage is allocated by the host code.
+    :returns: a list of lists of temporary variable names, where each
+        list has at least two entries and all temporaries in a list may share
+        storage.
+    """
+    from loopy.kernel import KernelState
+    from loopy.kernel.data import AddressSpace
+    from loopy.schedule import Barrier, CallKernel, ReturnFromKernel
+    from loopy.tools import is_integer
+
+    if kernel.state < KernelState.SCHEDULED or kernel.schedule is None:
+        raise LoopyError("sharing temporary storage requires a scheduled kernel")
+
+    if address_spaces is None:
+        address_spaces = [AddressSpace.PRIVATE, AddressSpace.LOCAL]
+
+    address_spaces = set(address_spaces)
+    if AddressSpace.GLOBAL in address_spaces:
+        raise LoopyError("sharing storage between global temporaries "
+                "is not supported")
+
+    intervals, enclosing_loops = _get_temporary_live_intervals(kernel)
+
+    sync_indices = [
+            sched_index
+            for sched_index, sched_item in enumerate(kernel.schedule)
+            if isinstance(sched_item, (Barrier, CallKernel, ReturnFromKernel))]
+
+    def is_separated_by_sync(first, second):
+        _, first_end = intervals[first]
+        second_start, _ = intervals[second]
+
+        # The barrier must not be in a loop that might not be executed.
+        for sched_index in sync_indices:
+            if (first_end < sched_index < second_start
+                    and enclosing_loops[sched_index]
+                    <= enclosing_loops[first_end]
+                    & enclosing_loops[second_start]):
+                return True
+
+        return False
+
+    def may_share(name_a, name_b):
+        (start_a, end_a), (start_b, end_b) = intervals[name_a], intervals[name_b]
+        if not (end_a < start_b or end_b < start_a):
+            return False
+
+        if (kernel.temporary_variables[name_a].address_space
+                == AddressSpace.LOCAL):
+            if end_a < start_b:
+                return is_separated_by_sync(name_a, name_b)
+            else:
+                return is_separated_by_sync(name_b, name_a)
+
+        return True
+
+    candidates = [
+            tv for tv in six.itervalues(kernel.temporary_variables)
+            if tv.name in intervals
+            and tv.address_space in address_spaces
+            and tv.base_storage is None
+            and tv.initializer is None
+            and tv.shape
+            and is_integer(tv.nbytes)]
+
+    groups = []
+    for tv in sorted(candidates, key=lambda tv: (-tv.nbytes, tv.name)):
+        for group in groups:
+            if (kernel.temporary_variables[group[0]].address_space
+                    == tv.address_space
+                    and all(may_share(tv.name, other) for other in group)):
+                group.append(tv.name)
+                break
+        else:
+            groups.append([tv.name])
+
+    return [group for group in groups if len(group) > 1]
+
+
+def share_temporary_storage(kernel, address_spaces=None,
+        base_name_prefix="temp_storage"):
+    """Let temporaries of the scheduled *kernel* with non-overlapping live
+    ranges share storage, as found by :func:`find_temporary_storage_sharing`.
+    The temporaries in each group are backed by a common
+    :attr:`loopy.TemporaryVariable.base_storage`, which is as large and
+    as aligned as the largest and most strictly aligned member. The amount
+    of memory saved is logged.
+
+    See also :func:`alias_temporaries`.
+    """
+    groups = find_temporary_storage_sharing(kernel, address_spaces)
+    if not groups:
+        return kernel
+
+    vng = kernel.get_var_name_generator()
+
+    new_temporary_variables = kernel.temporary_variables.copy()
+    saved_bytes = {}
+    for group in groups:
+        base_name = vng(base_name_prefix)
+        for name in group:
+            new_temporary_variables[name] = \
+                    new_temporary_variables[name].copy(base_storage=base_name)
+
+        nbytes = [kernel.temporary_variables[name].nbytes for name in group]
+        address_space = kernel.temporary_variables[group[0]].address_space
+        saved_bytes[address_space] = (
+                saved_bytes.get(address_space, 0) + sum(nbytes) - max(nbytes))
+
+    from loopy.kernel.data import AddressSpace
+    logger.info("%s: sharing storage among %d temporaries saves %s" % (
+        kernel.name, sum(len(group) for group in groups),
+        ", ".join(
+            "%d bytes of %s memory" % (nbytes, AddressSpace.stringify(aspace))
+            for aspace, nbytes in sorted(six.iteritems(saved_bytes)))))
+
+    return kernel.copy(temporary_variables=new_temporary_variables)
+
+# }}}
+
+
 # {{{ set argument order
 
 def set_argument_order(kernel, arg_names):
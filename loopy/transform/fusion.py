@@ -411,4 +411,202 @@ def fuse_kernels(kernels, suffixes=None, data_flow=None):
 
     return result
 
+
+# {{{ producer-consumer fusion
+
+def _get_subscripts(kernel, insn_id, var_name):
+    from loopy.symbolic import WalkMapper
+    from pymbolic.primitives import Variable
+
+    result = set()
+
+    class SubscriptCollector(WalkMapper):
+        def map_subscript(self, expr):
+            if (isinstance(expr.aggregate, Variable)
+                    and expr.aggregate.name == var_name):
+                result.add(expr.index_tuple)
+            WalkMapper.map_subscript(self, expr)
+
+    collector = SubscriptCollector()
+    kernel.id_to_insn[insn_id].with_transformed_expressions(
+            lambda expr: collector(expr) or expr)
+
+    return result
+
+
+def _get_access_range(kernel, insn_ids, var_name, writes):
+    from loopy.symbolic import BatchedAccessRangeMapper
+
+    arm = BatchedAccessRangeMapper(kernel, [var_name])
+
+    for insn_id in insn_ids:
+        insn = kernel.id_to_insn[insn_id]
+        insn_inames = kernel.insn_inames(insn)
+
+        if writes:
+            arm(insn.assignee, insn_inames)
+        else:
+            for expr in [insn.expression] + list(insn.predicates):
+                arm(expr, insn_inames)
+
+    if arm.bad_subscripts[var_name] or arm.access_ranges[var_name] is None:
+        raise LoopyError("unable to determine the elements of '%s' %s"
+                % (var_name, "written" if writes else "read"))
+
+    access_range = arm.access_ranges[var_name]
+    for i in range(access_range.dim(dim_type.set)):
+        access_range = access_range.set_dim_name(dim_type.set, i, "_lpy_dim%d" % i)
+
+    return access_range
+
+
+def _find_producer_consumer_candidates(kernel):
+    from loopy.kernel.data import AddressSpace
+
+    writer_map = kernel.writer_map()
+    reader_map = kernel.reader_map()
+
+    return [
+            tv.name
+            for tv in six.itervalues(kernel.temporary_variables)
+            if tv.address_space == AddressSpace.GLOBAL
+            and tv.base_storage is None
+            and len(writer_map.get(tv.name, ())) == 1
+            and reader_map.get(tv.name)]
+
+
+def fuse_producer_consumer(kernel, var_names=None, sweep_inames=None,
+        temporary_address_space=None):
+    """Fuse the computation of each of the intermediate arrays *var_names*
+    into the instructions reading it, and contract the array to storage
+    that only holds the values needed by each reader.
+
+    Each of *var_names* must be written by a single, unpredicated
+    :class:`loopy.Assignment` (the *producer*) that writes every element
+    read by the remaining instructions (the *consumers*). The producer is
+    turned into a substitution rule using :func:`loopy.assignment_to_subst`,
+    and the rule is then precomputed for each consumer using
+    :func:`loopy.precompute`, so that the original array (and the loop
+    around the producer) disappears and the intermediate values are no longer
+    written to and read back from memory.
+
+    This typically follows :func:`fuse_kernels` with its *data_flow*
+    argument describing the intermediate array.
+
+    :arg var_names: An iterable of names or a comma-separated string. May
+        name temporaries or arguments. If *None*, all global temporaries
+        with a single writer are fused.
+    :arg sweep_inames: Passed to :func:`loopy.precompute` for consumers
+        that read more than one element of the intermediate (i.e. that have
+        a *halo*). If *None*, the local-axis inames on which these accesses
+        depend are used, resulting in a local buffer that is filled
+        cooperatively by the work group.
+    :arg temporary_address_space: The address space of the contracted
+        storage. If *None*, consumers reading a single element get a private
+        scalar, and consumers with a halo get a local buffer if they are
+        swept over local inames and a (small) private array otherwise.
+
+    .. versionadded:: 2019.1
+    """
+    if var_names is None:
+        var_names = _find_producer_consumer_candidates(kernel)
+    elif isinstance(var_names, str):
+        var_names = [s.strip() for s in var_names.split(",")]
+
+    if isinstance(sweep_inames, str):
+        sweep_inames = [s.strip() for s in sweep_inames.split(",")]
+
+    from loopy.kernel.data import (
+            AddressSpace, Assignment, LocalIndexTag, filter_iname_tags_by_type)
+    from loopy.symbolic import get_dependencies
+    from loopy.transform.subst import assignment_to_subst
+    from loopy.transform.precompute import precompute
+    from loopy.transform.iname import remove_unused_inames
+
+    for var_name in var_names:
+        writer_ids = kernel.writer_map().get(var_name, frozenset())
+        reader_ids = sorted(
+                kernel.reader_map().get(var_name, frozenset()) - writer_ids)
+
+        if len(writer_ids) != 1:
+            raise LoopyError("'%s' must be written by exactly one instruction "
+                    "for producer-consumer fusion, found %d"
+                    % (var_name, len(writer_ids)))
+
+        writer_id, = writer_ids
+        writer = kernel.id_to_insn[writer_id]
+
+        if not isinstance(writer, Assignment):
+            raise LoopyError("producer '%s' of '%s' is not an assignment"
+                    % (writer_id, var_name))
+
+        if writer.predicates:
+            raise LoopyError("producer '%s' of '%s' is predicated"
+                    % (writer_id, var_name))
+
+        if not reader_ids:
+            raise LoopyError("'%s' has no consumers" % var_name)
+
+        # {{{ check that consumers only read what is produced
+
+        write_range = _get_access_range(kernel, [writer_id], var_name, True)
+        read_range = _get_access_range(kernel, reader_ids, var_name, False)
+
+        read_range, write_range = isl.align_two(read_range, write_range)
+        unwritten_params, assumptions = isl.align_two(
+                (read_range - write_range).params(), kernel.assumptions)
+        if not (unwritten_params & assumptions).is_empty():
+            raise LoopyError("consumers of '%s' read elements not written by "
+                    "producer '%s'" % (var_name, writer_id))
+
+        # }}}
+
+        producer_inames = kernel.insn_inames(writer)
+        reader_id_to_subscripts = dict(
+                (reader_id, _get_subscripts(kernel, reader_id, var_name))
+                for reader_id in reader_ids)
+
+        old_subst_names = set(kernel.substitutions)
+        kernel = assignment_to_subst(kernel, var_name)
+        subst_name, = set(kernel.substitutions) - old_subst_names
+
+        for reader_id in reader_ids:
+            subscripts = reader_id_to_subscripts[reader_id]
+            reader_inames = kernel.insn_inames(reader_id)
+
+            if len(subscripts) <= 1:
+                # elementwise: contract to a scalar
+                reader_sweep_inames = []
+            elif sweep_inames is not None:
+                reader_sweep_inames = sweep_inames
+            else:
+                subscript_deps = set()
+                for subscript in subscripts:
+                    subscript_deps |= get_dependencies(subscript)
+
+                reader_sweep_inames = sorted(
+                        iname for iname in subscript_deps & reader_inames
+                        if filter_iname_tags_by_type(
+                            kernel.iname_tags(iname), LocalIndexTag))
+
+            address_space = temporary_address_space
+            if address_space is None:
+                address_space = (
+                        AddressSpace.LOCAL if reader_sweep_inames
+                        else AddressSpace.PRIVATE)
+
+            kernel = precompute(kernel, subst_name,
+                    sweep_inames=reader_sweep_inames,
+                    within="id:%s" % reader_id,
+                    temporary_address_space=address_space,
+                    default_tag=(
+                        "l.auto" if address_space == AddressSpace.LOCAL
+                        else None))
+
+        kernel = remove_unused_inames(kernel, producer_inames)
+
+    return kernel
+
+# }}}
+
 # vim: foldmethod=marker
@@ -0,0 +1,402 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+from pymbolic.primitives import Variable
+
+from loopy.symbolic import IdentityMapper, DependencyMapper
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+
+.. currentmodule:: loopy
+
+.. autofunction:: hoist_invariant_subexpressions
+"""
+
+
+# {{{ loop dependencies
+
+def _get_loop_inames(kernel, inames):
+    """Return the subset of *inames* that are realized as sequential loops,
+    i.e. that are not mapped to hardware axes, ILP or vector lanes.
+    """
+    from loopy.kernel.data import ConcurrentTag, VectorizeTag
+    return frozenset(
+            iname for iname in inames
+            if not kernel.iname_tags_of_type(
+                iname, (ConcurrentTag, VectorizeTag)))
+
+
+class _DependencyMapper(DependencyMapper):
+    """Like :class:`loopy.symbolic.DependencyMapper`, but also reports the
+    names of invoked substitution rules.
+    """
+
+    def __init__(self, subst_names):
+        DependencyMapper.__init__(self, composite_leaves=False)
+        self.subst_names = subst_names
+
+    def map_call(self, expr, *args, **kwargs):
+        result = DependencyMapper.map_call(self, expr, *args, **kwargs)
+
+        if (isinstance(expr.function, Variable)
+                and expr.function.name in self.subst_names):
+            result = result | set([expr.function])
+
+        return result
+
+# }}}
+
+
+# {{{ hoisting mapper
+
+class _InvariantHoister(IdentityMapper):
+    """Replaces the maximal subexpressions of an instruction's expression that
+    do not vary with all of the loops around their evaluation by variables,
+    calling *hoist* to obtain these.
+
+    :arg loop_inames: The sequential loop inames of the instruction.
+    :arg var_to_loops: A mapping from variable names to the sequential loop
+        inames within which they are written.
+    :arg predicate_loops: The loop inames on which the predicates of the
+        instruction depend, which any hoisted computation must remain within.
+    :arg loop_priority: See :attr:`loopy.LoopKernel.loop_priority`.
+    :arg hoist: A callable ``hoist(expr, loops)`` returning the variable
+        replacing *expr*, which is to be computed within the loop inames
+        *loops*.
+    """
+
+    def __init__(self, loop_inames, subst_names, var_to_loops,
+            predicate_loops, loop_priority, hoist):
+        self.loop_inames = loop_inames
+        self.subst_names = subst_names
+        self.var_to_loops = var_to_loops
+        self.predicate_loops = predicate_loops
+        self.loop_priority = loop_priority
+        self.hoist = hoist
+
+        self.dep_mapper = _DependencyMapper(subst_names)
+
+    def get_hoisted_loops(self, expr, reduction_inames):
+        """Return the loop inames within which *expr* would have to be
+        computed, or *None* if it cannot be hoisted out of any of the loops
+        (or reductions) around it.
+        """
+        context = self.loop_inames | reduction_inames
+
+        loops = set(self.predicate_loops)
+        for dep in self.dep_mapper(expr):
+            name = dep.name
+            if name in self.subst_names:
+                return None
+            elif name in context:
+                loops.add(name)
+            else:
+                loops.update(self.var_to_loops.get(name, frozenset()) & context)
+
+        # Loops to be nested outside of ones that the computation remains
+        # within cannot be left.
+        done = False
+        while not done:
+            done = True
+            for prio in self.loop_priority:
+                for i, outer_iname in enumerate(prio):
+                    if (outer_iname in context
+                            and outer_iname not in loops
+                            and loops.intersection(prio[i+1:])):
+                        loops.add(outer_iname)
+                        done = False
+
+        if loops & reduction_inames or len(loops) == len(context):
+            return None
+
+        return frozenset(loops)
+
+    def rec(self, expr, reduction_inames):
+        if _is_worth_hoisting(expr):
+            loops = self.get_hoisted_loops(expr, reduction_inames)
+            if loops is not None:
+                return self.hoist(expr, loops)
+
+        return IdentityMapper.rec(self, expr, reduction_inames)
+
+    def map_commutative(self, expr, reduction_inames):
+        # Group the children that can be hoisted to the same loops, so that,
+        # e.g., the invariant factors of a product are hoisted as one.
+        loops_and_children = []
+        new_children = []
+
+        for child in expr.children:
+            loops = None
+            if not isinstance(child, (int, float, complex)):
+                loops = self.get_hoisted_loops(child, reduction_inames)
+
+            if loops is None:
+                new_children.append(self.rec(child, reduction_inames))
+                continue
+
+            for other_loops, group in loops_and_children:
+                if other_loops == loops:
+                    group.append(child)
+                    break
+            else:
+                group = [child]
+                loops_and_children.append((loops, group))
+                new_children.append(group)
+
+        result = []
+        for child in new_children:
+            if not isinstance(child, list):
+                result.append(child)
+            elif len(child) == 1:
+                result.append(self.rec(child[0], reduction_inames))
+            else:
+                group_loops, = [
+                        loops for loops, group in loops_and_children
+                        if group is child]
+                result.append(self.hoist(type(expr)(tuple(child)), group_loops))
+
+        return type(expr)(tuple(result))
+
+    map_sum = map_commutative
+    map_product = map_commutative
+
+    def map_subscript(self, expr, reduction_inames):
+        # Leave index expressions alone, so that accesses remain affine.
+        return type(expr)(
+                self.rec(expr.aggregate, reduction_inames), expr.index)
+
+    map_linear_subscript = map_subscript
+
+    def map_call(self, expr, reduction_inames):
+        if (isinstance(expr.function, Variable)
+                and expr.function.name in self.subst_names):
+            return expr
+
+        return IdentityMapper.map_call(self, expr, reduction_inames)
+
+    def map_reduction(self, expr, reduction_inames):
+        return type(expr)(
+                expr.operation, expr.inames,
+                self.rec(expr.expr, reduction_inames | frozenset(expr.inames)),
+                allow_simultaneous=expr.allow_simultaneous)
+
+    def map_if(self, expr, reduction_inames):
+        # The branches may only be valid to evaluate under their condition.
+        return type(expr)(
+                self.rec(expr.condition, reduction_inames),
+                expr.then, expr.else_)
+
+    def map_logical_and(self, expr, reduction_inames):
+        # Later operands may only be valid to evaluate (short-circuiting)
+        # under the earlier ones.
+        return type(expr)(
+                (self.rec(expr.children[0], reduction_inames),)
+                + expr.children[1:])
+
+    map_logical_or = map_logical_and
+
+
+def _is_worth_hoisting(expr):
+    from loopy.symbolic import TypeCast
+
+    if isinstance(expr, TypeCast):
+        expr = expr.child
+
+    return not isinstance(expr, (int, float, complex, tuple, Variable))
+
+# }}}
+
+
+def _get_hoisted_dependencies(id_to_insn, kernel, insn, left_loops):
+    """Return the ids of the instructions that a computation hoisted out of
+    *insn* (and out of the loops *left_loops*) needs to depend on: the
+    dependencies of *insn* outside of *left_loops*, looking through those
+    inside them.
+    """
+    result = set()
+    seen = set()
+    stack = list(insn.depends_on)
+
+    while stack:
+        dep_id = stack.pop()
+        if dep_id in seen:
+            continue
+        seen.add(dep_id)
+
+        dep = id_to_insn[dep_id]
+        if kernel.insn_inames(dep) & left_loops:
+            stack.extend(dep.depends_on)
+        else:
+            result.add(dep_id)
+
+    return frozenset(result)
+
+
+def hoist_invariant_subexpressions(kernel, within=None):
+    """Compute the subexpressions of the instructions matching *within* that
+    do not vary with some of the sequential loops around them once, outside
+    of these loops, rather than on every iteration.
+
+    Invariance is determined from the inames (see
+    :meth:`loopy.LoopKernel.insn_inames`) and variables (see
+    :func:`loopy.symbolic.get_dependencies`) each subexpression depends on:
+    a variable varies with every loop within which it is written. Maximal
+    invariant subexpressions are found, including groups of invariant terms
+    and factors of sums and products. Each is assigned to a new private
+    temporary by a new instruction within the loops on which it does depend
+    (as well as the parallel inames of the original instruction). The
+    original instruction depends on the new one, which in turn inherits those
+    dependencies of the original instruction that lie outside the loops
+    left. Hoisting is repeated for the new instructions, so that each
+    part of a subexpression ends up outside of all the loops it does not
+    depend on. Loops that :attr:`loopy.LoopKernel.loop_priority` places
+    outside of the loops a computation remains within are not left.
+
+    Subexpressions are also hoisted out of (sequential or parallel)
+    reductions, if they do not depend on the reduction inames. Predicates
+    of the instruction are copied to the new instruction, which is then
+    also kept within the loops the predicates depend on.
+
+    A few restrictions ensure that hoisting never introduces evaluations
+    that might be invalid: Index expressions (which normally are cheap and
+    affine) are left in place, as are the branches of
+    :class:`pymbolic.primitives.If` and all but the first operand of
+    short-circuiting logical operators. Invocations of substitution rules
+    are never hoisted. Note that hoisted computations are still carried out
+    for iterations of the outer loops in which the loops left have no
+    iterations at all.
+
+    Only :class:`loopy.Assignment` instructions are considered.
+
+    .. versionadded:: 2019.1
+    """
+    from loopy.match import parse_match
+    within = parse_match(within)
+
+    from loopy.kernel.data import (
+            auto, Assignment, TemporaryVariable, AddressSpace)
+    from loopy.symbolic import get_dependencies
+
+    subst_names = frozenset(kernel.substitutions)
+
+    var_to_loops = {}
+    for insn in kernel.instructions:
+        loops = _get_loop_inames(kernel, kernel.insn_inames(insn))
+        for var_name in insn.assignee_var_names():
+            var_to_loops[var_name] = var_to_loops.get(var_name, frozenset()) | loops
+
+    var_name_gen = kernel.get_var_name_generator()
+    insn_id_gen = kernel.get_instruction_id_generator()
+
+    id_to_insn = dict((insn.id, insn) for insn in kernel.instructions)
+    new_insn_ids = [insn.id for insn in kernel.instructions]
+    new_temporary_variables = kernel.temporary_variables.copy()
+
+    queue = [
+            insn.id for insn in kernel.instructions
+            if isinstance(insn, Assignment) and within(kernel, insn)]
+
+    while queue:
+        insn = id_to_insn[queue.pop(0)]
+        insn_inames = kernel.insn_inames(insn)
+        loop_inames = _get_loop_inames(kernel, insn_inames)
+
+        predicate_loops = set()
+        for pred in insn.predicates:
+            for name in get_dependencies(pred):
+                if name in loop_inames:
+                    predicate_loops.add(name)
+                else:
+                    predicate_loops.update(
+                            var_to_loops.get(name, frozenset()) & loop_inames)
+
+        hoisted = []
+        expr_to_var = {}
+
+        def hoist(expr, loops):
+            key = (expr, loops)
+            try:
+                return expr_to_var[key]
+            except KeyError:
+                pass
+
+            var_name = var_name_gen(insn.id + "_inv")
+            hoisted.append((var_name, expr, loops))
+            result = expr_to_var[key] = Variable(var_name)
+            return result
+
+        hoister = _InvariantHoister(loop_inames, subst_names, var_to_loops,
+                frozenset(predicate_loops), kernel.loop_priority, hoist)
+        new_expression = hoister(insn.expression, frozenset())
+
+        if not hoisted:
+            continue
+
+        hoisted_insn_ids = []
+        for var_name, expr, loops in hoisted:
+            hoisted_insn_id = insn_id_gen(insn.id + "_hoist")
+            hoisted_insn_ids.append(hoisted_insn_id)
+
+            new_temporary_variables[var_name] = TemporaryVariable(
+                    name=var_name,
+                    dtype=auto,
+                    shape=(),
+                    address_space=AddressSpace.PRIVATE)
+            var_to_loops[var_name] = loops
+
+            id_to_insn[hoisted_insn_id] = Assignment(
+                    id=hoisted_insn_id,
+                    assignee=Variable(var_name),
+                    expression=expr,
+                    within_inames=(insn_inames - loop_inames) | loops,
+                    within_inames_is_final=True,
+                    depends_on=_get_hoisted_dependencies(
+                        id_to_insn, kernel, insn, loop_inames - loops),
+                    predicates=insn.predicates)
+
+            logger.debug("%s: hoisted '%s' out of loop(s) '%s' of '%s'" % (
+                kernel.name, expr, ", ".join(sorted(loop_inames - loops)),
+                insn.id))
+
+        id_to_insn[insn.id] = insn.copy(
+                expression=new_expression,
+                depends_on=insn.depends_on | frozenset(hoisted_insn_ids))
+
+        idx = new_insn_ids.index(insn.id)
+        new_insn_ids[idx:idx] = hoisted_insn_ids
+
+        # Hoisted expressions may in turn have parts that can be hoisted
+        # further.
+        queue.extend(hoisted_insn_ids)
+
+    return kernel.copy(
+            instructions=[id_to_insn[insn_id] for insn_id in new_insn_ids],
+            temporary_variables=new_temporary_variables)
+
+# vim: foldmethod=marker
@@ -186,6 +186,27 @@ class LivenessAnalysis(object):
 
 # {{{ save and reload implementation
 
+def _get_unsubscripted_variable_names(expr):
+    from loopy.symbolic import WalkMapper
+    from pymbolic.primitives import Variable
+
+    result = set()
+
+    class UnsubscriptedVariableCollector(WalkMapper):
+        def map_variable(self, expr, *args):
+            result.add(expr.name)
+
+        def map_subscript(self, expr, *args):
+            if not isinstance(expr.aggregate, Variable):
+                self.rec(expr.aggregate, *args)
+            self.rec(expr.index, *args)
+
+        map_linear_subscript = map_subscript
+
+    UnsubscriptedVariableCollector()(expr)
+    return result
+
+
 class TemporarySaver(object):
 
     class PromotedTemporary(Record):
@@ -370,6 +391,198 @@ class TemporarySaver(object):
 
         return (pre_barrier, post_barrier)
 
+    # {{{ access footprints
+
+    def _get_access_ranges(self, insn, var_name):
+        """Return a tuple ``(read_range, write_ranges)`` of the elements of
+        *var_name* read by *insn* (or *None* if there is no such read) and a
+        list of the elements written by each assignee of *insn*. Raises
+        :exc:`UnableToDetermineAccessRange` if the accesses cannot be
+        described by affine subscripts.
+        """
+        from loopy.kernel.instruction import (
+                MultiAssignmentBase, _get_assignee_var_name)
+        from loopy.symbolic import (
+                BatchedAccessRangeMapper, UnableToDetermineAccessRange)
+        from pymbolic.primitives import Subscript
+
+        if not isinstance(insn, MultiAssignmentBase):
+            raise UnableToDetermineAccessRange(
+                    "instruction '%s' is not an assignment" % insn.id)
+
+        insn_inames = self.kernel.insn_inames(insn)
+
+        read_mapper = BatchedAccessRangeMapper(self.kernel, [var_name])
+        read_exprs = [insn.expression] + list(insn.predicates)
+
+        write_ranges = []
+        for assignee in insn.assignees:
+            if isinstance(assignee, Subscript):
+                read_exprs.append(assignee.index)
+
+            if _get_assignee_var_name(assignee) == var_name:
+                if not isinstance(assignee, Subscript):
+                    raise UnableToDetermineAccessRange(
+                            "'%s' is written without subscript" % var_name)
+
+                write_mapper = BatchedAccessRangeMapper(self.kernel, [var_name])
+                write_mapper(assignee, insn_inames)
+                if write_mapper.bad_subscripts[var_name]:
+                    raise UnableToDetermineAccessRange(
+                            "non-affine write to '%s'" % var_name)
+                write_ranges.append(write_mapper.access_ranges[var_name])
+
+        for expr in read_exprs:
+            if var_name in _get_unsubscripted_variable_names(expr):
+                raise UnableToDetermineAccessRange(
+                        "'%s' is read without subscript" % var_name)
+            read_mapper(expr, insn_inames)
+
+        if read_mapper.bad_subscripts[var_name]:
+            raise UnableToDetermineAccessRange(
+                    "non-affine read of '%s'" % var_name)
+
+        return read_mapper.access_ranges[var_name], write_ranges
+
+    def _is_exact_write(self, insn, temporary, subkernel):
+        """Return *True* if *insn* unconditionally writes all elements of
+        its write access range of *temporary* in every work item and every
+        iteration of the loops surrounding *subkernel*.
+        """
+        if insn.predicates:
+            return False
+
+        from loopy.kernel.data import (
+                GroupIndexTag, HardwareConcurrentTag, filter_iname_tags_by_type)
+        from loopy.kernel.instruction import _get_assignee_var_name
+        from loopy.symbolic import get_dependencies
+
+        if temporary.address_space == AddressSpace.LOCAL:
+            # all work items in a group share the temporary
+            varying_tag_type = GroupIndexTag
+        else:
+            varying_tag_type = HardwareConcurrentTag
+
+        insn_inames = self.kernel.insn_inames(insn)
+
+        varying_inames = set(
+                self.subkernel_to_surrounding_inames[subkernel]) | set(
+                        iname for iname in insn_inames
+                        if filter_iname_tags_by_type(
+                            self.kernel.iname_tags(iname), varying_tag_type))
+
+        index_inames = set()
+        for assignee in insn.assignees:
+            if _get_assignee_var_name(assignee) == temporary.name:
+                index_deps = get_dependencies(assignee.index)
+                if not index_deps <= insn_inames:
+                    return False
+                index_inames.update(index_deps)
+
+        if index_inames & varying_inames:
+            return False
+
+        # The range of the written indices must not depend on the varying
+        # inames, i.e. the domain must be a product of the two.
+        import islpy as isl
+        dom = self.kernel.get_inames_domain(insn_inames)
+        dom = dom.project_out_except(
+                index_inames | varying_inames, [isl.dim_type.set])
+
+        dom_vars = dom.get_var_dict()
+        varying_dims = [
+                dom_vars[iname][1] for iname in varying_inames
+                if iname in dom_vars]
+        index_dims = [
+                dom_vars[iname][1] for iname in index_inames
+                if iname in dom_vars]
+
+        def eliminate(s, dims):
+            for dim in dims:
+                s = s.eliminate(isl.dim_type.set, dim, 1)
+            return s
+
+        return dom.is_equal(
+                eliminate(dom, varying_dims) & eliminate(dom, index_dims))
+
+    @memoize_method
+    def get_save_and_reload_regions(self, temporary_name, subkernel):
+        """Return a tuple ``(save_region, reload_region)`` of
+        :class:`islpy.BasicSet` instances describing the elements of the
+        temporary *temporary_name* that need to be saved at the end of and
+        reloaded at the start of *subkernel*, or *None* if these cannot be
+        determined (in which case the whole temporary is saved and reloaded).
+
+        Elements that are only ever read in *subkernel* need not be saved,
+        and elements that are unconditionally overwritten need not be
+        reloaded.
+        """
+        temporary = self.kernel.temporary_variables[temporary_name]
+
+        if not temporary.shape or temporary.base_storage is not None:
+            return None
+
+        from loopy.symbolic import UnableToDetermineAccessRange
+
+        import islpy as isl
+
+        space = isl.Space.create_from_names(
+                isl.DEFAULT_CONTEXT,
+                set=["_lpy_dim%d" % i for i in range(len(temporary.shape))],
+                params=self.new_subdomain.get_var_names(isl.dim_type.param))
+
+        def normalize(access_range):
+            if not (set(access_range.get_var_names(isl.dim_type.param))
+                    <= set(space.get_var_names(isl.dim_type.param))):
+                # e.g. data-dependent
+                raise UnableToDetermineAccessRange()
+
+            for i in range(access_range.dim(isl.dim_type.set)):
+                access_range = access_range.set_dim_name(
+                        isl.dim_type.set, i, "_lpy_dim%d" % i)
+
+            return isl.align_spaces(access_range, isl.Set.universe(space))
+
+        read_region = isl.Set.empty(space)
+        write_region = isl.Set.empty(space)
+        exact_write_region = isl.Set.empty(space)
+
+        for insn_id in sorted(self.find_accessing_instructions_in_subkernel(
+                temporary_name, subkernel)):
+            insn = self.kernel.id_to_insn[insn_id]
+
+            try:
+                read_range, write_ranges = self._get_access_ranges(
+                        insn, temporary_name)
+
+                if read_range is not None:
+                    read_region |= normalize(read_range)
+
+                if write_ranges:
+                    is_exact = self._is_exact_write(insn, temporary, subkernel)
+
+                for write_range in write_ranges:
+                    write_range = normalize(write_range)
+                    write_region |= write_range
+                    if is_exact:
+                        exact_write_region |= write_range
+
+            except UnableToDetermineAccessRange:
+                return None
+
+        def hull(s):
+            return s.coalesce().simple_hull()
+
+        # Saving the hull may include elements that are not (surely) written
+        # in this subkernel. These must have been reloaded in order not to
+        # save garbage.
+        save_region = hull(write_region)
+        reload_region = hull(read_region | (save_region - exact_write_region))
+
+        return save_region, reload_region
+
+    # }}}
+
     def get_hw_axis_sizes_and_tags_for_save_slot(self, temporary):
         """
         This is used for determining the amount of global storage needed for saving
@@ -503,9 +716,21 @@ class TemporarySaver(object):
         if promoted_temporary is None:
             return
 
+        region = None
+        regions = self.get_save_and_reload_regions(temporary, subkernel)
+        if regions is not None:
+            save_region, reload_region = regions
+            region = save_region if mode == "save" else reload_region
+
+            if region.is_empty():
+                logger.info("no elements of {0} need to be {1}ed in {2}"
+                        .format(temporary, mode, subkernel))
+                return
+
         new_subdomain, hw_inames, dim_inames, iname_to_tags = (
             self.augment_domain_for_save_or_reload(
-                self.new_subdomain, promoted_temporary, mode, subkernel))
+                self.new_subdomain, promoted_temporary, mode, subkernel,
+                region))
 
         self.new_subdomain = new_subdomain
 
@@ -637,11 +862,16 @@ class TemporarySaver(object):
         self.save_or_reload_impl(temporary, subkernel, "reload")
 
     def augment_domain_for_save_or_reload(self,
-            domain, promoted_temporary, mode, subkernel):
+            domain, promoted_temporary, mode, subkernel, region=None):
         """
         Add new axes to the domain corresponding to the dimensions of
         `promoted_temporary`. These axes will be used in the save/
         reload stage. These get prefixed onto the already existing axes.
+
+        If *region* is not *None*, the axes corresponding to the dimensions
+        of the original temporary are further restricted to this
+        :class:`islpy.BasicSet`, as obtained from
+        :meth:`get_save_and_reload_regions`.
         """
         assert mode in ("save", "reload")
         import islpy as isl
@@ -656,8 +886,6 @@ class TemporarySaver(object):
 
         from loopy.symbolic import aff_from_expr
 
-        # FIXME: Restrict size of new inames to access footprint.
-
         # Add dimension-dependent inames.
         dim_inames = []
         domain = domain.add_dims(isl.dim_type.set,
@@ -710,6 +938,13 @@ class TemporarySaver(object):
             self.updated_iname_to_tags[new_iname] = frozenset([hw_tag])
             hw_inames.append(new_iname)
 
+        # Restrict the new inames to the access footprint.
+        if region is not None:
+            for dim_idx in range(len(orig_temporary.shape)):
+                region = region.set_dim_name(
+                        isl.dim_type.set, dim_idx, dim_inames[dim_idx])
+            domain &= isl.align_spaces(region, domain)
+
         # The operations on the domain above return a Set object, but the
         # underlying domain should be expressible as a single BasicSet.
         domain_list = domain.get_basic_set_list()
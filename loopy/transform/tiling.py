@@ -0,0 +1,559 @@
+from __future__ import division, absolute_import
+
+__copyright__ = "Copyright (C) 2019 University of Illinois Board of Trustees"
+
+__license__ = """
+Permission is hereby granted, free of charge, to any person obtaining a copy
+of this software and associated documentation files (the "Software"), to deal
+in the Software without restriction, including without limitation the rights
+to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+copies of the Software, and to permit persons to whom the Software is
+furnished to do so, subject to the following conditions:
+
+The above copyright notice and this permission notice shall be included in
+all copies or substantial portions of the Software.
+
+THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN
+THE SOFTWARE.
+"""
+
+
+import six
+
+import islpy as isl
+from islpy import dim_type
+
+from loopy.diagnostic import LoopyError
+
+import logging
+logger = logging.getLogger(__name__)
+
+
+__doc__ = """
+
+.. currentmodule:: loopy
+
+.. autofunction:: tile_for_cache
+
+.. autofunction:: get_cpu_cache_sizes
+
+.. autofunction:: register_block
+"""
+
+
+# {{{ cache size discovery
+
+#: Data cache sizes in bytes (L1, L2, L3) assumed if they cannot be
+#: determined from the operating system.
+DEFAULT_CACHE_SIZES = (32*1024, 256*1024, 8*1024*1024)
+
+
+def _parse_cache_size(size_str):
+    size_str = size_str.strip().upper()
+
+    for suffix, factor in [("K", 1024), ("M", 1024**2), ("G", 1024**3)]:
+        if size_str.endswith(suffix):
+            return int(size_str[:-1]) * factor
+
+    return int(size_str)
+
+
+def get_cpu_cache_sizes():
+    """Return a tuple of the data cache sizes (in bytes) of the host CPU,
+    innermost level first, as reported by the operating system. Falls back
+    to :data:`DEFAULT_CACHE_SIZES` if these cannot be determined.
+    """
+    import os
+    from glob import glob
+
+    level_to_size = {}
+
+    for cache_dir in glob("/sys/devices/system/cpu/cpu0/cache/index*"):
+        def read(name):
+            with open(os.path.join(cache_dir, name)) as inf:
+                return inf.read().strip()
+
+        try:
+            if read("type") == "Instruction":
+                continue
+
+            level_to_size[int(read("level"))] = _parse_cache_size(read("size"))
+        except (IOError, OSError, ValueError):
+            continue
+
+    if not level_to_size:
+        return DEFAULT_CACHE_SIZES
+
+    return tuple(size for _, size in sorted(six.iteritems(level_to_size)))
+
+# }}}
+
+
+# {{{ footprint model
+
+def _tile_param_name(iname):
+    return "_lpy_tile_" + iname
+
+
+class _TileFootprintModel(object):
+    """Determines the number of bytes accessed by one tile of a loop nest,
+    as a function of the tile sizes.
+    """
+
+    def __init__(self, kernel, inames, parameters):
+        from loopy.preprocess import preprocess_kernel, infer_unknown_types
+        from loopy.kernel import KernelState
+        from loopy.kernel.instruction import MultiAssignmentBase
+        from loopy.statistics import AccessFootprintGatherer
+
+        kernel = infer_unknown_types(kernel, expect_completion=True)
+        if kernel.state < KernelState.PREPROCESSED:
+            kernel = preprocess_kernel(kernel)
+
+        self.kernel = kernel
+        self.inames = inames
+        self.parameters = parameters
+
+        missing_inames = set(inames) - kernel.all_inames()
+        if missing_inames:
+            raise LoopyError("inames not found: %s"
+                    % ", ".join(sorted(missing_inames)))
+
+        footprints = []
+        for insn in kernel.instructions:
+            if not isinstance(insn, MultiAssignmentBase):
+                continue
+
+            insn_inames = kernel.insn_inames(insn)
+            tiled_inames = [iname for iname in inames if iname in insn_inames]
+            if not tiled_inames:
+                continue
+
+            domain = (kernel.get_inames_domain(insn_inames)
+                    .project_out_except(insn_inames, [dim_type.set]))
+            domain = self._restrict_to_tile(domain, tiled_inames)
+
+            afg = AccessFootprintGatherer(kernel, domain)
+            footprints.append(afg(insn.assignees))
+            footprints.append(afg(insn.expression))
+
+        if not footprints:
+            raise LoopyError("no instructions found within inames '%s'"
+                    % ", ".join(inames))
+
+        self.var_to_footprint = AccessFootprintGatherer.combine(footprints)
+
+        self.iname_to_extent = dict(
+                (iname, self._count(
+                    kernel.get_inames_domain(frozenset([iname]))
+                    .project_out_except([iname], [dim_type.set]),
+                    {}))
+                for iname in inames)
+
+    def _restrict_to_tile(self, domain, tiled_inames):
+        from loopy.symbolic import aff_from_expr, pw_aff_to_expr
+        from pymbolic import var
+
+        nparams = domain.dim(dim_type.param)
+        domain = domain.add_dims(dim_type.param, len(tiled_inames))
+
+        for i, iname in enumerate(tiled_inames):
+            tile_param = _tile_param_name(iname)
+            domain = domain.set_dim_name(dim_type.param, nparams + i, tile_param)
+
+            lower_bound = (
+                    self.kernel.get_iname_bounds(iname)
+                    .lower_bound_pw_aff)
+            lower_bound = pw_aff_to_expr(lower_bound, int_ok=True)
+
+            aff = isl.affs_from_space(domain.space)
+            domain = domain & aff[iname].lt_set(
+                    aff_from_expr(domain.space, lower_bound + var(tile_param)))
+
+        return domain
+
+    def _count(self, s, tile_sizes):
+        from loopy.statistics import count_points
+
+        param_values = self.parameters.copy()
+        for iname, tile_size in six.iteritems(tile_sizes):
+            param_values[_tile_param_name(iname)] = tile_size
+
+        for iname in self.inames:
+            param_values.setdefault(_tile_param_name(iname), 1)
+
+        try:
+            return count_points(s, param_values)
+        except ValueError:
+            raise LoopyError("tile_for_cache: unable to evaluate footprint, "
+                    "values for the parameters '%s' are required"
+                    % ", ".join(sorted(
+                        set(s.get_var_names(dim_type.param))
+                        - set(param_values))))
+
+    def get_footprint_bytes(self, tile_sizes):
+        result = 0
+        for var_name, footprint in six.iteritems(self.var_to_footprint):
+            itemsize = self.kernel.get_var_descriptor(
+                    var_name).dtype.numpy_dtype.itemsize
+            result += itemsize * self._count(footprint, tile_sizes)
+
+        return result
+
+# }}}
+
+
+# {{{ tile size selection
+
+def _grow_tile_sizes(model, tile_sizes, capacity):
+    """Repeatedly double the tile sizes, innermost iname first, as long as
+    the footprint of a tile stays within *capacity* bytes.
+    """
+    tile_sizes = tile_sizes.copy()
+
+    grew = True
+    while grew:
+        grew = False
+
+        for iname in reversed(model.inames):
+            extent = model.iname_to_extent[iname]
+            if tile_sizes[iname] >= extent:
+                continue
+
+            new_tile_sizes = tile_sizes.copy()
+            new_tile_sizes[iname] = min(2*tile_sizes[iname], extent)
+
+            if model.get_footprint_bytes(new_tile_sizes) <= capacity:
+                tile_sizes = new_tile_sizes
+                grew = True
+
+    return tile_sizes
+
+# }}}
+
+
+def tile_for_cache(kernel, inames, cache_sizes=None, parameters=None,
+        cache_fill_fraction=0.5):
+    """Tile the loop nest *inames* so that the data accessed by one tile
+    stays resident in each level of the cache hierarchy, by means of
+    :func:`loopy.split_iname` and :func:`loopy.prioritize_loops`.
+
+    For each cache level, starting with the innermost, tile sizes are grown
+    by doubling (beginning with those of the previous level) as long as the
+    footprint of a tile, as found using the machinery behind
+    :func:`loopy.gather_access_footprints`, fits within
+    *cache_fill_fraction* of the cache. Each iname is then split once per
+    level at which its tile is smaller than that of the next-outer level.
+
+    :arg inames: The loop nest to tile, outermost first, as a list of inames
+        or a comma-separated string. This order is kept among the tile loops
+        of each level and among the innermost (point) loops. Reduction
+        inames cannot be tiled.
+    :arg cache_sizes: A sequence of cache sizes in bytes, innermost level
+        first. Defaults to the result of :func:`get_cpu_cache_sizes`.
+    :arg parameters: A mapping from kernel parameters to the values
+        for which tile sizes are to be chosen. Required for parameters on
+        which the footprint depends.
+    :arg cache_fill_fraction: The fraction of each cache the footprint of
+        a tile may occupy, to leave room for conflict misses and other data.
+
+    Intended for CPU targets such as :class:`loopy.ExecutableCTarget`.
+
+    .. versionadded:: 2019.1
+    """
+    if isinstance(inames, str):
+        inames = [s.strip() for s in inames.split(",")]
+    inames = list(inames)
+
+    reduction_inames = set()
+    for insn in kernel.instructions:
+        reduction_inames.update(insn.reduction_inames())
+
+    if set(inames) & reduction_inames:
+        raise LoopyError("cannot tile reduction inames '%s', since their loops "
+                "must remain nested inside the instruction performing the "
+                "reduction--write the reduction as an explicit accumulation "
+                "instead" % ", ".join(sorted(set(inames) & reduction_inames)))
+
+    if cache_sizes is None:
+        cache_sizes = get_cpu_cache_sizes()
+    if parameters is None:
+        parameters = {}
+
+    model = _TileFootprintModel(kernel, inames, dict(parameters))
+
+    # {{{ choose tile sizes
+
+    level_tile_sizes = []
+    tile_sizes = dict((iname, 1) for iname in inames)
+    for cache_size in cache_sizes:
+        tile_sizes = _grow_tile_sizes(
+                model, tile_sizes, cache_fill_fraction*cache_size)
+        level_tile_sizes.append(tile_sizes)
+
+        logger.info("%s: tile sizes for %d-byte cache: %s (%d bytes)" % (
+            kernel.name, cache_size,
+            ", ".join("%s: %d" % (iname, tile_sizes[iname]) for iname in inames),
+            model.get_footprint_bytes(tile_sizes)))
+
+    # }}}
+
+    # {{{ apply splits
+
+    from loopy.transform.iname import split_iname, prioritize_loops
+
+    vng = kernel.get_var_name_generator()
+
+    # level_loops[ilevel] lists the tile loops of cache level ilevel
+    level_loops = [[] for _ in cache_sizes]
+    point_loops = []
+
+    for iname in inames:
+        current_iname = iname
+        current_extent = model.iname_to_extent[iname]
+
+        for ilevel in reversed(range(len(cache_sizes))):
+            tile_size = level_tile_sizes[ilevel][iname]
+            if tile_size >= current_extent:
+                continue
+
+            outer_iname = vng("%s_tile_l%d" % (iname, ilevel+1))
+            inner_iname = vng("%s_in_l%d" % (iname, ilevel+1))
+            kernel = split_iname(kernel, current_iname, tile_size,
+                    outer_iname=outer_iname, inner_iname=inner_iname)
+
+            level_loops[ilevel].append(outer_iname)
+            current_iname = inner_iname
+            current_extent = tile_size
+
+        point_loops.append(current_iname)
+
+    # }}}
+
+    loop_order = [
+            iname
+            for ilevel in reversed(range(len(cache_sizes)))
+            for iname in level_loops[ilevel]] + point_loops
+
+    if len(loop_order) > 1:
+        kernel = prioritize_loops(kernel, loop_order)
+
+    return kernel
+
+
+# {{{ register blocking
+
+def _check_register_blocking_write_index(kernel, iname, var_name, index):
+    """Check that the write index *index* of *var_name* is an injective
+    function of *iname*, i.e. that distinct iterations of the loop over
+    *iname* write distinct entries.
+    """
+    import numpy as np
+    from pymbolic.primitives import Variable
+    from loopy.symbolic import CoefficientCollector, get_dependencies
+    from loopy.diagnostic import ExpressionNotAffineError
+
+    def fail(reason):
+        raise LoopyError("cannot register-block iname '%s': '%s' is written "
+                "at index '%s', which %s" % (
+                    iname, var_name, ", ".join(str(i) for i in index),
+                    reason))
+
+    if get_dependencies(index) & set(kernel.temporary_variables):
+        fail("depends on temporaries")
+
+    has_iname_coefficient = False
+    for index_expr in index:
+        try:
+            coeffs = CoefficientCollector()(index_expr)
+        except (ExpressionNotAffineError, ValueError, RuntimeError,
+                NotImplementedError):
+            # not affine (nonlinear, containing subscripts, divisions, ...)
+            fail("is not an affine function of the inames and parameters")
+
+        for var, coeff in six.iteritems(coeffs):
+            if isinstance(var, Variable) and var.name == iname:
+                if not isinstance(coeff, (int, np.integer)):
+                    fail("has a non-integer coefficient of '%s'" % iname)
+                if coeff:
+                    has_iname_coefficient = True
+
+    if not has_iname_coefficient:
+        fail("is not an injective function of '%s'" % iname)
+
+
+def _get_register_blocking_private_temporaries(kernel, iname):
+    """Check that iterations of the loop over *iname* may be interleaved
+    with each other. Return the names of temporaries that need to be
+    privatized for this.
+    """
+    from loopy.kernel.data import auto, AddressSpace, MultiAssignmentBase
+    from loopy.symbolic import ArrayAccessFinder, get_dependencies
+    from pymbolic.primitives import Subscript
+
+    insn_ids = kernel.iname_to_insns()[iname]
+    if not insn_ids:
+        raise LoopyError("register_block: no instructions found within "
+                "iname '%s'" % iname)
+
+    reader_map = kernel.reader_map()
+    writer_map = kernel.writer_map()
+
+    written_var_names = set()
+    for insn_id in insn_ids:
+        written_var_names.update(kernel.id_to_insn[insn_id].assignee_var_names())
+
+    private_temporaries = set()
+
+    for var_name in sorted(written_var_names):
+        write_indices = set()
+        for writer_id in writer_map[var_name] & insn_ids:
+            writer = kernel.id_to_insn[writer_id]
+            for assignee_var_name, assignee in zip(
+                    writer.assignee_var_names(), writer.assignees):
+                if assignee_var_name != var_name:
+                    continue
+
+                if isinstance(assignee, Subscript):
+                    write_indices.add(assignee.index_tuple)
+                else:
+                    write_indices.add(())
+
+        if all(iname not in get_dependencies(index) for index in write_indices):
+            # Written in all iterations, privatizable if the iterations do
+            # not communicate through it.
+            temp_var = kernel.temporary_variables.get(var_name)
+            if temp_var is None or temp_var.address_space not in [
+                    auto, AddressSpace.PRIVATE]:
+                raise LoopyError("cannot register-block iname '%s': '%s' is "
+                        "written in all of its iterations, but is not a "
+                        "private temporary" % (iname, var_name))
+
+            if not (reader_map.get(var_name, set())
+                    | writer_map[var_name]) <= insn_ids:
+                raise LoopyError("cannot register-block iname '%s': "
+                        "temporary '%s' is written in all of its iterations "
+                        "and accessed outside of them" % (iname, var_name))
+
+            private_temporaries.add(var_name)
+            continue
+
+        if len(write_indices) > 1:
+            raise LoopyError("cannot register-block iname '%s': '%s' is "
+                    "written at differing indices within it"
+                    % (iname, var_name))
+
+        write_index, = write_indices
+        _check_register_blocking_write_index(
+                kernel, iname, var_name, write_index)
+
+        for reader_id in reader_map.get(var_name, set()) & insn_ids:
+            reader = kernel.id_to_insn[reader_id]
+            if not isinstance(reader, MultiAssignmentBase):
+                raise LoopyError("cannot register-block iname '%s': unable "
+                        "to determine where '%s' reads '%s'"
+                        % (iname, reader_id, var_name))
+
+            for expr in (reader.expression,) + tuple(reader.predicates):
+                for access in ArrayAccessFinder(var_name)(expr):
+                    if access.index_tuple != write_index:
+                        raise LoopyError("cannot register-block iname '%s': "
+                                "'%s' reads '%s' at a different index than "
+                                "it is written within the loop, which may "
+                                "be from a different iteration"
+                                % (iname, reader_id, var_name))
+
+    return private_temporaries
+
+
+def register_block(kernel, inames, factors):
+    """Register-block the loops over *inames*: split each of them by the
+    corresponding entry of *factors* (by means of :func:`loopy.split_iname`),
+    and unroll the inner loops and jam the resulting copies of their bodies
+    together, inside any loops nested within them. For example, for a
+    matrix-matrix product, register-blocking the loops over the rows and
+    columns of the result computes a block of entries of the result at
+    once, in the (sequential) loop over the summation index, reusing each
+    loaded entry of the factors for a row or column of the block.
+
+    This is achieved by tagging the inner inames with ``"ilp.unr"`` (see
+    :ref:`iname-tags`). Temporaries written in all iterations of a blocked
+    loop (such as accumulators, including those created for reductions) are
+    made private, and, during preprocessing, receive an axis for each of
+    the inner inames (see :func:`loopy.privatize_temporaries_with_inames`),
+    which after unrolling is only indexed by constants, so that the entries
+    may be held in registers.
+
+    :arg inames: A list of inames or a comma-separated string. The inames
+        must not be tagged and may not be reduction inames.
+    :arg factors: A block size for each of *inames*, or a single block size
+        for all of them.
+
+    Raises a :exc:`loopy.LoopyError` if the iterations of one of the loops
+    might depend on each other (so that jamming them would be invalid),
+    i.e. if a variable written within the loop is neither written at a
+    single index injective in the iname (and only read at this index
+    within the loop) nor a private temporary only accessed within the loop.
+    For an index to be considered injective, it must be affine, with a
+    nonzero integer coefficient of the iname, and may not contain
+    subscripts or temporaries.
+
+    .. versionadded:: 2019.1
+    """
+    if isinstance(inames, str):
+        inames = [s.strip() for s in inames.split(",")]
+    inames = list(inames)
+
+    if isinstance(factors, int):
+        factors = [factors] * len(inames)
+    factors = list(factors)
+
+    if len(factors) != len(inames):
+        raise LoopyError("register_block: got %d inames, but %d factors"
+                % (len(inames), len(factors)))
+
+    missing_inames = set(inames) - kernel.all_inames()
+    if missing_inames:
+        raise LoopyError("register_block: inames not found: %s"
+                % ", ".join(sorted(missing_inames)))
+
+    reduction_inames = set()
+    for insn in kernel.instructions:
+        reduction_inames.update(insn.reduction_inames())
+
+    if set(inames) & reduction_inames:
+        raise LoopyError("cannot register-block reduction inames '%s'--write "
+                "the reduction as an explicit accumulation instead"
+                % ", ".join(sorted(set(inames) & reduction_inames)))
+
+    tagged_inames = [iname for iname in inames if kernel.iname_tags(iname)]
+    if tagged_inames:
+        raise LoopyError("cannot register-block tagged inames '%s'"
+                % ", ".join(tagged_inames))
+
+    private_temporaries = set()
+    for iname in inames:
+        private_temporaries.update(
+                _get_register_blocking_private_temporaries(kernel, iname))
+
+    from loopy.transform.iname import split_iname
+    for iname, factor in zip(inames, factors):
+        kernel = split_iname(kernel, iname, factor, inner_tag="ilp.unr")
+
+    from loopy.kernel.data import AddressSpace
+    new_temporary_variables = kernel.temporary_variables.copy()
+    for var_name in private_temporaries:
+        new_temporary_variables[var_name] = (
+                new_temporary_variables[var_name].copy(
+                    address_space=AddressSpace.PRIVATE))
+
+    return kernel.copy(temporary_variables=new_temporary_variables)
+
+# }}}
+
+# vim: foldmethod=marker
@@ -66,8 +66,7 @@ class TypeInferenceMapper(CombineMapper):
         if return_tuple:
             kwargs["return_tuple"] = True
 
-        result = super(TypeInferenceMapper, self).__call__(
-                expr, **kwargs)
+        result = self.rec(expr, **kwargs)
 
         assert isinstance(result, list)
 
@@ -402,6 +401,42 @@ class TypeInferenceMapper(CombineMapper):
 # }}}
 
 
+# {{{ node-memoizing type inference mapper
+
+class NodeMemoizingTypeInferenceMapper(TypeInferenceMapper):
+    """A :class:`TypeInferenceMapper` that infers the type of each expression
+    node only once over its lifetime, remembering the result by the identity
+    of the node. (Keying by equality is unsafe, see the warning in
+    :class:`TypeInferenceMapper`.)
+
+    Only for use while the types of the variables in the kernel do not
+    change, such as during code generation, where the type of each
+    subexpression may be requested at each level of the expression tree.
+    """
+
+    def __init__(self, kernel, new_assignments=None):
+        super(NodeMemoizingTypeInferenceMapper, self).__init__(
+                kernel, new_assignments)
+
+        # maps keys involving id(expr) to (expr, result). The reference to
+        # expr keeps its id from being reused.
+        self._id_to_result = {}
+
+    def rec(self, expr, *args, **kwargs):
+        key = (id(expr), args, tuple(sorted(six.iteritems(kwargs))))
+
+        try:
+            _, result = self._id_to_result[key]
+        except KeyError:
+            result = super(NodeMemoizingTypeInferenceMapper, self).rec(
+                    expr, *args, **kwargs)
+            self._id_to_result[key] = (expr, result)
+
+        return list(result)
+
+# }}}
+
+
 # {{{ infer single variable
 
 def _infer_var_type(kernel, var_name, type_inf_mapper, subst_expander):
@@ -204,10 +204,10 @@ def to_loopy_type(dtype, allow_auto=False, allow_none=False, for_atomic=False,
         numpy_dtype = target.get_dtype_registry().get_or_register_dtype(dtype)
 
     if isinstance(dtype, LoopyType):
-        if for_atomic:
+        if for_atomic and not isinstance(dtype, AtomicType):
             if isinstance(dtype, NumpyType):
                 return AtomicNumpyType(dtype.dtype, target=target)
-            elif not isinstance(dtype, AtomicType):
+            else:
                 raise LoopyError("do not know how to convert '%s' to an atomic type"
                         % dtype)
 
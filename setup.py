@@ -117,7 +117,7 @@ setup(name="loo.py",
           "git+https://github.com/pearu/f2py.git"
           ],
 
-      scripts=["bin/loopy"],
+      scripts=["bin/loopy", "bin/loopy-cache"],
 
       author="Andreas Kloeckner",
       url="http://mathema.tician.de/software/loopy",
@@ -353,6 +353,96 @@ def test_missing_compilers():
         __test(eval_tester, ExecutableCTarget, compiler=ccomp)
 
 
+def test_tile_for_cache():
+    from loopy.target.c import ExecutableCTarget
+
+    n = 64
+    knl = lp.make_kernel(
+            "{ [i,j,k]: 0<=i,j,k<n }",
+            "c[i,j] = c[i,j] + a[i,k]*b[k,j]",
+            [lp.GlobalArg("a,b,c", np.float64, shape="n,n"), "..."],
+            target=ExecutableCTarget())
+
+    tiled_knl = lp.tile_for_cache(knl, "i,k,j",
+            cache_sizes=(4*1024, 64*1024), parameters=dict(n=n))
+
+    # Each iname is split at both levels, with the tile loops outermost
+    # and the point loops innermost.
+    assert len(tiled_knl.all_inames()) == 9
+    assert "i_tile_l2" in tiled_knl.all_inames()
+    assert "j_tile_l1" in tiled_knl.all_inames()
+
+    a = np.random.rand(n, n)
+    b = np.random.rand(n, n)
+    _, (c,) = tiled_knl(a=a, b=b, c=np.zeros((n, n)))
+    assert np.allclose(c, a.dot(b))
+
+    red_knl = lp.make_kernel(
+            "{ [i,j,k]: 0<=i,j,k<n }",
+            "c[i,j] = sum(k, a[i,k]*b[k,j])",
+            [lp.GlobalArg("a,b,c", np.float64, shape="n,n"), "..."],
+            target=ExecutableCTarget())
+
+    with pytest.raises(lp.LoopyError):
+        lp.tile_for_cache(red_knl, "i,j,k", parameters=dict(n=n))
+
+
+def test_strength_reduce_index_arithmetic():
+    from loopy.target.c import ExecutableCTarget
+
+    knl = lp.make_kernel(
+            "{ [i,j,k]: 0<=i<n and 0<=j<m and 0<=k<l }",
+            "out[i,j,k] = 2*a[i,j,k] + a[i,j,l-1-k] + b[k,j]",
+            [lp.GlobalArg("a,out", np.float64, shape="n,m,l"),
+             lp.GlobalArg("b", np.float64, shape="l,m"), "..."],
+            target=ExecutableCTarget())
+    knl = lp.prioritize_loops(knl, "i,j,k")
+    sr_knl = lp.set_options(knl, strength_reduce_index_arithmetic=True)
+
+    code = lp.generate_code_v2(sr_knl).device_code()
+    assert "a_k_offset" in code
+    assert "out[out_k_offset]" in code
+    assert "a_k_offset += -1" in code
+    assert "b_k_offset += m" in code
+    assert "a_k_offset" not in lp.generate_code_v2(knl).device_code()
+
+    a = np.random.rand(5, 6, 7)
+    b = np.random.rand(7, 6)
+    _, (out,) = sr_knl(a=a, b=b)
+    assert np.allclose(out, 2*a + a[:, :, ::-1] + b.T)
+
+
+def test_version_tile_loops():
+    from loopy.target.c import ExecutableCTarget
+
+    knl = lp.make_kernel(
+            "{ [i,j]: 0<=i<n and 0<=j<m }",
+            "out[i,j] = 2*a[i,j]",
+            [lp.GlobalArg("a,out", np.float64, shape="n,m"), "..."],
+            target=ExecutableCTarget())
+    knl = lp.split_iname(knl, "i", 16)
+    knl = lp.split_iname(knl, "j", 8)
+    knl = lp.prioritize_loops(knl, "i_outer,j_outer,i_inner,j_inner")
+
+    vknl = lp.set_options(knl, version_tile_loops=True)
+    code = lp.generate_code_v2(vknl).device_code()
+    assert "bulk slab for 'i_outer'" in code
+    assert "bulk slab for 'j_outer'" in code
+    # the full tiles need no bounds checks
+    assert "i_inner <= 15; ++i_inner" in code
+    assert "j_inner <= 7; ++j_inner" in code
+
+    for n, m in [(37, 21), (32, 16), (5, 3)]:
+        a = np.random.rand(n, m)
+        _, (out,) = vknl(a=a)
+        assert np.allclose(out, 2*a)
+
+    # only one loop may be versioned without exceeding two copies of the body
+    code = lp.generate_code_v2(
+            lp.set_options(knl, version_tile_loops=2)).device_code()
+    assert code.count("bulk slab for") == 1
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
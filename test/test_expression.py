@@ -488,6 +488,40 @@ def test_divide_precedence(ctx_factory):
     assert y_out.get() == 2
 
 
+def test_type_inference_memoized_in_codegen(monkeypatch):
+    from loopy.type_inference import NodeMemoizingTypeInferenceMapper
+
+    expr = "x[i]"
+    for k in range(30):
+        expr = "(%s)*x[i] + %d.5j" % (expr, k)
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = " + expr)
+    knl = lp.add_and_infer_dtypes(knl, {"x": np.complex128})
+    knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+
+    from loopy.codegen import generate_code_v2
+    from loopy.target.c.codegen import expression
+
+    nsum_inferences = [0]
+
+    class CountingTypeInferenceMapper(NodeMemoizingTypeInferenceMapper):
+        def map_sum(self, expr):
+            nsum_inferences[0] += 1
+            return super(CountingTypeInferenceMapper, self).map_sum(expr)
+
+    # a code generation cache hit would bypass the mapper
+    monkeypatch.setattr(lp, "CACHING_ENABLED", False)
+    monkeypatch.setattr(expression, "NodeMemoizingTypeInferenceMapper",
+            CountingTypeInferenceMapper)
+    generate_code_v2(knl).device_code()
+
+    # Each of the 30 sums in the expression is inferred once, rather than
+    # once for each enclosing sum. (A few more sums occur outside of it.)
+    assert 0 < nsum_inferences[0] < 40
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
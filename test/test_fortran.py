@@ -503,6 +503,103 @@ def test_precompute_some_exist(ctx_factory):
     lp.auto_test_vs_ref(ref_knl, ctx, knl, parameters=dict(n=128, m=128, ell=128))
 
 
+def test_frontend_cache_and_parallel_translation(monkeypatch):
+    import loopy.frontend.fortran as fortran_frontend
+
+    monkeypatch.setattr(lp, "CACHING_ENABLED", True)
+
+    fortran_src = """
+        subroutine fill(out, a, n)
+          implicit none
+
+          real*8 a, out(n)
+          integer n, i
+
+          do i = 1, n
+            out(i) = a
+          end do
+        end
+
+        subroutine twice(out, inp, n)
+          implicit none
+
+          real*8 out(n), inp(n)
+          integer n, i
+
+          do i = 1, n
+            out(i) = 2*inp(i)
+          end do
+        end
+        """
+
+    cache = fortran_frontend.fortran_frontend_cache
+
+    knls = lp.parse_fortran(fortran_src, filename="frontend_cache_test.f90",
+            max_workers=2)
+    assert [knl.name for knl in knls] == ["fill", "twice"]
+
+    hits = cache.hits
+    cached_knls = lp.parse_fortran(fortran_src,
+            filename="frontend_cache_test.f90")
+    assert cache.hits == hits + 1
+    assert cached_knls == knls
+
+    # the cached kernels remain transformable
+    knl = lp.split_iname(cached_knls[1], "i", 16)
+    assert "i_inner" in knl.all_inames()
+
+    # warnings about the kernels are issued again on cache hits
+    transformed_src = fortran_src + """
+        !$loopy begin
+        ! from loopy.diagnostic import warn_with_kernel
+        ! fill, twice = lp.parse_fortran(SOURCE, FILENAME)
+        ! warn_with_kernel(fill, "frontend_cache_test", "transformed")
+        ! RESULT = [fill]
+        !$loopy end
+        """
+
+    for _ in range(2):
+        with pytest.warns(lp.LoopyWarning, match="transformed"):
+            lp.parse_transformed_fortran(transformed_src,
+                    filename="frontend_cache_test.floopy")
+
+
+def test_cli_batch(tmpdir, monkeypatch):
+    from loopy.cli import main
+
+    # the command line frontend changes the default target
+    monkeypatch.setattr(lp, "_DEFAULT_TARGET", lp._DEFAULT_TARGET)
+
+    for name, factor in [("fill", 1), ("scale", 2)]:
+        tmpdir.join(name + ".floopy").write("""
+subroutine %(name)s(out, a, n)
+  implicit none
+
+  real*8 a, out(n)
+  integer n, i
+
+  do i = 1, n
+    out(i) = %(factor)d*a
+  end do
+end
+
+!$loopy begin
+! %(name)s, = lp.parse_fortran(SOURCE, FILENAME)
+! RESULT = [%(name)s]
+!$loopy end
+""" % dict(name=name, factor=factor))
+
+    outdir = tmpdir.mkdir("out")
+    monkeypatch.setattr(sys, "argv", [
+        "loopy", "--target", "c", "--output-dir", str(outdir),
+        "--batch", str(tmpdir.join("fill.floopy")),
+        str(tmpdir.join("scale.floopy"))])
+    main()
+
+    assert "void fill(" in outdir.join("fill.c").read()
+    assert "void scale(" in outdir.join("scale.c").read()
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
@@ -1208,6 +1208,60 @@ def test_save_of_private_array_in_hw_loop(ctx_factory, debug=False):
         queue, knl, np.vstack((8 * (np.arange(8),))), debug)
 
 
+def test_save_and_reload_of_access_footprint(ctx_factory, debug=False):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+        "{ [i,j,k,l]: 0<=i,j,l<8 and 0<=k<3 }",
+        """
+        for i
+            for j
+               <>t[j] = j
+            end
+            ... gbarrier
+            for k
+                t[k] = 10 + k
+            end
+            ... gbarrier
+            for l
+                out[i,l] = t[l]
+            end
+        end
+        """, seq_dependencies=True)
+
+    knl = lp.tag_inames(knl, dict(i="g.0"))
+    knl = lp.set_temporary_scope(knl, "t", "private")
+
+    from loopy.preprocess import preprocess_kernel
+    from loopy.schedule import get_one_scheduled_kernel
+    from loopy.transform.save import save_and_reload_temporaries
+
+    sched_knl = get_one_scheduled_kernel(preprocess_kernel(knl))
+    saved_knl = save_and_reload_temporaries(sched_knl)
+
+    # The second subkernel overwrites a part of t without reading it: only
+    # that part needs to be saved, and nothing needs to be reloaded.
+    assert len(saved_knl.temporary_variables["t_save_slot"].shape) == 2
+
+    saves = [insn for insn in saved_knl.instructions if insn.id.startswith("t.save")]
+    reloads = [
+            insn for insn in saved_knl.instructions
+            if insn.id.startswith("t.reload")]
+    assert len(saves) == 2
+    assert len(reloads) == 1
+
+    def get_save_axis_size(insn):
+        axis_iname, = [iname for iname in insn.within_inames if "_axis_" in iname]
+        return saved_knl.get_constant_iname_length(axis_iname)
+
+    sizes = sorted(get_save_axis_size(insn) for insn in saves)
+    assert sizes == [3, 8]
+
+    out_expect = np.vstack(8 * (np.array([10, 11, 12, 3, 4, 5, 6, 7]),))
+    save_and_reload_temporaries_test(queue, knl, out_expect, debug)
+
+
 def test_save_of_private_multidim_array(ctx_factory, debug=False):
     ctx = ctx_factory()
     queue = cl.CommandQueue(ctx)
@@ -2396,6 +2450,85 @@ def test_global_barrier_error_if_unordered():
         lp.get_global_barrier_order(knl)
 
 
+def test_minimize_global_barriers(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            """
+            a[i] = 2*x[i] {id=wr_a}
+            ... gbarrier {id=bar_a, dep=wr_a}
+            out1[i] = a[(i+1) % n] {id=rd_a, dep=bar_a}
+            c[i] = 3*x[i] {id=wr_c}
+            ... gbarrier {id=bar_c, dep=wr_c}
+            out2[i] = c[(i+1) % n] {id=rd_c, dep=bar_c}
+            """,
+            [lp.GlobalArg("a,c", np.float32, shape="n"), "..."])
+
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+    knl = lp.add_and_infer_dtypes(knl, {"x": np.float32})
+
+    def count_subkernels(knl):
+        from loopy.schedule import CallKernel
+        return sum(
+                1 for sched_item in knl.schedule
+                if isinstance(sched_item, CallKernel))
+
+    min_knl = lp.set_options(knl, minimize_global_barriers=True)
+
+    sched_knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+    min_sched_knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(min_knl))
+
+    assert count_subkernels(sched_knl) == 3
+    assert count_subkernels(min_sched_knl) == 2
+    assert lp.get_global_barrier_order(min_sched_knl) == ("bar_a", "bar_c")
+
+    x = np.arange(64, dtype=np.float32)
+    _, out = lp.set_options(min_knl, return_dict=True)(
+            queue, x=x, out_host=True)
+
+    assert np.array_equal(out["out1"], 2*np.roll(x, -1))
+    assert np.array_equal(out["out2"], 3*np.roll(x, -1))
+
+
+def test_subkernel_event_dag(ctx_factory):
+    ctx = ctx_factory()
+
+    try:
+        queue = cl.CommandQueue(ctx, properties=(
+            cl.command_queue_properties.OUT_OF_ORDER_EXEC_MODE_ENABLE))
+    except cl.Error:
+        queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            """
+            a[i] = 2*x[i] {id=wr_a}
+            ... gbarrier {id=bar_a, dep=wr_a}
+            out1[i] = a[(i+1) % n] {id=rd_a, dep=bar_a}
+            c[i] = 3*x[i] {id=wr_c}
+            ... gbarrier {id=bar_c, dep=wr_c}
+            out2[i] = c[(i+1) % n] {id=rd_c, dep=bar_c}
+            """,
+            [lp.GlobalArg("a,c", np.float32, shape="n"), "..."])
+
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+    knl = lp.add_and_infer_dtypes(knl, {"x": np.float32})
+    knl = lp.set_options(knl, return_dict=True)
+
+    host_code = lp.generate_code_v2(knl).host_code()
+    assert "_lpy_write_evts" in host_code
+    assert "enqueue_marker" in host_code
+
+    x = np.arange(64, dtype=np.float32)
+    evt, out = knl(queue, x=x, out_host=True)
+    evt.wait()
+
+    assert np.array_equal(out["out1"], 2*np.roll(x, -1))
+    assert np.array_equal(out["out2"], 3*np.roll(x, -1))
+
+
 def test_struct_assignment(ctx_factory):
     ctx = ctx_factory()
     queue = cl.CommandQueue(ctx)
@@ -2858,6 +2991,87 @@ def test_non_integral_array_idx_raises():
         print(lp.generate_code_v2(knl).device_code())
 
 
+def test_renaming_invariant_caching():
+    def make_knl(iname, tmp, insn_id, name):
+        return lp.make_kernel(
+                "{[%s]: 0<=%s<n}" % (iname, iname),
+                """
+                <> %(tmp)s = a[%(iname)s] * 2 {id=%(insn_id)s}
+                out[0] = sum(%(iname)s, %(tmp)s) {dep=%(insn_id)s}
+                """ % dict(iname=iname, tmp=tmp, insn_id=insn_id),
+                [lp.GlobalArg("a", np.float64, shape=lp.auto), "..."],
+                name=name)
+
+    knl1 = make_knl("i", "t", "first", "knl_renaming_invariant_caching1")
+    knl2 = make_knl("k", "u", "second", "knl_renaming_invariant_caching2")
+
+    from loopy.kernel.tools import (
+            get_canonical_identifier_renaming, rename_identifiers)
+    renaming1 = get_canonical_identifier_renaming(knl1)
+    renaming2 = get_canonical_identifier_renaming(knl2)
+    assert (
+            rename_identifiers(knl1, renaming1)
+            == rename_identifiers(knl2, renaming2))
+
+    pknl1 = lp.preprocess_kernel(knl1)
+
+    from loopy.preprocess import preprocess_cache
+    pknl2 = preprocess_cache[preprocess_cache.make_key(knl2)]
+
+    assert pknl2.name == knl2.name
+    assert "k" in pknl2.all_inames()
+    assert "u" in pknl2.temporary_variables
+    assert "second" in pknl2.id_to_insn
+    assert pknl2 == rename_identifiers(
+            pknl1, renaming1.then(renaming2.inverted()))
+
+    # The preprocessed kernel has a reduction accumulator 'acc_i', which would
+    # clash with the temporary of knl3. This results in a cache miss.
+    knl3 = make_knl("j", "acc_i", "first", "knl_renaming_invariant_caching3")
+    with pytest.raises(KeyError):
+        preprocess_cache[preprocess_cache.make_key(knl3)]
+
+    # Generated code is only shared between kernels differing in their
+    # instruction ids.
+    code1 = lp.generate_code_v2(knl1).device_code()
+
+    knl4 = make_knl("i", "t", "fourth", knl1.name)
+    sknl4 = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl4))
+
+    from loopy.codegen import code_gen_cache
+    codegen_result4 = code_gen_cache[code_gen_cache.make_key(sknl4)]
+    assert codegen_result4.device_code() == code1
+    assert "fourth" in codegen_result4.implemented_domains
+
+
+def test_check_bounds():
+    from loopy.check import check_bounds
+
+    knl = lp.make_kernel(
+            "{[i]: 1<=i<n-1}",
+            """
+            out[i] = a[i-1] + a[i] + a[i+1] + a[0] + a[n-1] {id=stencil}
+            out[0] = a[0] {id=first}
+            """,
+            [lp.GlobalArg("a,out", np.float64, shape="n"), "..."])
+    check_bounds(knl)
+
+    knl = lp.make_kernel(
+            "{[i]: 1<=i<n-1}",
+            """
+            out[i] = a[i-1] + a[i] + a[i+2] {id=stencil}
+            out[0] = a[0] {id=first}
+            """,
+            [lp.GlobalArg("a,out", np.float64, shape="n"), "..."])
+
+    from loopy.diagnostic import LoopyError
+    with pytest.raises(LoopyError) as excinfo:
+        check_bounds(knl)
+
+    assert "a[i + 2]" in str(excinfo.value)
+    assert "stencil" in str(excinfo.value)
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
@@ -327,6 +327,118 @@ def test_Optional():  # noqa
     # }}}
 
 
+def test_cache_maintenance(tmpdir, monkeypatch):
+    from os.path import join
+    from loopy.tools import LoopyPersistentDict
+    import loopy.cache as lc
+
+    def make_cache():
+        return LoopyPersistentDict("loopy-test-cache",
+                container_dir=join(str(tmpdir), "loopy-test-cache"))
+
+    cache = make_cache()
+    monkeypatch.setattr(lc, "get_kernel_caches",
+            lambda names=None: [("test", cache)])
+
+    for i in range(4):
+        cache.store_if_not_present(i, "x" * 1000 * (i+1))
+
+    assert cache[0] == "x" * 1000
+    with pytest.raises(KeyError):
+        cache[17]
+
+    stats, = lc.get_cache_statistics()
+    assert stats.entries == 4
+    assert stats.bytes > 10000
+    assert (stats.hits, stats.misses) == (1, 1)
+    assert stats.hit_rate == 0.5
+
+    # {{{ export and import
+
+    archive = join(str(tmpdir), "cache.tar.gz")
+    assert lc.export_caches(archive) == 4
+
+    cache.clear()
+    cache = make_cache()
+    assert lc.get_cache_statistics()[0].entries == 0
+
+    assert lc.import_caches(archive) == 4
+    assert lc.import_caches(archive) == 0
+    assert cache[3] == "x" * 4000
+
+    # }}}
+
+    # {{{ pruning
+
+    import os
+    from time import time
+    now = time()
+    for i in range(4):
+        item_dir = cache._item_dir(cache.key_builder(i))
+        for file_name in os.listdir(item_dir):
+            os.utime(join(item_dir, file_name), (now - 1000*i, now - 1000*i))
+
+    assert lc.prune_caches(max_age=2500, now=now)[0] == 1
+    removed_entries, removed_bytes = lc.prune_caches(max_bytes=4000, now=now)
+    assert removed_entries == 1
+    assert removed_bytes > 3000
+
+    cache = make_cache()
+    assert cache[0] == "x" * 1000
+    for i in [2, 3]:
+        with pytest.raises(KeyError):
+            cache[i]
+
+    # }}}
+
+    lc.main(["stats"])
+
+
+def test_creation_cache(monkeypatch):
+    import numpy as np
+    import loopy as lp
+    import loopy.kernel.creation as creation
+
+    monkeypatch.setattr(lp, "CACHING_ENABLED", True)
+
+    def make_kernel(**kwargs):
+        return lp.make_kernel(
+                "{ [i]: 0<=i<n }",
+                """
+                <> t = 2*a[i]
+                out[i] = t + 1
+                """,
+                [lp.GlobalArg("a", np.float32, shape="n"), "..."],
+                name="creation_cache_test", **kwargs)
+
+    knl = make_kernel()
+    hits = creation.creation_cache.hits
+    assert make_kernel() == knl
+    assert creation.creation_cache.hits == hits + 1
+
+    # kernels depending on functions are not cached
+    def mangler(kernel, name, arg_dtypes):
+        return None
+
+    make_kernel(function_manglers=[mangler])
+    make_kernel(function_manglers=[mangler])
+    assert creation.creation_cache.hits == hits + 1
+
+    # warnings issued during creation are issued again on cache hits
+    def make_warning_kernel():
+        with pytest.warns(lp.LoopyWarning, match="never written"):
+            lp.make_kernel(
+                    "{ [i]: 0<=i<8 }",
+                    "out[i] = t[i]",
+                    [lp.TemporaryVariable("t", np.float32, shape=(8,)), "..."],
+                    name="creation_cache_warning_test")
+
+    make_warning_kernel()
+    hits = creation.creation_cache.hits
+    make_warning_kernel()
+    assert creation.creation_cache.hits == hits + 1
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
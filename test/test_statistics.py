@@ -1322,6 +1322,114 @@ def test_strided_footprint():
     assert 2*num < denom
 
 
+def test_vectorized_count_eval():
+    knl = lp.make_kernel(
+            "[n,m,ell] -> {[i,k,j]: 0<=i<n and 0<=k<m and 0<=j<ell}",
+            [
+                """
+                c[i, j, k] = a[i,j,k]*b[i,j,k]/3.0+a[i,j,k]
+                e[i, k+1] = -g[i,k]*h[i,k+1]
+                """
+            ],
+            name="basic", assumptions="n,m,ell >= 1")
+    knl = lp.add_and_infer_dtypes(knl,
+                                  dict(a=np.float32, b=np.float32,
+                                       g=np.float64, h=np.float64))
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0")
+
+    op_map = lp.get_op_map(knl, subgroup_size=SGS, count_redundant_work=True)
+    mem_map = lp.get_mem_access_map(knl, subgroup_size=SGS,
+                                    count_redundant_work=True)
+
+    n = np.arange(1, 100, 7)
+    m = np.array([1, 3, 17, 256])[:, np.newaxis]
+    sweep = {"n": n, "m": m, "ell": 5}
+
+    for count_map in [op_map, mem_map]:
+        total = count_map.eval_and_sum(sweep)
+        assert total.shape == (len(m), len(n))
+
+        for i_m, m_val in enumerate(m[:, 0]):
+            for i_n, n_val in enumerate(n):
+                assert total[i_m, i_n] == count_map.eval_and_sum(
+                        {"n": int(n_val), "m": int(m_val), "ell": 5})
+
+    import pytest
+    with pytest.raises(ValueError):
+        op_map.eval_and_sum({"n": np.array([0, 1]), "m": 1, "ell": 1})
+
+
+def test_exact_count_with_fixed_parameters():
+    knl = lp.make_kernel(
+            "[n] -> {[i,j]: 0<=i<n and 0<=j<=i and j mod 3 = 0}",
+            "out[i, j] = 2*a[i, j]",
+            assumptions="n >= 1")
+    knl = lp.add_and_infer_dtypes(knl, dict(a=np.float32))
+
+    n = 100
+    n_points = sum(1 for i in range(n) for j in range(0, i+1, 3))
+
+    from loopy.statistics import count_points
+    assert count_points(knl.domains[0], {"n": n}) == n_points
+
+    knl = lp.fix_parameters(knl, n=n)
+    knl = knl.copy(silenced_warnings=["count_overestimate",
+                                      "count_underestimate",
+                                      "count_misestimate"])
+
+    op_map = lp.get_op_map(knl, subgroup_size=SGS, count_redundant_work=True)
+    f32mul = op_map[lp.Op(np.float32, 'mul', CG.SUBGROUP)].eval_with_dict({})
+    assert f32mul == n_points
+
+
+def test_mem_access_trace_stats():
+    knl = lp.make_kernel(
+            "{[i, j]: 0<=i<n and 0<=j<16}",
+            """
+            <> tmp[j] = a[i, j]  {id=fetch}
+            out[i, j] = 2*tmp[(j*2) % 16] + b[j, i]  {dep=fetch}
+            """,
+            assumptions="n >= 1")
+    knl = lp.add_and_infer_dtypes(knl, dict(a=np.float32, b=np.float32))
+    knl = lp.tag_inames(knl, dict(i="g.0", j="l.0"))
+    knl = lp.set_temporary_scope(knl, "tmp", "local")
+
+    n = 64
+    stats = dict(
+            ((st.variable, st.direction), st)
+            for st in lp.get_mem_access_trace_stats(
+                knl, {"n": n}, subgroup_size=16))
+
+    a_ld = stats["a", "load"]
+    assert a_ld.accesses == n*16
+    assert a_ld.subgroup_accesses == n
+    # 16 consecutive floats: one 64-byte segment per sub-group
+    assert a_ld.transactions[64] == n
+    assert a_ld.transactions[32] == 2*n
+
+    b_ld = stats["b", "load"]
+    # stride-n access: every lane touches its own segment
+    assert b_ld.transactions[32] == 16*n
+    assert b_ld.unique_cache_lines == 16*n*4 // 128
+    assert sum(b_ld.reuse_distances.values()) == (
+            b_ld.cache_lines - b_ld.unique_cache_lines)
+
+    assert stats["a", "load"].bank_conflicts is None
+    assert stats["tmp", "store"].bank_conflicts == 0
+    assert stats["tmp", "load"].bank_conflicts == 0
+
+    stats = dict(
+            ((st.variable, st.direction), st)
+            for st in lp.get_mem_access_trace_stats(
+                knl, {"n": n}, subgroup_size=16, local_mem_banks=8))
+
+    # 16 distinct words on 8 banks
+    assert stats["tmp", "store"].bank_conflicts == n
+    # tmp[(j*2) % 16]: words 0, 2, ..., 14 (each read by two lanes)
+    # land on banks 0, 2, 4, 6, twice each
+    assert stats["tmp", "load"].bank_conflicts == n
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
@@ -375,6 +375,208 @@ def test_cuda_short_vector():
     print(lp.generate_code_v2(knl).device_code())
 
 
+def test_pyopencl_executor_memory_pool(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+        "{ [i]: 0<=i<n }",
+        """
+        tmp[i] = 2*a[i] {id=wr_tmp}
+        ... gbarrier {id=bar, dep=wr_tmp}
+        out[i] = tmp[n-1-i] {dep=bar}
+        """,
+        [lp.TemporaryVariable("tmp", np.float32, shape="n",
+            address_space=lp.AddressSpace.GLOBAL), "..."])
+
+    knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+    knl = lp.add_and_infer_dtypes(knl, {"a": np.float32})
+
+    kex = knl.target.get_kernel_executor(knl, queue)
+
+    a = cl.array.to_device(queue, np.arange(64, dtype=np.float32))
+    for _ in range(3):
+        _, (out,) = kex(queue, a=a)
+        assert np.array_equal(out.get(), 2*a.get()[::-1])
+        del out
+
+    from loopy.target.pyopencl_execution import get_memory_pool
+    pool = get_memory_pool(queue)
+
+    stats = pool.get_statistics()
+    assert stats["allocation_count"] == 6
+    # everything but the first invocation's output and temporary is reused
+    assert stats["reuse_count"] == 4
+
+    # the pool is shared with other kernels executed on the queue
+    copy_knl = lp.make_kernel(
+        "{ [i]: 0<=i<n }",
+        "out[i] = a[i]")
+    _, (out,) = copy_knl(queue, a=a)
+    assert np.array_equal(out.get(), a.get())
+    del out
+    assert pool.get_statistics()["allocation_count"] == 7
+    assert pool.get_statistics()["reuse_count"] == 5
+
+    pool.free_held()
+    assert pool.get_statistics()["held_bytes"] == 0
+
+    # Invocations on another queue are not ordered with respect to those
+    # on the first queue and allocate from a pool of their own.
+    queue2 = cl.CommandQueue(ctx)
+    _, (out,) = kex(queue2, a=a)
+    assert np.array_equal(out.get(), 2*a.get()[::-1])
+    assert pool.get_statistics()["allocation_count"] == 7
+    assert get_memory_pool(queue2) is not pool
+
+
+def test_pyopencl_host_array_cache(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+        "{ [i,j]: 0<=i,j<n }",
+        "out[i] = sum(j, a[i, j]*x[j])")
+
+    knl = lp.add_and_infer_dtypes(knl, {"a,x": np.float64})
+    knl = lp.set_options(knl, cl_exec_cache_host_arrays=True)
+
+    kex = knl.target.get_kernel_executor(knl, queue)
+
+    a = np.random.rand(16, 16)
+    a.flags.writeable = False
+    x = np.random.rand(16)
+
+    for _ in range(3):
+        _, (out,) = kex(queue, a=a, x=x)
+        assert isinstance(out, np.ndarray)
+        assert np.allclose(out, a.dot(x))
+
+    # only the array that is not writeable is kept
+    cache = kex.host_array_cache
+    assert cache.upload_count == 4
+    assert cache.hit_count == 2
+    assert len(cache._key_to_entry) == 1
+
+    x[0] += 1
+    _, (out,) = kex(queue, a=a, x=x)
+    assert np.allclose(out, a.dot(x))
+    assert cache.upload_count == 5
+
+    # the least recently used copies are dropped to stay within max_bytes
+    cache.max_bytes = a.nbytes
+    b = 2*a
+    b.flags.writeable = False
+    _, (out,) = kex(queue, a=b, x=x)
+    assert np.allclose(out, b.dot(x))
+    assert len(cache._key_to_entry) == 1
+    assert cache.nbytes == b.nbytes
+
+    # copies are dropped along with their host array
+    del b
+    assert len(cache._key_to_entry) == 0
+    assert cache.nbytes == 0
+
+
+def test_pyopencl_launch_plan(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel(
+        "{ [i]: 0<=i<n }",
+        "out[i] = alpha*a[i] + b[i]")
+
+    knl = lp.add_and_infer_dtypes(knl, {"a,b,alpha": np.float32})
+
+    kex = knl.target.get_kernel_executor(knl, queue)
+
+    a = cl.array.to_device(queue, np.arange(16, dtype=np.float32))
+    b = cl.array.to_device(queue, np.ones(16, dtype=np.float32))
+
+    plan = kex.get_launch_plan(queue, a=a, b=b, alpha=2)
+    _, (out,) = plan()
+    assert np.array_equal(out.get(), 2*a.get() + 1)
+
+    plan.rebind(alpha=3, b=a)
+    evt, (out,) = plan()
+    assert np.array_equal(out.get(), 4*a.get())
+
+    # launching the kernel in between must not disturb the plan
+    kex(queue, a=b, b=b, alpha=1)
+    plan.rebind(b=b)
+    _, (out,) = plan()
+    assert np.array_equal(out.get(), 3*a.get() + 1)
+
+    from loopy.diagnostic import LoopyError
+    with pytest.raises(LoopyError):
+        plan.rebind(n=8)
+    with pytest.raises(LoopyError):
+        plan.rebind(a=a[:8])
+
+    # kernels objects passed by the caller work, too
+    class Kernels(object):
+        pass
+
+    kernel_info = kex.kernel_info(kex.arg_to_dtype_set(dict(a=a, b=b)))
+    cl_kernels = Kernels()
+    cl_kernels.loopy_kernel = kernel_info.cl_kernels.loopy_kernel.program \
+            .loopy_kernel
+
+    for alpha in [2, 5]:
+        _, (out,) = kernel_info.invoker(cl_kernels, queue, None, None, None,
+                None, a=a, b=b, alpha=alpha)
+        assert np.array_equal(out.get(), alpha*a.get() + 1)
+
+    # arguments comparing equal, but differing in value, are set
+    recip_knl = lp.make_kernel(
+        "{ [i]: 0<=i<n }",
+        "out[i] = 1/alpha")
+    recip_knl = lp.add_and_infer_dtypes(recip_knl, {"alpha": np.float32})
+
+    for alpha in [0.0, -0.0]:
+        _, (out,) = recip_knl(queue, alpha=alpha, n=4)
+        assert (out.get() == np.copysign(np.inf, alpha)).all()
+
+
+def test_python_target_array_operations():
+    n = 20
+
+    knl = lp.make_kernel(
+            "{[i, j, k]: 0<=i, j, k<n}",
+            """
+            c[i, j] = sum(k, a[i, k]*b[k, j])
+            <> t = 2*a[i, j] + j  {id=t}
+            d[i, j] = t*t  {dep=t}
+            """,
+            [lp.GlobalArg("a,b,c,d", np.float64, shape=(n, n))],
+            target=lp.PythonTarget())
+    knl = lp.fix_parameters(knl, n=n)
+
+    code = lp.generate_code_v2(knl).device_code()
+    assert "_lpy_np.sum(" in code
+    assert "for k in" not in code
+
+    a = np.random.rand(n, n)
+    b = np.random.rand(n, n)
+    _, (c, d) = knl(a=a, b=b)
+
+    assert np.allclose(c, a.dot(b))
+    assert np.allclose(d, (2*a + np.arange(n))**2)
+
+    # Iterations depend on each other, so the loop must be kept.
+    rec_knl = lp.make_kernel(
+            "{[i]: 1<=i<n}",
+            "a[i] = a[i-1] + a[i]",
+            [lp.GlobalArg("a", np.float64, shape=(n,))],
+            target=lp.PythonTarget())
+    rec_knl = lp.fix_parameters(rec_knl, n=n)
+
+    a = np.random.rand(n)
+    _, (rec_a,) = rec_knl(a=a.copy())
+
+    assert np.allclose(rec_a, np.cumsum(a))
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])
@@ -213,6 +213,59 @@ def test_fusion():
     print(knl)
 
 
+def test_fuse_producer_consumer(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    producer = lp.make_kernel(
+            "{ [j]: 0<=j<n+1 }",
+            "tmp[j] = 2*x[j]",
+            [lp.GlobalArg("tmp", shape="n+1"), "..."],
+            name="producer")
+
+    elementwise = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = tmp[i]*tmp[i]",
+            [lp.GlobalArg("tmp", shape="n+1"), "..."],
+            name="elementwise")
+
+    halo = lp.make_kernel(
+            "{ [i]: 0<=i<n }",
+            "out[i] = tmp[i] + tmp[i+1]",
+            [lp.GlobalArg("tmp", shape="n+1"), "..."],
+            name="halo")
+
+    x = np.arange(65, dtype=np.float32)
+
+    for consumer, out_expect, address_space in [
+            (elementwise, (2*x[:-1])**2, lp.AddressSpace.PRIVATE),
+            (halo, 2*(x[:-1] + x[1:]), lp.AddressSpace.LOCAL)]:
+        knl = lp.fuse_kernels([producer, consumer], data_flow=[("tmp", 0, 1)])
+        knl = lp.add_and_infer_dtypes(knl, {"x": np.float32})
+        knl = lp.split_iname(knl, "i", 16, outer_tag="g.0", inner_tag="l.0")
+
+        knl = lp.fuse_producer_consumer(knl, "tmp")
+
+        assert "tmp" not in knl.arg_dict
+        assert "j" not in knl.all_inames()
+        tv, = knl.temporary_variables.values()
+        assert tv.address_space == address_space
+
+        _, (out,) = knl(queue, x=x, out_host=True)
+        assert np.array_equal(out, out_expect)
+
+    knl = lp.make_kernel(
+            "{ [i,j]: 0<=j<n and 0<=i<n+1 }",
+            """
+            tmp[j] = 2*x[j] {id=prod}
+            out[i] = tmp[i] {dep=prod}
+            """,
+            [lp.GlobalArg("tmp", shape="n+1"), "..."])
+
+    with pytest.raises(lp.LoopyError):
+        lp.fuse_producer_consumer(knl, "tmp")
+
+
 def test_alias_temporaries(ctx_factory):
     ctx = ctx_factory()
 
@@ -245,6 +298,65 @@ def test_alias_temporaries(ctx_factory):
             parameters=dict(n=30))
 
 
+def test_share_temporary_storage(ctx_factory):
+    ctx = ctx_factory()
+
+    # {{{ private
+
+    knl = lp.make_kernel(
+        "{[i,j,k]: 0<=i<n and 0<=j,k<4}",
+        """
+        <> t1[j] = a[i, j] * 2 {id=w1}
+        out1[i] = sum(j, t1[j]) {id=r1, dep=w1}
+        <> t2[k] = a[i, k] * 3 {id=w2, dep=r1}
+        out2[i] = sum(k, t2[k]) {id=r2, dep=w2}
+        """, [lp.GlobalArg("a", np.float32, shape=lp.auto), "..."])
+    knl = lp.tag_inames(knl, "i:g.0")
+    knl = lp.add_and_infer_dtypes(knl, {"a": np.float32})
+
+    sched_knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+    assert lp.find_temporary_storage_sharing(sched_knl) == [["t1", "t2"]]
+
+    lp.auto_test_vs_ref(
+            knl, ctx, lp.set_options(knl, share_temporary_storage=True),
+            parameters=dict(n=20))
+
+    # }}}
+
+    # {{{ local
+
+    def make_local_knl(barrier):
+        knl = lp.make_kernel(
+            "{[i,l]: 0<=i<n and 0<=l<16}",
+            """
+            <> l1[l] = b[i, l] {id=lw1}
+            out3[i, l] = l1[15 - l] {id=lr1, dep=lw1}
+            ... lbarrier {id=bar, dep=lr1}
+            <> l2[l] = 2*b[i, l] {id=lw2, dep=%s}
+            out4[i, l] = l2[15 - l] {id=lr2, dep=lw2}
+            """ % ("bar" if barrier else "lr1"),
+            [lp.GlobalArg("b", np.float32, shape=lp.auto), "..."])
+        knl = lp.tag_inames(knl, "i:g.0, l:l.0")
+        knl = lp.set_temporary_scope(knl, "l1,l2", "local")
+        return lp.add_and_infer_dtypes(knl, {"b": np.float32})
+
+    # Without a barrier between their live ranges, local temporaries may not
+    # share storage.
+    knl = make_local_knl(barrier=False)
+    sched_knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+    assert not lp.find_temporary_storage_sharing(sched_knl)
+
+    knl = make_local_knl(barrier=True)
+    sched_knl = lp.get_one_scheduled_kernel(lp.preprocess_kernel(knl))
+    assert lp.find_temporary_storage_sharing(sched_knl) == [["l1", "l2"]]
+
+    shared_knl = lp.set_options(knl, share_temporary_storage=True)
+    assert "temp_storage[64]" in lp.generate_code_v2(shared_knl).device_code()
+    lp.auto_test_vs_ref(knl, ctx, shared_knl, parameters=dict(n=20))
+
+    # }}}
+
+
 def test_vectorize(ctx_factory):
     ctx = ctx_factory()
 
@@ -585,6 +697,176 @@ def test_extract_subst_with_iname_deps_in_templ(ctx_factory):
     lp.auto_test_vs_ref(knl, ctx_factory(), knl)
 
 
+def test_hoist_invariant_subexpressions(ctx_factory):
+    ctx = ctx_factory()
+
+    knl = lp.make_kernel(
+            "{[i, j, k]: 0<=i, j, k<n}",
+            """
+            if g[i] > 0
+                out[i, j] = u[i, j]*(g[i]*h[i]/det[i]) + sum(k, w[i]*v[k, j])
+            end
+            """,
+            [lp.GlobalArg("u,g,h,det,w,v,out", np.float32, shape=lp.auto),
+                "..."])
+    knl = lp.prioritize_loops(knl, "i,j")
+
+    ref_knl = knl
+    knl = lp.hoist_invariant_subexpressions(knl)
+
+    hoisted_insns = [insn for insn in knl.instructions if insn.id != "insn"]
+    assert hoisted_insns
+    assert all(insn.predicates == knl.id_to_insn["insn"].predicates
+            for insn in hoisted_insns)
+
+    # The geometric factor and the factor w[i] of the reduction only depend
+    # on the outer loop.
+    from loopy.symbolic import get_dependencies
+    for insn in hoisted_insns:
+        if "det" in get_dependencies(insn.expression) or (
+                "w" in get_dependencies(insn.expression)
+                and "v" not in get_dependencies(insn.expression)):
+            assert knl.insn_inames(insn) == frozenset(["i"])
+
+    assert not (set(["h", "det", "w"])
+            & get_dependencies(knl.id_to_insn["insn"].expression))
+
+    lp.auto_test_vs_ref(ref_knl, ctx, knl, parameters=dict(n=20))
+
+
+def test_eliminate_common_subexpressions(ctx_factory):
+    ctx = ctx_factory()
+
+    knl = lp.make_kernel(
+            "{[i]: 0<=i<n}",
+            """
+            <> t = a[i] {id=w1}
+            out1[i] = (a[i] + b[i])*c[i] + t*b[i] {id=r1, dep=w1}
+            t = 2*a[i] {id=w2, dep=r1}
+            out2[i] = c[i]*(b[i] + a[i]) - t*b[i] {id=r2, dep=w2}
+            """,
+            [lp.GlobalArg("a,b,c,out1,out2", np.float32, shape=lp.auto),
+                "..."])
+    knl = lp.add_and_infer_dtypes(knl, {})
+
+    ref_knl = knl
+    knl = lp.eliminate_common_subexpressions(knl)
+
+    cse_insns = [insn for insn in knl.instructions
+            if insn.id not in ref_knl.id_to_insn]
+
+    # t*b[i] reads different values of t and must remain in place.
+    assert len(cse_insns) == 1
+    cse_insn, = cse_insns
+    assert cse_insn.id in knl.id_to_insn["r1"].depends_on
+    assert cse_insn.id in knl.id_to_insn["r2"].depends_on
+
+    def count_ops(knl):
+        op_map = lp.get_op_map(knl, subgroup_size=32)
+        return op_map.eval_and_sum(dict(n=10))
+
+    assert count_ops(knl) < count_ops(ref_knl)
+
+    lp.auto_test_vs_ref(ref_knl, ctx, knl, parameters=dict(n=20))
+
+
+def test_register_block(ctx_factory):
+    ctx = ctx_factory()
+
+    knl = lp.make_kernel(
+            "{[i, j, k]: 0<=i, j, k<n}",
+            "c[i, j] = sum(k, a[i, k]*b[k, j])",
+            [lp.GlobalArg("a,b,c", np.float32, shape=lp.auto), "..."])
+
+    ref_knl = knl
+    knl = lp.register_block(knl, "i,j", (4, 2))
+    knl = lp.prioritize_loops(knl, "i_outer,j_outer,k")
+
+    from loopy.kernel.data import UnrolledIlpTag
+    assert knl.iname_tags_of_type("i_inner", UnrolledIlpTag)
+    assert knl.iname_tags_of_type("j_inner", UnrolledIlpTag)
+
+    lp.auto_test_vs_ref(ref_knl, ctx, knl, parameters=dict(n=23))
+
+    # Iterations of a recurrence depend on each other.
+    rec_knl = lp.make_kernel(
+            "{[i]: 1<=i<n}",
+            "a[i] = a[i-1] + 1",
+            [lp.GlobalArg("a", np.float32, shape="n"), "..."])
+
+    with pytest.raises(lp.LoopyError):
+        lp.register_block(rec_knl, "i", 4)
+
+    # Indirect and non-injective writes may write the same entry in
+    # different iterations.
+    for write_index in ["b[i]", "i//2"]:
+        indirect_knl = lp.make_kernel(
+                "{[i, k]: 0<=i<n and 0<=k<3}",
+                "h[{idx}] = 2*h[{idx}] + a[i, k]".format(idx=write_index),
+                [lp.GlobalArg("h,a", np.float32, shape=lp.auto),
+                    lp.GlobalArg("b", np.int32, shape="n"), "..."])
+
+        with pytest.raises(lp.LoopyError):
+            lp.register_block(indirect_knl, "i", 2)
+
+
+def test_partition_iname_by_work(ctx_factory):
+    ctx = ctx_factory()
+    queue = cl.CommandQueue(ctx)
+
+    knl = lp.make_kernel([
+            "{ [i] : 0 <= i < m }",
+            "{ [j] : 0 <= j < length }"],
+            """
+            for i
+                <> rowstart = rowstarts[i]
+                <> length = rowstarts[i+1] - rowstart
+                y[i] = sum(j, values[rowstart+j] * x[colindices[rowstart + j]])
+            end
+            """)
+    knl = lp.add_and_infer_dtypes(knl, {
+        "values,x": np.float64,
+        "rowstarts,colindices": knl.index_dtype})
+
+    knl = lp.partition_iname_by_work(knl, "i", 16)
+    knl = lp.tag_inames(knl, {"i_part": "g.0"})
+
+    m = 200
+    lengths = np.random.randint(0, 5, m)
+    lengths[3] = 150
+    lengths[-3:] = 0
+    rowstarts = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int32)
+    nnz = rowstarts[-1]
+    colindices = np.random.randint(0, m, nnz).astype(np.int32)
+    values = np.random.rand(nnz)
+    x = np.random.rand(m)
+
+    inspector = lp.WorkPartitionInspector(16)
+    part_starts = inspector(queue, rowstarts=rowstarts)
+    assert inspector(queue, rowstarts=rowstarts.copy()) is part_starts
+
+    assert part_starts[0] == 0
+    assert part_starts[-1] == m
+    assert (np.diff(part_starts) >= 0).all()
+
+    # Each part gets its share of the work, plus at most its last row.
+    for p in range(16):
+        start, end = part_starts[p], part_starts[p+1]
+        if start == end:
+            continue
+        assert (rowstarts[end] - rowstarts[start]
+                <= nnz/16 + (rowstarts[end] - rowstarts[end-1]))
+
+    evt, (y,) = knl(queue, rowstarts=rowstarts, colindices=colindices,
+            values=values, x=x, part_starts=part_starts)
+
+    y_ref = np.array([
+        np.dot(values[rowstarts[i]:rowstarts[i+1]],
+            x[colindices[rowstarts[i]:rowstarts[i+1]]])
+        for i in range(m)])
+    assert np.allclose(y, y_ref)
+
+
 if __name__ == "__main__":
     if len(sys.argv) > 1:
         exec(sys.argv[1])